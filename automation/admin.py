@@ -1,10 +1,15 @@
 """
 JeyaRamaDesk — Automation Admin
-Admin configuration for automation rules and logs.
+Admin configuration for automation rules, logs and webhooks.
 """
 
 from django.contrib import admin
-from .models import AutomationRule, AutomationLog
+from django.utils import timezone
+
+from .models import (
+    AutomationRule, AutomationLog, AutomationRuleDailyStat,
+    WebhookDeadLetter, WebhookEndpoint,
+)
 
 
 @admin.register(AutomationRule)
@@ -26,10 +31,10 @@ class AutomationRuleAdmin(admin.ModelAdmin):
             'fields': ('id', 'name', 'description'),
         }),
         ('Trigger & Conditions', {
-            'fields': ('trigger_event', 'conditions'),
+            'fields': ('trigger_event', 'idle_threshold_hours', 'schedule_hours', 'schedule_cron', 'conditions'),
         }),
         ('Action', {
-            'fields': ('action_type', 'action_params'),
+            'fields': ('action_type', 'action_params', 'actions'),
         }),
         ('Execution', {
             'fields': ('priority_order', 'is_active', 'stop_processing'),
@@ -58,3 +63,66 @@ class AutomationLogAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(AutomationRuleDailyStat)
+class AutomationRuleDailyStatAdmin(admin.ModelAdmin):
+    """Read-only admin for rolled-up rule execution counters."""
+
+    list_display = ['day', 'rule', 'success', 'failed', 'skipped']
+    list_filter = ['day']
+    search_fields = ['rule__name']
+    ordering = ['-day']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(WebhookEndpoint)
+class WebhookEndpointAdmin(admin.ModelAdmin):
+    """Admin for webhook endpoints used by ``webhook`` actions."""
+
+    list_display = ['name', 'url', 'is_active', 'max_concurrency', 'max_attempts', 'created_at']
+    list_filter = ['is_active']
+    search_fields = ['name', 'url']
+    readonly_fields = ['id', 'created_at', 'updated_at']
+    actions = ['send_test_delivery']
+
+    @admin.action(description='Send a test delivery')
+    def send_test_delivery(self, request, queryset):
+        from .services.webhooks import WebhookDispatcher
+        for endpoint in queryset:
+            WebhookDispatcher.enqueue(endpoint.pk, {
+                'event': 'ping',
+                'created_at': timezone.now().isoformat(),
+                'endpoint': {'id': str(endpoint.pk), 'name': endpoint.name},
+            })
+        self.message_user(request, f'{queryset.count()} test deliveries queued.')
+
+
+@admin.register(WebhookDeadLetter)
+class WebhookDeadLetterAdmin(admin.ModelAdmin):
+    """Failed webhook deliveries; can be replayed once the endpoint is fixed."""
+
+    list_display = ['delivery_id', 'endpoint', 'attempts', 'last_status_code', 'failed_at', 'replayed_at']
+    list_filter = ['endpoint', 'failed_at']
+    search_fields = ['delivery_id', 'last_error']
+    readonly_fields = [
+        'id', 'endpoint', 'delivery_id', 'payload', 'attempts',
+        'last_status_code', 'last_error', 'failed_at', 'replayed_at',
+    ]
+    ordering = ['-failed_at']
+    actions = ['replay_deliveries']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Replay selected deliveries')
+    def replay_deliveries(self, request, queryset):
+        from .services.webhooks import WebhookDispatcher
+        for dead_letter in queryset:
+            WebhookDispatcher.replay(dead_letter)
+        self.message_user(request, f'{queryset.count()} deliveries queued again.')
@@ -4,6 +4,10 @@ JeyaRamaDesk — Automation API Serializers
 
 from rest_framework import serializers
 from automation.models import AutomationRule, AutomationLog
+from automation.services.rule_engine import (
+    ActionError, ConditionError, ScheduleError,
+    validate_actions, validate_conditions, validate_schedule,
+)
 
 
 class AutomationRuleSerializer(serializers.ModelSerializer):
@@ -15,12 +19,36 @@ class AutomationRuleSerializer(serializers.ModelSerializer):
     class Meta:
         model = AutomationRule
         fields = [
-            'id', 'name', 'description', 'trigger_event',
-            'conditions', 'action_type', 'action_params',
+            'id', 'name', 'description', 'trigger_event', 'idle_threshold_hours',
+            'schedule_hours', 'schedule_cron', 'conditions', 'action_type', 'action_params', 'actions',
             'priority_order', 'is_active', 'stop_processing',
+            'disabled_at', 'disabled_reason',
             'created_by', 'created_by_name', 'created_at', 'updated_at',
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'disabled_at', 'disabled_reason', 'created_at', 'updated_at']
+
+    def validate_conditions(self, value):
+        try:
+            validate_conditions(value)
+        except ConditionError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def validate_actions(self, value):
+        try:
+            validate_actions(value)
+        except ActionError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+    def validate(self, attrs):
+        trigger_event = attrs.get('trigger_event', getattr(self.instance, 'trigger_event', None))
+        schedule_cron = attrs.get('schedule_cron', getattr(self.instance, 'schedule_cron', ''))
+        try:
+            validate_schedule(trigger_event, schedule_cron)
+        except ScheduleError as e:
+            raise serializers.ValidationError({'schedule_cron': str(e)})
+        return attrs
 
 
 class AutomationLogSerializer(serializers.ModelSerializer):
@@ -35,3 +63,30 @@ class AutomationLogSerializer(serializers.ModelSerializer):
             'status', 'action_taken', 'error_message', 'executed_at',
         ]
         read_only_fields = ['id', 'executed_at']
+
+
+class AutomationDryRunSerializer(serializers.Serializer):
+    """Input for a dry run: an existing rule or unsaved conditions."""
+
+    rule = serializers.PrimaryKeyRelatedField(
+        queryset=AutomationRule.objects.all(), required=False, allow_null=True,
+    )
+    conditions = serializers.JSONField(required=False)
+    date_from = serializers.DateField(required=False, allow_null=True)
+    date_to = serializers.DateField(required=False, allow_null=True)
+    days = serializers.IntegerField(min_value=1, max_value=365, default=30)
+    sample_size = serializers.IntegerField(min_value=0, max_value=50, default=10)
+
+    def validate(self, attrs):
+        if attrs.get('conditions') is None:
+            if attrs.get('rule') is None:
+                raise serializers.ValidationError('Provide either "rule" or "conditions".')
+            attrs['conditions'] = attrs['rule'].conditions
+        try:
+            validate_conditions(attrs['conditions'])
+        except ConditionError as e:
+            raise serializers.ValidationError({'conditions': str(e)})
+        date_from, date_to = attrs.get('date_from'), attrs.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError('date_from must not be after date_to.')
+        return attrs
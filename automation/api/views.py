@@ -2,6 +2,8 @@
 JeyaRamaDesk — Automation API Views
 """
 
+import uuid
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -10,7 +12,11 @@ from rest_framework.permissions import IsAuthenticated
 from accounts.permissions import IsStaffMember, IsSuperAdmin
 from automation.models import AutomationRule, AutomationLog
 from automation.services.automation_service import AutomationService
-from .serializers import AutomationRuleSerializer, AutomationLogSerializer
+from automation.services.dry_run import AutomationDryRunService
+from automation.services.profiler import RuleProfiler
+from .serializers import (
+    AutomationRuleSerializer, AutomationLogSerializer, AutomationDryRunSerializer,
+)
 
 
 class AutomationRuleViewSet(viewsets.ModelViewSet):
@@ -28,6 +34,47 @@ class AutomationRuleViewSet(viewsets.ModelViewSet):
         stats = AutomationService.get_rule_stats()
         return Response(stats, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='dry-run')
+    def dry_run(self, request):
+        """
+        Evaluate a rule's conditions (saved or unsaved) against recent
+        tickets without executing its action.
+        """
+        serializer = AutomationDryRunSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            result = AutomationDryRunService.run(
+                data['conditions'],
+                date_from=data.get('date_from'),
+                date_to=data.get('date_to'),
+                days=data['days'],
+                sample_size=data['sample_size'],
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def metrics(self, request):
+        """
+        Per-rule execution profile (outcomes, match / action latency,
+        queries) over the last ``hours`` (default 24, max 336).
+        Filter with ``?rule=<uuid>``.
+        """
+        try:
+            hours = min(max(int(request.query_params.get('hours') or 24), 1), 24 * 14)
+        except ValueError:
+            return Response({'error': 'hours must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        rule_id = request.query_params.get('rule') or None
+        if rule_id:
+            try:
+                rule_id = uuid.UUID(rule_id)
+            except ValueError:
+                return Response({'error': 'rule must be a UUID'}, status=status.HTTP_400_BAD_REQUEST)
+        summary = RuleProfiler.summarize(hours=hours, rule_id=rule_id)
+        return Response({'hours': hours, 'rules': summary}, status=status.HTTP_200_OK)
+
 
 class AutomationLogViewSet(viewsets.ReadOnlyModelViewSet):
     """Read-only API for automation logs."""
@@ -3,3 +3,14 @@ from django.apps import AppConfig
 
 class AutomationConfig(AppConfig):
     name = "automation"
+
+    def ready(self):
+        import automation.signals  # noqa
+        from automation.services.automation_service import AutomationService
+        from tickets.events import TicketEventBus
+        TicketEventBus.subscribe(AutomationService.handle_ticket_event)
+
+        # Don't lose a worker's unflushed profiler histograms on shutdown
+        from celery.signals import worker_process_shutdown
+        from automation.services.profiler import RuleProfiler
+        worker_process_shutdown.connect(lambda **kwargs: RuleProfiler.flush(), weak=False)
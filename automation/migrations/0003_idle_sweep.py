@@ -0,0 +1,34 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdleSweepCursor',
+            fields=[
+                ('rule', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='idle_cursor', serialize=False, to='automation.automationrule')),
+                ('last_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('last_ticket_id', models.BigIntegerField(default=0)),
+                ('backlog', models.PositiveIntegerField(default=0, help_text='Idle tickets past the cursor after the last sweep.')),
+                ('swept_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Idle Sweep Cursor',
+                'verbose_name_plural': 'Idle Sweep Cursors',
+                'db_table': 'jrd_automation_idle_cursors',
+            },
+        ),
+        migrations.AddField(
+            model_name='automationrule',
+            name='idle_threshold_hours',
+            field=models.PositiveIntegerField(default=24, help_text='For "Ticket Idle" rules: hours without activity before the rule fires.', verbose_name='Idle Threshold (hours)'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0003_idle_sweep'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutomationRuleDailyStat',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField(db_index=True)),
+                ('success', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Automation Rule Daily Stat',
+                'verbose_name_plural': 'Automation Rule Daily Stats',
+                'db_table': 'jrd_automation_rule_daily',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='automationlog',
+            index=models.Index(fields=['executed_at'], name='idx_autolog_date'),
+        ),
+        migrations.AddField(
+            model_name='automationruledailystat',
+            name='rule',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_stats', to='automation.automationrule'),
+        ),
+        migrations.AddIndex(
+            model_name='automationruledailystat',
+            index=models.Index(fields=['rule', 'day'], name='idx_rule_daily_rule_day'),
+        ),
+    ]
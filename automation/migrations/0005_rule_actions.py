@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0004_rule_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automationrule',
+            name='actions',
+            field=models.JSONField(blank=True, default=list, help_text='JSON list of {"type", "params"} actions run after the primary action.', verbose_name='Additional Actions'),
+        ),
+    ]
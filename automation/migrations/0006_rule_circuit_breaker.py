@@ -0,0 +1,23 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0005_rule_actions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automationrule',
+            name='disabled_at',
+            field=models.DateTimeField(blank=True, help_text='Set when the circuit breaker switched the rule off.', null=True, verbose_name='Auto-disabled At'),
+        ),
+        migrations.AddField(
+            model_name='automationrule',
+            name='disabled_reason',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='Auto-disable Reason'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticketevent_depth'),
+        ('automation', '0006_rule_circuit_breaker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automationrule',
+            name='schedule_cron',
+            field=models.CharField(blank=True, default='', help_text='For "Schedule" rules: "minute hour day-of-month month day-of-week" (e.g. "0 9 * * 1-5"), in the server time zone.', max_length=100, verbose_name='Cron Schedule'),
+        ),
+        migrations.AddField(
+            model_name='automationrule',
+            name='schedule_hours',
+            field=models.PositiveIntegerField(default=0, help_text='For "Time After Created" rules: hours after creation. For "Before SLA Deadline" rules: hours before the next SLA deadline.', verbose_name='Schedule Offset (hours)'),
+        ),
+        migrations.AlterField(
+            model_name='automationrule',
+            name='trigger_event',
+            field=models.CharField(choices=[('ticket_created', 'Ticket Created'), ('ticket_updated', 'Ticket Updated'), ('ticket_assigned', 'Ticket Assigned'), ('ticket_commented', 'Comment Added'), ('sla_breach', 'SLA Breach'), ('ticket_idle', 'Ticket Idle'), ('time_after_created', 'Time After Created'), ('before_sla_deadline', 'Before SLA Deadline'), ('schedule', 'Schedule (cron)')], db_index=True, max_length=30, verbose_name='Trigger Event'),
+        ),
+        migrations.CreateModel(
+            name='AutomationTimer',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('fire_at', models.DateTimeField(blank=True, null=True)),
+                ('anchor', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timers', to='automation.automationrule')),
+                ('ticket', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='automation_timers', to='tickets.ticket')),
+            ],
+            options={
+                'verbose_name': 'Automation Timer',
+                'verbose_name_plural': 'Automation Timers',
+                'db_table': 'jrd_automation_timers',
+                'indexes': [models.Index(fields=['fire_at'], name='idx_timer_fire_at')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='automationtimer',
+            constraint=models.UniqueConstraint(fields=('rule', 'ticket'), name='uniq_timer_rule_ticket'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:54
+
+import automation.models
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0007_scheduled_triggers'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEndpoint',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, verbose_name='Name')),
+                ('url', models.URLField(max_length=500, verbose_name='URL')),
+                ('secret', models.CharField(default=automation.models.generate_webhook_secret, help_text='Shared secret for the X-JRD-Signature header.', max_length=128, verbose_name='Signing Secret')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('max_concurrency', models.PositiveSmallIntegerField(default=4, verbose_name='Max Concurrent Requests')),
+                ('timeout_seconds', models.PositiveSmallIntegerField(default=10, verbose_name='Timeout (seconds)')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=8, help_text='Attempts before a delivery is moved to the dead-letter table.', verbose_name='Max Attempts')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Webhook Endpoint',
+                'verbose_name_plural': 'Webhook Endpoints',
+                'db_table': 'jrd_webhook_endpoints',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='automationrule',
+            name='action_type',
+            field=models.CharField(choices=[('assign_agent', 'Assign to Agent'), ('change_priority', 'Change Priority'), ('change_status', 'Change Status'), ('add_tag', 'Add Tag'), ('send_notification', 'Send Notification'), ('escalate', 'Escalate Ticket'), ('add_comment', 'Add Internal Note'), ('webhook', 'Call Webhook')], max_length=30, verbose_name='Action Type'),
+        ),
+        migrations.CreateModel(
+            name='WebhookDeadLetter',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('delivery_id', models.UUIDField(db_index=True)),
+                ('payload', models.JSONField(default=dict)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('failed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('replayed_at', models.DateTimeField(blank=True, null=True)),
+                ('endpoint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dead_letters', to='automation.webhookendpoint')),
+            ],
+            options={
+                'verbose_name': 'Webhook Dead Letter',
+                'verbose_name_plural': 'Webhook Dead Letters',
+                'db_table': 'jrd_webhook_dead_letters',
+                'ordering': ['-failed_at'],
+                'indexes': [models.Index(fields=['endpoint', 'failed_at'], name='idx_webhook_dl_endpoint')],
+            },
+        ),
+    ]
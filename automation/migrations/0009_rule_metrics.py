@@ -0,0 +1,46 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0008_webhooks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutomationRuleMetric',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('period_start', models.DateTimeField()),
+                ('success', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('match_samples', models.PositiveIntegerField(default=0)),
+                ('matched', models.PositiveIntegerField(default=0)),
+                ('match_total_ms', models.FloatField(default=0)),
+                ('match_max_ms', models.FloatField(default=0)),
+                ('match_histogram', models.JSONField(default=list)),
+                ('action_samples', models.PositiveIntegerField(default=0)),
+                ('action_total_ms', models.FloatField(default=0)),
+                ('action_max_ms', models.FloatField(default=0)),
+                ('action_histogram', models.JSONField(default=list)),
+                ('queries', models.PositiveIntegerField(default=0, help_text='Queries issued by sampled executions.')),
+                ('rule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='automation.automationrule')),
+            ],
+            options={
+                'verbose_name': 'Automation Rule Metric',
+                'verbose_name_plural': 'Automation Rule Metrics',
+                'db_table': 'jrd_automation_rule_metrics',
+                'ordering': ['-period_start'],
+                'indexes': [models.Index(fields=['period_start'], name='idx_rule_metric_period')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='automationrulemetric',
+            constraint=models.UniqueConstraint(fields=('rule', 'period_start'), name='uniq_rule_metric_period'),
+        ),
+    ]
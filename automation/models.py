@@ -8,6 +8,7 @@ Designed for millions of records with proper indexing.
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
+import secrets
 import uuid
 
 
@@ -25,6 +26,9 @@ class AutomationRule(models.Model):
         TICKET_COMMENTED = 'ticket_commented', 'Comment Added'
         SLA_BREACH = 'sla_breach', 'SLA Breach'
         TICKET_IDLE = 'ticket_idle', 'Ticket Idle'
+        TIME_AFTER_CREATED = 'time_after_created', 'Time After Created'
+        BEFORE_SLA_DEADLINE = 'before_sla_deadline', 'Before SLA Deadline'
+        SCHEDULE = 'schedule', 'Schedule (cron)'
 
     class ActionType(models.TextChoices):
         ASSIGN_AGENT = 'assign_agent', 'Assign to Agent'
@@ -34,6 +38,7 @@ class AutomationRule(models.Model):
         SEND_NOTIFICATION = 'send_notification', 'Send Notification'
         ESCALATE = 'escalate', 'Escalate Ticket'
         ADD_COMMENT = 'add_comment', 'Add Internal Note'
+        WEBHOOK = 'webhook', 'Call Webhook'
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField('Rule Name', max_length=200)
@@ -47,6 +52,27 @@ class AutomationRule(models.Model):
         db_index=True,
     )
 
+    idle_threshold_hours = models.PositiveIntegerField(
+        'Idle Threshold (hours)',
+        default=24,
+        help_text='For "Ticket Idle" rules: hours without activity before the rule fires.',
+    )
+
+    schedule_hours = models.PositiveIntegerField(
+        'Schedule Offset (hours)',
+        default=0,
+        help_text='For "Time After Created" rules: hours after creation. '
+                  'For "Before SLA Deadline" rules: hours before the next SLA deadline.',
+    )
+    schedule_cron = models.CharField(
+        'Cron Schedule',
+        max_length=100,
+        blank=True,
+        default='',
+        help_text='For "Schedule" rules: "minute hour day-of-month month day-of-week" '
+                  '(e.g. "0 9 * * 1-5"), in the server time zone.',
+    )
+
     # ── Conditions (JSON) ─────────────────────────────────
     # Example: {"priority": "urgent", "category": "billing"}
     conditions = models.JSONField(
@@ -74,6 +100,16 @@ class AutomationRule(models.Model):
         help_text='JSON parameters for the action to execute.',
     )
 
+    # Further actions applied together with the primary action, in order.
+    # Example: [{"type": "change_priority", "params": {"priority": "high"}},
+    #           {"type": "add_tag", "params": {"tag": "vip"}}]
+    actions = models.JSONField(
+        'Additional Actions',
+        default=list,
+        blank=True,
+        help_text='JSON list of {"type", "params"} actions run after the primary action.',
+    )
+
     # ── Ordering & Status ─────────────────────────────────
     priority_order = models.PositiveIntegerField(
         'Execution Order',
@@ -81,6 +117,11 @@ class AutomationRule(models.Model):
         help_text='Lower numbers execute first.',
     )
     is_active = models.BooleanField('Active', default=True, db_index=True)
+    disabled_at = models.DateTimeField(
+        'Auto-disabled At', null=True, blank=True,
+        help_text='Set when the circuit breaker switched the rule off.',
+    )
+    disabled_reason = models.CharField('Auto-disable Reason', max_length=255, blank=True, default='')
     stop_processing = models.BooleanField(
         'Stop Processing',
         default=False,
@@ -116,6 +157,101 @@ class AutomationRule(models.Model):
     def __str__(self):
         return f'{self.name} ({self.get_trigger_event_display()})'
 
+    def save(self, *args, **kwargs):
+        # Re-enabling a rule clears the circuit breaker's note
+        if self.is_active and self.disabled_at:
+            self.disabled_at = None
+            self.disabled_reason = ''
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'disabled_at', 'disabled_reason'}
+        super().save(*args, **kwargs)
+
+    def get_actions(self):
+        """All actions as (action_type, params) pairs, primary action first."""
+        return [(self.action_type, self.action_params or {})] + [
+            (action.get('type'), action.get('params') or {}) for action in self.actions or []
+        ]
+
+
+class AutomationTimer(models.Model):
+    """
+    Next fire time of a time-based rule. Ticket rules ("Time After
+    Created", "Before SLA Deadline") keep one row per open ticket;
+    "Schedule" rules keep a single row with no ticket. The beat task reads
+    due rows through the ``fire_at`` index, so it never scans tickets.
+
+    ``anchor`` is the ticket timestamp the timer was computed from
+    (creation time or SLA deadline). Once a timer has fired, ``fire_at`` is
+    cleared and the anchor kept, so recomputing the same anchor does not
+    fire again; a new anchor (e.g. a new deadline) arms the timer again.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    rule = models.ForeignKey(
+        AutomationRule,
+        on_delete=models.CASCADE,
+        related_name='timers',
+    )
+    ticket = models.ForeignKey(
+        'tickets.Ticket',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='automation_timers',
+    )
+    fire_at = models.DateTimeField(null=True, blank=True)
+    anchor = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'jrd_automation_timers'
+        verbose_name = 'Automation Timer'
+        verbose_name_plural = 'Automation Timers'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['rule', 'ticket'],
+                name='uniq_timer_rule_ticket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['fire_at'], name='idx_timer_fire_at'),
+        ]
+
+    def __str__(self):
+        return f'{self.rule_id} → {self.ticket_id or "schedule"} @ {self.fire_at}'
+
+
+class IdleSweepCursor(models.Model):
+    """
+    Per-rule watermark for the idle-ticket sweep. Tickets are visited in
+    (updated_at, id) order; everything up to the cursor has already been
+    evaluated for its current idle window. Any later activity moves a
+    ticket's updated_at past the cursor, so it is evaluated again once it
+    goes idle again.
+    """
+
+    rule = models.OneToOneField(
+        AutomationRule,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='idle_cursor',
+    )
+    last_updated_at = models.DateTimeField(null=True, blank=True)
+    last_ticket_id = models.BigIntegerField(default=0)
+    backlog = models.PositiveIntegerField(
+        default=0,
+        help_text='Idle tickets past the cursor after the last sweep.',
+    )
+    swept_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'jrd_automation_idle_cursors'
+        verbose_name = 'Idle Sweep Cursor'
+        verbose_name_plural = 'Idle Sweep Cursors'
+
+    def __str__(self):
+        return f'Idle cursor for "{self.rule}" at {self.last_updated_at}'
+
 
 class AutomationLog(models.Model):
     """
@@ -162,7 +298,165 @@ class AutomationLog(models.Model):
                 fields=['ticket', 'executed_at'],
                 name='idx_autolog_ticket_date',
             ),
+            models.Index(
+                fields=['executed_at'],
+                name='idx_autolog_date',
+            ),
         ]
 
     def __str__(self):
         return f'Rule "{self.rule}" on Ticket {self.ticket_id} — {self.status}'
+
+
+class AutomationRuleDailyStat(models.Model):
+    """
+    Per-rule daily execution counters compacted from AutomationLog.
+    Rule statistics read these instead of scanning the log table; raw
+    logs older than AUTOMATION_LOG_RETENTION_DAYS are purged once their
+    day has been rolled up.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    rule = models.ForeignKey(
+        AutomationRule,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='daily_stats',
+    )
+    day = models.DateField(db_index=True)
+    success = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'jrd_automation_rule_daily'
+        verbose_name = 'Automation Rule Daily Stat'
+        verbose_name_plural = 'Automation Rule Daily Stats'
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['rule', 'day'], name='idx_rule_daily_rule_day'),
+        ]
+
+    def __str__(self):
+        return f'{self.rule} on {self.day}: {self.success} ok / {self.failed} failed'
+
+
+class AutomationRuleMetric(models.Model):
+    """
+    Per-rule execution profile for one period, flushed from the in-memory
+    histograms of the automation profiler. Outcome counters cover every
+    execution; timings and query counts cover the sampled ones.
+    Histograms are bucket counts over ``RuleProfiler.BUCKETS_MS``.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    rule = models.ForeignKey(
+        AutomationRule,
+        on_delete=models.CASCADE,
+        related_name='metrics',
+    )
+    period_start = models.DateTimeField()
+    success = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    match_samples = models.PositiveIntegerField(default=0)
+    matched = models.PositiveIntegerField(default=0)
+    match_total_ms = models.FloatField(default=0)
+    match_max_ms = models.FloatField(default=0)
+    match_histogram = models.JSONField(default=list)
+    action_samples = models.PositiveIntegerField(default=0)
+    action_total_ms = models.FloatField(default=0)
+    action_max_ms = models.FloatField(default=0)
+    action_histogram = models.JSONField(default=list)
+    queries = models.PositiveIntegerField(default=0, help_text='Queries issued by sampled executions.')
+
+    class Meta:
+        db_table = 'jrd_automation_rule_metrics'
+        verbose_name = 'Automation Rule Metric'
+        verbose_name_plural = 'Automation Rule Metrics'
+        ordering = ['-period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['rule', 'period_start'],
+                name='uniq_rule_metric_period',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['period_start'], name='idx_rule_metric_period'),
+        ]
+
+    def __str__(self):
+        return f'{self.rule} @ {self.period_start:%Y-%m-%d %H:%M}'
+
+
+def generate_webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """
+    External URL that ``webhook`` actions post to. Deliveries are signed
+    with ``secret`` (HMAC-SHA256) and sent from a worker queue with at most
+    ``max_concurrency`` requests in flight to this endpoint.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField('Name', max_length=200)
+    url = models.URLField('URL', max_length=500)
+    secret = models.CharField(
+        'Signing Secret',
+        max_length=128,
+        default=generate_webhook_secret,
+        help_text='Shared secret for the X-JRD-Signature header.',
+    )
+    is_active = models.BooleanField('Active', default=True)
+    max_concurrency = models.PositiveSmallIntegerField(
+        'Max Concurrent Requests', default=4,
+    )
+    timeout_seconds = models.PositiveSmallIntegerField('Timeout (seconds)', default=10)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Max Attempts',
+        default=8,
+        help_text='Attempts before a delivery is moved to the dead-letter table.',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'jrd_webhook_endpoints'
+        verbose_name = 'Webhook Endpoint'
+        verbose_name_plural = 'Webhook Endpoints'
+        ordering = ['name']
+
+    def __str__(self):
+        return f'{self.name} ({self.url})'
+
+
+class WebhookDeadLetter(models.Model):
+    """A webhook delivery that failed permanently; kept for inspection and replay."""
+
+    id = models.BigAutoField(primary_key=True)
+    endpoint = models.ForeignKey(
+        WebhookEndpoint,
+        on_delete=models.CASCADE,
+        related_name='dead_letters',
+    )
+    delivery_id = models.UUIDField(db_index=True)
+    payload = models.JSONField(default=dict)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    failed_at = models.DateTimeField(default=timezone.now)
+    replayed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'jrd_webhook_dead_letters'
+        verbose_name = 'Webhook Dead Letter'
+        verbose_name_plural = 'Webhook Dead Letters'
+        ordering = ['-failed_at']
+        indexes = [
+            models.Index(fields=['endpoint', 'failed_at'], name='idx_webhook_dl_endpoint'),
+        ]
+
+    def __str__(self):
+        return f'{self.delivery_id} → {self.endpoint.name} ({self.attempts} attempts)'
@@ -4,9 +4,19 @@ Core engine that evaluates and executes automation rules against tickets.
 """
 
 import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
 
 from automation.models import AutomationRule, AutomationLog
+from automation.services.rule_engine import AutomationRuleEngine
+from automation.services.change_set import TicketChangeSet
+from automation.services.execution_guard import ExecutionGuard
+from automation.services.log_service import AutomationLogBuffer, AutomationLogService
+from automation.services.profiler import RuleProfiler
 from tickets.models import Ticket, TicketActivity
 
 logger = logging.getLogger('jeyaramadesk')
@@ -19,245 +29,274 @@ class AutomationService:
     def run_rules(trigger_event, ticket):
         """
         Evaluate all active rules for a given trigger event against a ticket.
-        Rules are evaluated in priority_order; stops if a rule has stop_processing=True.
+        Rules come from the compiled rule index in priority_order; matching
+        runs no queries. Stops after a matching rule with stop_processing=True.
         """
-        rules = AutomationRule.objects.filter(
-            trigger_event=trigger_event,
-            is_active=True,
-        ).order_by('priority_order')
-
-        for rule in rules:
-            if AutomationService._match_conditions(rule, ticket):
-                success = AutomationService._execute_action(rule, ticket)
-
-                # Log the execution
-                AutomationLog.objects.create(
-                    rule=rule,
-                    ticket=ticket,
-                    status=AutomationLog.Status.SUCCESS if success else AutomationLog.Status.FAILED,
-                    action_taken=f'{rule.get_action_type_display()} executed',
-                    error_message='' if success else 'Action execution failed',
-                )
+        index = AutomationRuleEngine.get_index()
+
+        if not RuleProfiler.sample():
+            for rule in index.match(trigger_event, ticket):
+                AutomationService.run_rule(rule, ticket, profile=False)
+            return
 
+        # Sampled: same walk as index.match(), timing each rule's predicate
+        for rule in index.rules_for(trigger_event):
+            started = time.perf_counter()
+            matched = rule.matches(ticket)
+            RuleProfiler.record_match(rule.id, (time.perf_counter() - started) * 1000, matched)
+            if matched:
+                AutomationService.run_rule(rule, ticket, profile=True)
                 if rule.stop_processing:
-                    break
+                    return
 
     @staticmethod
-    def _match_conditions(rule, ticket):
-        """
-        Check if a ticket matches the rule's conditions.
-        Conditions is a JSON dict where keys map to ticket fields.
+    def run_rule(rule, ticket, throttle=True, profile=None):
         """
-        conditions = rule.conditions
-        if not conditions:
-            return True  # No conditions = always match
+        Execute one compiled rule's actions on a ticket and log the outcome
+        (buffered when inside AutomationLogBuffer.collect()).
 
-        try:
-            for field, expected_value in conditions.items():
-                # Handle nested lookups (e.g., "category__name")
-                if '__' in field:
-                    parts = field.split('__')
-                    obj = ticket
-                    for part in parts:
-                        obj = getattr(obj, part, None)
-                    actual_value = obj
-                else:
-                    actual_value = getattr(ticket, field, None)
-
-                # Handle FK objects — compare by string or id
-                if hasattr(actual_value, 'pk'):
-                    actual_value = str(actual_value.pk)
-
-                if str(actual_value).lower() != str(expected_value).lower():
-                    return False
-            return True
-        except Exception as e:
-            logger.error(f'Automation condition match error: {e}')
+        The execution guard may skip the run (loop depth, rate limits;
+        ``throttle=False`` skips the rate limits). Skips are counted, and
+        the first one per rule per guard window is logged with status
+        ``skipped``.
+
+        ``profile`` times the actions and counts their queries for the
+        rule profiler; None lets the profiler sample.
+        """
+        skipped = ExecutionGuard.admit(rule, ticket, throttle=throttle)
+        if skipped:
+            RuleProfiler.record_outcome(rule.id, 'skipped')
+            previous = ExecutionGuard.skipped(rule.id)
+            if previous is None:
+                return False
+            # One row per rule per window, however many runs are suppressed
+            logger.warning(f'Automation rule "{rule.name}" skipped on ticket {ticket.ticket_id}: {skipped}')
+            minutes = getattr(settings, 'AUTOMATION_BREAKER_WINDOW_SECONDS', 300) // 60
+            message = f'{skipped}. Further skips in this {minutes}-minute window are counted, not logged'
+            if previous:
+                message += f' ({previous} skipped in the previous window)'
+            AutomationLogBuffer.add(AutomationLog(
+                rule_id=rule.id,
+                ticket=ticket,
+                status=AutomationLog.Status.SKIPPED,
+                action_taken=f'{rule.get_action_type_display()} skipped',
+                error_message=message,
+            ))
             return False
 
+        if profile is None:
+            profile = RuleProfiler.sample()
+        if profile:
+            started = time.perf_counter()
+            with RuleProfiler.count_queries() as queries:
+                success, error = AutomationService._execute_actions(rule, ticket)
+            RuleProfiler.record_action(rule.id, (time.perf_counter() - started) * 1000, queries[0])
+        else:
+            success, error = AutomationService._execute_actions(rule, ticket)
+        ExecutionGuard.record(rule, success)
+        RuleProfiler.record_outcome(rule.id, 'success' if success else 'failed')
+
+        # Log the execution
+        AutomationLogBuffer.add(AutomationLog(
+            rule_id=rule.id,
+            ticket=ticket,
+            status=AutomationLog.Status.SUCCESS if success else AutomationLog.Status.FAILED,
+            action_taken=f'{rule.get_action_type_display()} executed',
+            error_message='' if success else error,
+        ))
+        return success
+
+    @staticmethod
+    def handle_ticket_event(event, ticket):
+        """Ticket event bus subscriber: run the rules for the event's trigger."""
+        with AutomationLogBuffer.collect():
+            AutomationService.run_rules(event.event_type, ticket)
+
     @staticmethod
-    def _execute_action(rule, ticket):
-        """Execute the action defined in the automation rule."""
+    def _execute_actions(rule, ticket):
+        """
+        Apply all of the rule's actions to the ticket in memory, then write
+        them in one transaction (see TicketChangeSet). Either every action
+        is applied or none is.
+
+        Returns:
+            (success, error message)
+        """
+        changes = TicketChangeSet(ticket, rule)
         try:
-            action_type = rule.action_type
-            params = rule.action_params or {}
-
-            if action_type == AutomationRule.ActionType.ASSIGN_AGENT:
-                return AutomationService._action_assign_agent(ticket, params)
-            elif action_type == AutomationRule.ActionType.CHANGE_PRIORITY:
-                return AutomationService._action_change_priority(ticket, params)
-            elif action_type == AutomationRule.ActionType.CHANGE_STATUS:
-                return AutomationService._action_change_status(ticket, params)
-            elif action_type == AutomationRule.ActionType.ADD_TAG:
-                return AutomationService._action_add_tag(ticket, params)
-            elif action_type == AutomationRule.ActionType.ESCALATE:
-                return AutomationService._action_escalate(ticket, params)
-            elif action_type == AutomationRule.ActionType.ADD_COMMENT:
-                return AutomationService._action_add_comment(ticket, params)
-            elif action_type == AutomationRule.ActionType.SEND_NOTIFICATION:
-                return AutomationService._action_send_notification(ticket, params)
-            else:
-                logger.warning(f'Unknown action type: {action_type}')
-                return False
+            with transaction.atomic():
+                for action_type, params in rule.actions:
+                    handler = AutomationService.ACTION_HANDLERS.get(action_type)
+                    if handler is None:
+                        raise ValueError(f'Unknown action type: {action_type}')
+                    handler(changes, params or {})
+                changes.commit(title=f'Ticket {ticket.ticket_id} Updated')
+            return True, ''
         except Exception as e:
-            logger.error(f'Automation action error: {e}')
-            return False
+            changes.rollback()
+            logger.error(f'Automation action error in rule "{rule.name}" on ticket {ticket.ticket_id}: {e}')
+            return False, str(e) or 'Action execution failed'
 
     @staticmethod
-    def _action_assign_agent(ticket, params):
+    def _action_assign_agent(changes, params):
         """Assign ticket to a specific agent."""
         from accounts.models import User
         agent_id = params.get('agent_id')
         if not agent_id:
-            return False
+            raise ValueError('assign_agent requires "agent_id"')
         try:
             agent = User.objects.get(pk=agent_id, role__in=['agent', 'manager', 'superadmin'])
-            ticket.assigned_agent = agent
-            ticket.status = 'assigned'
-            ticket.save(update_fields=['assigned_agent', 'status', 'updated_at'])
-
-            TicketActivity.objects.create(
-                ticket=ticket,
-                activity_type='assigned',
-                description=f'Auto-assigned to {agent.full_name} by automation rule',
-            )
-            return True
         except User.DoesNotExist:
-            return False
+            raise ValueError(f'Agent {agent_id} not found')
+        ticket = changes.ticket
+        old_agent = ticket.assigned_agent
+        changes.set('assigned_agent_id', agent.pk)
+        ticket.assigned_agent = agent
+
+        changes.log(
+            TicketActivity.ActivityType.REASSIGNED if old_agent else TicketActivity.ActivityType.ASSIGNED,
+            f'Auto-assigned to {agent.full_name} by automation rule',
+            old_value=old_agent.full_name if old_agent else 'Unassigned',
+            new_value=agent.full_name,
+        )
+        changes.notify(agent, f'You have been assigned ticket {ticket.ticket_id}: {ticket.title}.')
 
     @staticmethod
-    def _action_change_priority(ticket, params):
+    def _action_change_priority(changes, params):
         """Change ticket priority."""
         new_priority = params.get('priority')
         if new_priority not in dict(Ticket.Priority.choices):
-            return False
+            raise ValueError(f'Invalid priority: {new_priority!r}')
+        ticket = changes.ticket
         old_priority = ticket.priority
-        ticket.priority = new_priority
-        ticket.save(update_fields=['priority', 'updated_at'])
+        changes.set('priority', new_priority)
 
-        TicketActivity.objects.create(
-            ticket=ticket,
-            activity_type='priority_changed',
-            old_value=old_priority,
-            new_value=new_priority,
-            description=f'Priority changed from {old_priority} to {new_priority} by automation',
+        changes.log(
+            TicketActivity.ActivityType.PRIORITY_CHANGED,
+            f'Priority changed from {old_priority} to {new_priority} by automation',
+            old_value=old_priority, new_value=new_priority,
         )
-        return True
+        line = f'Priority changed from {old_priority.title()} to {new_priority.title()}.'
+        changes.notify(ticket.customer, line)
+        changes.notify(ticket.assigned_agent, line)
 
     @staticmethod
-    def _action_change_status(ticket, params):
+    def _action_change_status(changes, params):
         """Change ticket status."""
         new_status = params.get('status')
         if new_status not in dict(Ticket.Status.choices):
-            return False
+            raise ValueError(f'Invalid status: {new_status!r}')
+        ticket = changes.ticket
         old_status = ticket.status
-        ticket.status = new_status
+        changes.set('status', new_status)
         if new_status in ('resolved', 'closed'):
-            ticket.resolved_at = timezone.now()
-        ticket.save(update_fields=['status', 'resolved_at', 'updated_at'])
+            changes.set('resolved_at', timezone.now())
 
-        TicketActivity.objects.create(
-            ticket=ticket,
-            activity_type='status_changed',
-            old_value=old_status,
-            new_value=new_status,
-            description=f'Status changed from {old_status} to {new_status} by automation',
+        changes.log(
+            TicketActivity.ActivityType.STATUS_CHANGED,
+            f'Status changed from {old_status} to {new_status} by automation',
+            old_value=old_status, new_value=new_status,
+        )
+        line = (
+            f'Status changed from {old_status.replace("_", " ").title()} '
+            f'to {new_status.replace("_", " ").title()}.'
         )
-        return True
+        changes.notify(ticket.customer, line)
+        changes.notify(ticket.assigned_agent, line)
 
     @staticmethod
-    def _action_add_tag(ticket, params):
+    def _action_add_tag(changes, params):
         """Add a tag to the ticket."""
         from tickets.models import Tag
         tag_name = params.get('tag')
         if not tag_name:
-            return False
+            raise ValueError('add_tag requires "tag"')
         tag, _ = Tag.objects.get_or_create(
             name=tag_name,
             defaults={'slug': tag_name.lower().replace(' ', '-')},
         )
-        ticket.tags.add(tag)
-        TicketActivity.objects.create(
-            ticket=ticket,
-            activity_type='tag_added',
+        changes.tags.append(tag)
+        changes.log(
+            TicketActivity.ActivityType.TAG_ADDED,
+            f'Tag "{tag_name}" added by automation',
             new_value=tag_name,
-            description=f'Tag "{tag_name}" added by automation',
         )
-        return True
 
     @staticmethod
-    def _action_escalate(ticket, params):
+    def _action_escalate(changes, params):
         """Escalate the ticket."""
-        ticket.is_escalated = True
-        ticket.escalation_level = min(ticket.escalation_level + 1, 3)
-        ticket.save(update_fields=['is_escalated', 'escalation_level', 'updated_at'])
+        ticket = changes.ticket
+        changes.set('is_escalated', True)
+        changes.set('escalation_level', min(ticket.escalation_level + 1, 3))
 
-        TicketActivity.objects.create(
-            ticket=ticket,
-            activity_type='escalated',
-            description=f'Escalated to level {ticket.escalation_level} by automation',
+        changes.log(
+            TicketActivity.ActivityType.ESCALATED,
+            f'Escalated to level {ticket.escalation_level} by automation',
         )
-        return True
+        changes.notify(ticket.assigned_agent, f'Escalated to level {ticket.escalation_level}.')
 
     @staticmethod
-    def _action_add_comment(ticket, params):
+    def _action_add_comment(changes, params):
         """Add an internal note to the ticket."""
-        from tickets.models import TicketComment
         message = params.get('message', 'Automated internal note')
-        TicketComment.objects.create(
-            ticket=ticket,
-            comment_type='internal_note',
-            body=message,
-        )
-        return True
+        changes.notes.append(message)
+        changes.notify(changes.ticket.assigned_agent, f'Internal note added: {message}')
+
+    @staticmethod
+    def _action_send_notification(changes, params):
+        """Queue a message for the coalesced notification."""
+        ticket = changes.ticket
+        message = params.get('message', f'Automation triggered for ticket {ticket.ticket_id}')
+        recipients = params.get('recipients', 'agent')
+
+        if recipients == 'agent':
+            changes.notify(ticket.assigned_agent, message)
+        elif recipients == 'customer':
+            changes.notify(ticket.customer, message)
 
     @staticmethod
-    def _action_send_notification(ticket, params):
-        """Send a notification (delegates to notification service)."""
+    def _action_webhook(changes, params):
+        """Queue a signed delivery to a webhook endpoint (sent after commit)."""
+        from automation.models import WebhookEndpoint
+        endpoint_id = params.get('endpoint_id')
+        if not endpoint_id:
+            raise ValueError('webhook requires "endpoint_id"')
         try:
-            from notifications.services.notification_service import NotificationService
-            message = params.get('message', f'Automation triggered for ticket {ticket.ticket_id}')
-            recipients = params.get('recipients', 'agent')
-
-            if recipients == 'agent' and ticket.assigned_agent:
-                NotificationService.create_notification(
-                    user=ticket.assigned_agent,
-                    title='Automation Alert',
-                    message=message,
-                    notification_type='automation',
-                    ticket=ticket,
-                )
-            elif recipients == 'customer' and ticket.customer:
-                NotificationService.create_notification(
-                    user=ticket.customer,
-                    title='Ticket Update',
-                    message=message,
-                    notification_type='automation',
-                    ticket=ticket,
-                )
-            return True
-        except Exception as e:
-            logger.error(f'Notification action error: {e}')
-            return False
+            endpoint = WebhookEndpoint.objects.only('id').get(pk=endpoint_id, is_active=True)
+        except (WebhookEndpoint.DoesNotExist, ValidationError):
+            raise ValueError(f'Webhook endpoint {endpoint_id} not found or inactive')
+        if endpoint.pk not in changes.webhooks:
+            changes.webhooks.append(endpoint.pk)
+
+    ACTION_HANDLERS = {
+        AutomationRule.ActionType.ASSIGN_AGENT: _action_assign_agent,
+        AutomationRule.ActionType.CHANGE_PRIORITY: _action_change_priority,
+        AutomationRule.ActionType.CHANGE_STATUS: _action_change_status,
+        AutomationRule.ActionType.ADD_TAG: _action_add_tag,
+        AutomationRule.ActionType.ESCALATE: _action_escalate,
+        AutomationRule.ActionType.ADD_COMMENT: _action_add_comment,
+        AutomationRule.ActionType.SEND_NOTIFICATION: _action_send_notification,
+        AutomationRule.ActionType.WEBHOOK: _action_webhook,
+    }
 
     @staticmethod
     def get_rule_stats():
-        """Return automation rule statistics."""
-        from django.db.models import Count, Q
+        """
+        Return automation rule statistics. Execution counts come from the
+        daily rollup counters plus today's raw logs.
+        """
+        from automation.services.idle_sweep import IdleSweepService
 
         total_rules = AutomationRule.objects.count()
         active_rules = AutomationRule.objects.filter(is_active=True).count()
 
-        log_stats = AutomationLog.objects.aggregate(
-            total_executions=Count('id'),
-            successful=Count('id', filter=Q(status='success')),
-            failed=Count('id', filter=Q(status='failed')),
-        )
+        log_stats = AutomationLogService.get_totals()
 
         return {
             'total_rules': total_rules,
             'active_rules': active_rules,
-            'total_executions': log_stats['total_executions'],
-            'successful_executions': log_stats['successful'],
+            'total_executions': log_stats['total'],
+            'successful_executions': log_stats['success'],
             'failed_executions': log_stats['failed'],
+            'idle_backlog': IdleSweepService.get_backlog(),
         }
@@ -0,0 +1,138 @@
+"""
+JeyaRamaDesk — Automation Change Set
+Collects everything one rule run does to a ticket so that all of its
+actions are written together:
+
+- field changes are applied to the ticket in memory and saved with a
+  single ``save(update_fields=...)``;
+- activity entries and internal notes are written with one bulk insert each;
+- notification lines are grouped per recipient and sent as one
+  notification each, after the transaction commits;
+- webhook deliveries are queued after the transaction commits, with a
+  snapshot of the ticket as the rule left it.
+
+The ticket's own change notifications (status, priority, assignment
+signals) are skipped for that save; the coalesced notification
+replaces them.
+"""
+
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+
+from tickets.models import TicketActivity, TicketComment
+
+logger = logging.getLogger('jeyaramadesk')
+
+
+class TicketChangeSet:
+    """Pending changes of one automation rule run against one ticket."""
+
+    def __init__(self, ticket, rule=None):
+        self.ticket = ticket
+        self.rule = rule
+        self._original = {}
+        self.activities = []
+        self.tags = []
+        self.notes = []
+        self.messages = defaultdict(list)
+        self.webhooks = []
+
+    # ── Collecting ────────────────────────────────────────────
+
+    def set(self, attname, value):
+        """Change a ticket field in memory, remembering its first value."""
+        if attname not in self._original:
+            self._original[attname] = getattr(self.ticket, attname)
+        setattr(self.ticket, attname, value)
+
+    def old(self, attname):
+        """Value of a field before this change set touched it."""
+        return self._original.get(attname, getattr(self.ticket, attname))
+
+    def log(self, activity_type, description, old_value='', new_value=''):
+        self.activities.append(TicketActivity(
+            ticket=self.ticket,
+            activity_type=activity_type,
+            old_value=old_value,
+            new_value=new_value,
+            description=description,
+        ))
+
+    def notify(self, user, line):
+        """Queue a line for ``user``'s coalesced notification."""
+        if user is not None and line not in self.messages[user]:
+            self.messages[user].append(line)
+
+    @property
+    def changed_fields(self):
+        return [
+            name for name, old in self._original.items()
+            if getattr(self.ticket, name) != old
+        ]
+
+    # ── Writing ───────────────────────────────────────────────
+
+    @transaction.atomic
+    def commit(self, title):
+        """Write all collected changes; notifications go out on commit."""
+        ticket = self.ticket
+        fields = self.changed_fields
+        if fields:
+            ticket._skip_change_notifications = True
+            try:
+                ticket.save(update_fields=fields + ['updated_at'])
+            finally:
+                ticket._skip_change_notifications = False
+
+        if self.activities:
+            TicketActivity.objects.bulk_create(self.activities)
+        if self.tags:
+            ticket.tags.add(*self.tags)
+        if self.notes:
+            # Bulk insert skips comment signals: no self-triggered events,
+            # and the note is announced in the coalesced notification.
+            TicketComment.objects.bulk_create([
+                TicketComment(
+                    ticket=ticket,
+                    comment_type=TicketComment.CommentType.INTERNAL_NOTE,
+                    content=note,
+                )
+                for note in self.notes
+            ])
+
+        messages = {user: list(lines) for user, lines in self.messages.items()}
+        if messages:
+            transaction.on_commit(lambda: self._send(ticket, title, messages))
+        if self.webhooks:
+            from automation.services.webhooks import WebhookDispatcher
+            payload = WebhookDispatcher.build_payload(ticket, self.rule, fields)
+            for endpoint_id in self.webhooks:
+                transaction.on_commit(
+                    lambda endpoint_id=endpoint_id: WebhookDispatcher.enqueue(endpoint_id, payload)
+                )
+
+    def rollback(self):
+        """Restore the in-memory ticket after a failed run."""
+        for attname, value in self._original.items():
+            setattr(self.ticket, attname, value)
+        self._original.clear()
+
+    @staticmethod
+    def _send(ticket, title, messages):
+        from notifications.models import Notification
+        from notifications.services.notification_service import NotificationService
+        try:
+            NotificationService.create_bulk([
+                Notification(
+                    user=user,
+                    title=title,
+                    message=' '.join(lines),
+                    notification_type='automation',
+                    ticket=ticket,
+                )
+                for user, lines in messages.items()
+            ])
+        except Exception as e:
+            logger.error(f'Automation notifications for ticket {ticket.ticket_id} failed: {e}')
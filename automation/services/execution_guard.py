@@ -0,0 +1,231 @@
+"""
+JeyaRamaDesk — Automation Execution Guard
+Protects the platform from runaway automation rules.
+
+Loop protection:
+    Ticket changes made by a rule emit ticket events one level deeper
+    than the event that triggered the rule (see tickets.events). Rules
+    are not run for events deeper than AUTOMATION_MAX_DEPTH, which stops
+    "A changes priority → B changes status → A again" chains.
+
+Rate limits:
+    Event-triggered executions take a token from two cache-backed token
+    buckets: one per rule (AUTOMATION_RULE_BURST, refilled at
+    AUTOMATION_RULE_RATE_PER_MINUTE) and one per ticket
+    (AUTOMATION_TICKET_BURST / AUTOMATION_TICKET_RATE_PER_MINUTE). An
+    empty bucket skips the execution. Bucket updates are read-modify-write,
+    so concurrent workers can overshoot by a few tokens. That is fine for
+    storm protection.
+
+Circuit breaker:
+    Outcomes are counted per rule in fixed windows of
+    AUTOMATION_BREAKER_WINDOW_SECONDS. Once a window has at least
+    AUTOMATION_BREAKER_MIN_RUNS executions and the failure ratio reaches
+    AUTOMATION_BREAKER_FAILURE_RATE, the rule is switched off and marked
+    with ``disabled_at`` / ``disabled_reason`` until someone re-enables it.
+
+Skip logging:
+    Skips (loop protection or rate limits) are counted in the cache. Only
+    the first skip of a rule per breaker window writes an AutomationLog
+    row; it also carries the count of the rule's previous window. A rule
+    storm therefore costs cache increments, not one insert per
+    suppressed run. Per-hour skip counts show on the rule list.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from tickets.events import TicketEventBus
+
+logger = logging.getLogger('jeyaramadesk')
+
+THROTTLE_COUNTER_TTL = 3600
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _bucket_key(kind, key):
+    return f'automation:guard:bucket:{kind}:{key}'
+
+
+def _window():
+    return int(time.time() // _setting('AUTOMATION_BREAKER_WINDOW_SECONDS', 300))
+
+
+def _outcome_keys(rule_id, window):
+    prefix = f'automation:guard:outcomes:{rule_id}:{window}'
+    return f'{prefix}:runs', f'{prefix}:failed'
+
+
+def _throttle_key(rule_id):
+    return f'automation:guard:throttled:{rule_id}:{int(time.time() // THROTTLE_COUNTER_TTL)}'
+
+
+def _skip_key(rule_id, window):
+    return f'automation:guard:skips:{rule_id}:{window}'
+
+
+def _incr(key, timeout):
+    """Atomic increment, creating the counter if needed."""
+    if cache.add(key, 1, timeout):
+        return 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, 1, timeout)
+        return 1
+
+
+class TokenBucket:
+    """Cache-backed token bucket: ``capacity`` tokens refilled at ``per_minute``."""
+
+    def __init__(self, key, capacity, per_minute):
+        self.key = key
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+
+    def _refilled(self, state, now):
+        if state is None:
+            return float(self.capacity)
+        tokens, stamp = state
+        return min(float(self.capacity), tokens + (now - stamp) * self.rate)
+
+    def take(self):
+        """Take one token. Returns False (and takes nothing) when empty."""
+        now = time.time()
+        tokens = self._refilled(cache.get(self.key), now)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # Keep the state until the bucket would be full again
+        timeout = int((self.capacity - tokens) / self.rate) + 60 if self.rate else None
+        cache.set(self.key, (tokens, now), timeout)
+        return allowed
+
+    def available(self, state):
+        """Tokens available given a cached ``state`` (None = untouched bucket)."""
+        return int(self._refilled(state, time.time()))
+
+
+class ExecutionGuard:
+    """Admission control and failure tracking for automation rule runs."""
+
+    @staticmethod
+    def rule_bucket(rule_id):
+        return TokenBucket(
+            _bucket_key('rule', rule_id),
+            _setting('AUTOMATION_RULE_BURST', 200),
+            _setting('AUTOMATION_RULE_RATE_PER_MINUTE', 600),
+        )
+
+    @staticmethod
+    def ticket_bucket(ticket_id):
+        return TokenBucket(
+            _bucket_key('ticket', ticket_id),
+            _setting('AUTOMATION_TICKET_BURST', 10),
+            _setting('AUTOMATION_TICKET_RATE_PER_MINUTE', 30),
+        )
+
+    @staticmethod
+    def admit(rule, ticket, throttle=True):
+        """
+        Decide whether a rule may run on a ticket now.
+
+        Returns:
+            None when admitted, otherwise the reason it was skipped.
+        """
+        depth = TicketEventBus.current_depth()
+        max_depth = _setting('AUTOMATION_MAX_DEPTH', 3)
+        if depth >= max_depth:
+            return f'Loop protection: event depth {depth} reached the limit of {max_depth}'
+
+        if not throttle:
+            return None
+        if not ExecutionGuard.ticket_bucket(ticket.pk).take():
+            return f'Rate limited: too many automation runs on ticket {ticket.ticket_id}'
+        if not ExecutionGuard.rule_bucket(rule.id).take():
+            return 'Rate limited: rule is firing faster than its limit'
+        return None
+
+    @staticmethod
+    def skipped(rule_id):
+        """
+        Count a skipped execution.
+
+        Returns:
+            None when the skip should not be logged (the rule already has a
+            log row in this window), otherwise the number of skips counted
+            in the rule's previous window.
+        """
+        window = _window()
+        ttl = _setting('AUTOMATION_BREAKER_WINDOW_SECONDS', 300) * 2
+        _incr(_throttle_key(rule_id), THROTTLE_COUNTER_TTL)
+        if _incr(_skip_key(rule_id, window), ttl) > 1:
+            return None
+        return cache.get(_skip_key(rule_id, window - 1), 0)
+
+    @staticmethod
+    def record(rule, success):
+        """Count an execution outcome and trip the breaker if the failure rate spikes."""
+        ttl = _setting('AUTOMATION_BREAKER_WINDOW_SECONDS', 300) * 2
+        runs_key, failed_key = _outcome_keys(rule.id, _window())
+        runs = _incr(runs_key, ttl)
+        if success:
+            return
+        failed = _incr(failed_key, ttl)
+
+        min_runs = _setting('AUTOMATION_BREAKER_MIN_RUNS', 20)
+        max_rate = _setting('AUTOMATION_BREAKER_FAILURE_RATE', 0.5)
+        if runs >= min_runs and failed / runs >= max_rate:
+            ExecutionGuard.trip(rule, f'{failed} of {runs} executions failed within '
+                                      f'{_setting("AUTOMATION_BREAKER_WINDOW_SECONDS", 300) // 60} minutes')
+
+    @staticmethod
+    def trip(rule, reason):
+        """Switch a rule off and record why."""
+        from automation.models import AutomationRule
+        from automation.services.rule_engine import AutomationRuleEngine
+
+        tripped = AutomationRule.objects.filter(pk=rule.id, is_active=True).update(
+            is_active=False,
+            disabled_at=timezone.now(),
+            disabled_reason=f'Circuit breaker: {reason}'[:255],
+        )
+        if tripped:
+            # update() skips the post_save signal that normally bumps the index
+            transaction.on_commit(AutomationRuleEngine.invalidate)
+            logger.error(f'Automation rule "{rule.name}" ({rule.id}) auto-disabled: {reason}')
+
+    @staticmethod
+    def get_status(rule_ids):
+        """
+        Guard state per rule for the rule list: tokens left, executions
+        skipped this hour, and runs / failures in the current breaker window.
+        """
+        window = _window()
+        keys = {}
+        for rule_id in rule_ids:
+            runs_key, failed_key = _outcome_keys(rule_id, window)
+            keys[rule_id] = (_bucket_key('rule', rule_id), _throttle_key(rule_id), runs_key, failed_key)
+        values = cache.get_many([key for group in keys.values() for key in group])
+
+        status = {}
+        for rule_id, (bucket_key, throttle_key, runs_key, failed_key) in keys.items():
+            runs = values.get(runs_key, 0)
+            failed = values.get(failed_key, 0)
+            status[rule_id] = {
+                'tokens': ExecutionGuard.rule_bucket(rule_id).available(values.get(bucket_key)),
+                'throttled': values.get(throttle_key, 0),
+                'window_runs': runs,
+                'window_failed': failed,
+                'failure_rate': round(failed / runs * 100) if runs else 0,
+            }
+        return status
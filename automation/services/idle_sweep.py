@@ -0,0 +1,171 @@
+"""
+JeyaRamaDesk — Idle Ticket Sweep
+Finds tickets that have gone idle for each active ``ticket_idle`` rule and
+fans them out to Celery workers in chunks.
+
+Each rule keeps a cursor (``IdleSweepCursor``) over tickets in
+(updated_at, id) order. A sweep only reads tickets between the cursor and
+``now - rule.idle_threshold_hours``, so every ticket is evaluated once per
+idle window. New activity moves the ticket past the cursor, and it is
+evaluated again once it goes idle again. Chunks go to their own queue
+(``AUTOMATION_IDLE_QUEUE``), and each run dispatches at most
+``AUTOMATION_IDLE_MAX_CHUNKS`` chunks, shared round-robin between rules,
+so a large backlog drains over several runs without starving other work.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from automation.models import AutomationRule, IdleSweepCursor
+from automation.services.automation_service import AutomationService
+from automation.services.log_service import AutomationLogBuffer
+from automation.services.rule_engine import AutomationRuleEngine
+from tickets.events import TicketEventBus
+from tickets.models import Ticket
+
+logger = logging.getLogger('jeyaramadesk')
+
+OPEN_STATUSES = ('open', 'in_progress', 'pending')
+
+SWEEP_LOCK_KEY = 'automation:idle_sweep:lock'
+SWEEP_LOCK_TIMEOUT = 300
+
+
+class IdleSweepService:
+    """Cursor-based planner and chunk worker for ``ticket_idle`` rules."""
+
+    @staticmethod
+    def sweep():
+        """
+        Dispatch chunks of newly idle tickets for every idle rule and
+        advance the rule cursors. Returns a summary dict.
+        """
+        rules = AutomationRuleEngine.get_index().rules_for(AutomationRule.TriggerEvent.TICKET_IDLE)
+        if not rules:
+            return {'rules': 0, 'chunks': 0, 'tickets': 0, 'backlog': 0}
+
+        if not cache.add(SWEEP_LOCK_KEY, 1, SWEEP_LOCK_TIMEOUT):
+            logger.info('Idle sweep: previous run still in progress, skipping.')
+            return {'rules': len(rules), 'chunks': 0, 'tickets': 0, 'backlog': None}
+
+        try:
+            return IdleSweepService._sweep(rules)
+        finally:
+            cache.delete(SWEEP_LOCK_KEY)
+
+    @staticmethod
+    def _sweep(rules):
+        from automation.tasks import process_idle_ticket_chunk
+
+        chunk_size = getattr(settings, 'AUTOMATION_IDLE_CHUNK_SIZE', 500)
+        budget = getattr(settings, 'AUTOMATION_IDLE_MAX_CHUNKS', 200)
+        queue = getattr(settings, 'AUTOMATION_IDLE_QUEUE', None) or None
+        now = timezone.now()
+
+        cursors = {}
+        for rule in rules:
+            cursors[rule.id], _ = IdleSweepCursor.objects.get_or_create(rule_id=rule.id)
+
+        chunks = tickets = 0
+        pending = list(rules)
+        while pending and budget > 0:
+            for rule in list(pending):
+                if budget <= 0:
+                    break
+                cursor = cursors[rule.id]
+                rows = list(
+                    IdleSweepService._idle_tickets(rule, cursor, now)
+                    .values_list('id', 'updated_at')[:chunk_size]
+                )
+                if not rows:
+                    pending.remove(rule)
+                    continue
+                process_idle_ticket_chunk.apply_async(
+                    args=[str(rule.id), [row[0] for row in rows]], queue=queue,
+                )
+                cursor.last_ticket_id, cursor.last_updated_at = rows[-1]
+                chunks += 1
+                tickets += len(rows)
+                budget -= 1
+                if len(rows) < chunk_size:
+                    pending.remove(rule)
+
+        backlog = 0
+        for rule in rules:
+            cursor = cursors[rule.id]
+            cursor.backlog = (
+                IdleSweepService._idle_tickets(rule, cursor, now).count()
+                if rule in pending else 0
+            )
+            cursor.swept_at = now
+            cursor.save(update_fields=['last_updated_at', 'last_ticket_id', 'backlog', 'swept_at'])
+            backlog += cursor.backlog
+
+        if backlog:
+            logger.warning(f'Idle sweep: {backlog} idle tickets still queued behind the cursors.')
+        logger.info(f'Idle sweep: dispatched {tickets} tickets in {chunks} chunks for {len(rules)} rules.')
+        return {'rules': len(rules), 'chunks': chunks, 'tickets': tickets, 'backlog': backlog}
+
+    @staticmethod
+    def _idle_tickets(rule, cursor, now):
+        """Open tickets idle past the rule's threshold and beyond its cursor."""
+        qs = Ticket.objects.filter(
+            status__in=OPEN_STATUSES,
+            updated_at__lte=now - timedelta(hours=rule.idle_threshold_hours),
+        )
+        if cursor.last_updated_at:
+            qs = qs.filter(
+                Q(updated_at__gt=cursor.last_updated_at)
+                | Q(updated_at=cursor.last_updated_at, id__gt=cursor.last_ticket_id)
+            )
+        return qs.order_by('updated_at', 'id')
+
+    @staticmethod
+    def process_chunk(rule_id, ticket_ids):
+        """
+        Run one idle rule over a chunk of tickets (on a worker). Tickets that
+        saw activity since the chunk was planned are skipped.
+
+        Returns:
+            Number of tickets the rule fired on.
+        """
+        index = AutomationRuleEngine.get_index()
+        rule = index.get_rule(uuid.UUID(str(rule_id)))
+        if rule is None or rule.trigger_event != AutomationRule.TriggerEvent.TICKET_IDLE:
+            return 0
+
+        cutoff = timezone.now() - timedelta(hours=rule.idle_threshold_hours)
+        tickets = Ticket.objects.filter(
+            id__in=ticket_ids,
+            status__in=OPEN_STATUSES,
+            updated_at__lte=cutoff,
+        )
+        related = index.related_for(rule.trigger_event)
+        if related:
+            # select_related() with no arguments would follow every relation
+            tickets = tickets.select_related(*related)
+
+        fired = 0
+        # Changes made by the rule must not trigger ticket_updated rules.
+        # Chunks are already paced by the sweep, so no rate limits here;
+        # the circuit breaker still applies.
+        with TicketEventBus.muted(), AutomationLogBuffer.collect():
+            for ticket in tickets:
+                if rule.matches(ticket):
+                    AutomationService.run_rule(rule, ticket, throttle=False)
+                    fired += 1
+        return fired
+
+    @staticmethod
+    def get_backlog():
+        """Total idle tickets waiting behind the cursors as of the last sweep."""
+        from django.db.models import Sum
+        return IdleSweepCursor.objects.filter(
+            rule__is_active=True,
+        ).aggregate(total=Sum('backlog'))['total'] or 0
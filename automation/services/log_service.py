@@ -0,0 +1,197 @@
+"""
+JeyaRamaDesk — Automation Log Service
+Buffered writes to jrd_automation_logs, daily per-rule rollups, and
+retention.
+
+Inside ``AutomationLogBuffer.collect()`` rule executions are appended
+to a thread-local buffer and written with one ``bulk_create`` when the
+outermost block exits (or every AUTOMATION_LOG_BUFFER_SIZE rows).
+Outside a collect block each log is written immediately, as before.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from automation.models import AutomationLog, AutomationRuleDailyStat
+
+logger = logging.getLogger('jeyaramadesk')
+
+
+class AutomationLogBuffer:
+    """Thread-local buffer of pending AutomationLog rows."""
+
+    _local = threading.local()
+
+    @classmethod
+    @contextmanager
+    def collect(cls):
+        """Buffer logs written in this block; flush when the outermost block exits."""
+        local = cls._local
+        local.depth = getattr(local, 'depth', 0) + 1
+        if local.depth == 1:
+            local.rows = []
+        try:
+            yield
+        finally:
+            local.depth -= 1
+            if local.depth == 0:
+                cls.flush()
+
+    @classmethod
+    def add(cls, log):
+        """Queue a log row, or save it at once when no buffer is active."""
+        local = cls._local
+        if not getattr(local, 'depth', 0):
+            log.save()
+            return
+        local.rows.append(log)
+        if len(local.rows) >= getattr(settings, 'AUTOMATION_LOG_BUFFER_SIZE', 500):
+            cls.flush()
+
+    @classmethod
+    def flush(cls):
+        """Write all buffered rows in one bulk insert."""
+        rows = getattr(cls._local, 'rows', None)
+        if not rows:
+            return 0
+        cls._local.rows = []
+        try:
+            AutomationLog.objects.bulk_create(rows, batch_size=1000)
+        except Exception as e:
+            # Losing audit rows must never fail the automation run itself
+            logger.error(f'Automation log flush failed ({len(rows)} rows dropped): {e}')
+            return 0
+        return len(rows)
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+class AutomationLogService:
+    """Daily rollups, retention and statistics for automation logs."""
+
+    @staticmethod
+    def rollup():
+        """
+        Compact every complete (local) day not yet rolled up into
+        AutomationRuleDailyStat rows, one transaction per day.
+
+        Returns:
+            Number of days that had logs to roll up.
+        """
+        today = timezone.localdate()
+        last_day = AutomationRuleDailyStat.objects.aggregate(last=Max('day'))['last']
+        if last_day:
+            first_day = last_day + timedelta(days=1)
+        else:
+            first_at = AutomationLog.objects.aggregate(first=Min('executed_at'))['first']
+            if first_at is None:
+                return 0
+            first_day = timezone.localtime(first_at).date()
+
+        day = first_day
+        days = 0
+        while day < today:
+            counts = AutomationLog.objects.filter(
+                executed_at__gte=_start_of_day(day),
+                executed_at__lt=_start_of_day(day + timedelta(days=1)),
+            ).order_by().values('rule_id').annotate(
+                n_success=Count('id', filter=Q(status=AutomationLog.Status.SUCCESS)),
+                n_failed=Count('id', filter=Q(status=AutomationLog.Status.FAILED)),
+                n_skipped=Count('id', filter=Q(status=AutomationLog.Status.SKIPPED)),
+            )
+            rows = list(counts)
+            if rows:
+                with transaction.atomic():
+                    AutomationRuleDailyStat.objects.filter(day=day).delete()
+                    AutomationRuleDailyStat.objects.bulk_create([
+                        AutomationRuleDailyStat(
+                            rule_id=row['rule_id'], day=day,
+                            success=row['n_success'], failed=row['n_failed'],
+                            skipped=row['n_skipped'],
+                        )
+                        for row in rows
+                    ])
+                days += 1
+            day += timedelta(days=1)
+
+        if days:
+            logger.info(f'Automation logs: rolled up {days} days.')
+        return days
+
+    @staticmethod
+    def rolled_up_until():
+        """Start of the first day not covered by the daily counters (or None)."""
+        last_day = AutomationRuleDailyStat.objects.aggregate(last=Max('day'))['last']
+        return _start_of_day(last_day + timedelta(days=1)) if last_day else None
+
+    @staticmethod
+    def purge(batch_size=5000):
+        """
+        Delete raw logs older than AUTOMATION_LOG_RETENTION_DAYS whose day has
+        already been rolled up, in id batches to keep lock times short.
+
+        Returns:
+            Number of rows deleted.
+        """
+        boundary = AutomationLogService.rolled_up_until()
+        if boundary is None:
+            return 0
+        retention_days = getattr(settings, 'AUTOMATION_LOG_RETENTION_DAYS', 30)
+        cutoff = min(
+            boundary,
+            _start_of_day(timezone.localdate() - timedelta(days=retention_days)),
+        )
+
+        deleted = 0
+        while True:
+            ids = list(AutomationLog.objects.filter(
+                executed_at__lt=cutoff,
+            ).order_by('executed_at').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            AutomationLog.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+
+        if deleted:
+            logger.info(f'Automation logs: purged {deleted} rows older than {cutoff:%Y-%m-%d}.')
+        return deleted
+
+    @staticmethod
+    def get_totals(rule_id=None):
+        """
+        Execution counts: rolled-up days from the counters plus the raw
+        logs after the last rolled-up day (usually just today).
+        """
+        counters = AutomationRuleDailyStat.objects.all()
+        logs = AutomationLog.objects.all()
+        if rule_id is not None:
+            counters = counters.filter(rule_id=rule_id)
+            logs = logs.filter(rule_id=rule_id)
+
+        totals = counters.aggregate(
+            success=Coalesce(Sum('success'), 0),
+            failed=Coalesce(Sum('failed'), 0),
+            skipped=Coalesce(Sum('skipped'), 0),
+        )
+        boundary = AutomationLogService.rolled_up_until()
+        if boundary is not None:
+            logs = logs.filter(executed_at__gte=boundary)
+        recent = logs.aggregate(
+            success=Count('id', filter=Q(status=AutomationLog.Status.SUCCESS)),
+            failed=Count('id', filter=Q(status=AutomationLog.Status.FAILED)),
+            skipped=Count('id', filter=Q(status=AutomationLog.Status.SKIPPED)),
+        )
+        for key in totals:
+            totals[key] += recent[key]
+        totals['total'] = totals['success'] + totals['failed'] + totals['skipped']
+        return totals
@@ -0,0 +1,314 @@
+"""
+JeyaRamaDesk — Automation Rule Profiler
+Per-rule latency metrics for automation, cheap enough to leave on.
+
+Each process keeps in-memory histograms per rule:
+
+- match time: evaluating the rule's compiled conditions against a ticket
+  (event-triggered rules, see AutomationService.run_rules);
+- action time and queries issued: executing the rule's actions;
+- outcomes: success / failed / skipped.
+
+Outcomes are counted for every execution. Timings and query counts are
+recorded for a sample of AUTOMATION_PROFILER_SAMPLE_RATE of rule
+evaluations (1.0 = all). A sampled execution counts its queries with a
+connection execute wrapper, so unsampled executions pay nothing.
+
+Every AUTOMATION_PROFILER_FLUSH_SECONDS the process merges its
+histograms into ``AutomationRuleMetric`` rows, one per rule per
+AUTOMATION_PROFILER_PERIOD_MINUTES period, after the current transaction
+commits. Rows older than AUTOMATION_PROFILER_RETENTION_DAYS are purged
+by the daily log rollup.
+"""
+
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger('jeyaramadesk')
+
+# Upper bounds (ms) of the histogram buckets; a last bucket catches the rest
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class _Histogram:
+    __slots__ = ('count', 'total', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, ms):
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+
+
+class _RuleStats:
+    __slots__ = ('match', 'matched', 'action', 'queries', 'success', 'failed', 'skipped')
+
+    def __init__(self):
+        self.match = _Histogram()
+        self.matched = 0
+        self.action = _Histogram()
+        self.queries = 0
+        self.success = 0
+        self.failed = 0
+        self.skipped = 0
+
+
+def merge_histograms(into, other):
+    """Add bucket counts of ``other`` to ``into`` (lists, possibly empty)."""
+    if not into:
+        return list(other or [])
+    return [a + b for a, b in zip(into, other or [0] * len(into))]
+
+
+def percentile(histogram, fraction, maximum):
+    """
+    Upper bucket bound (ms) below which ``fraction`` of the samples fall;
+    ``maximum`` stands in for the open-ended last bucket.
+    """
+    total = sum(histogram or ())
+    if not total:
+        return None
+    target = total * fraction
+    seen = 0
+    for bound, count in zip(BUCKETS_MS, histogram):
+        seen += count
+        if seen >= target:
+            return min(bound, round(maximum, 3))
+    return round(maximum, 3)
+
+
+class RuleProfiler:
+    """Process-wide, thread-safe collector of rule execution metrics."""
+
+    _lock = threading.Lock()
+    _stats = {}
+    _last_flush = time.monotonic()
+    _flush_scheduled = None  # when a not-yet-run flush was scheduled
+
+    # ── Recording ─────────────────────────────────────────────
+
+    @staticmethod
+    def sample():
+        """Decide whether to time this evaluation."""
+        if not _setting('AUTOMATION_PROFILER_ENABLED', True):
+            return False
+        rate = _setting('AUTOMATION_PROFILER_SAMPLE_RATE', 0.1)
+        return rate >= 1 or random.random() < rate
+
+    @classmethod
+    def _rule(cls, rule_id):
+        stats = cls._stats.get(rule_id)
+        if stats is None:
+            stats = cls._stats[rule_id] = _RuleStats()
+        return stats
+
+    @classmethod
+    def record_match(cls, rule_id, ms, matched):
+        with cls._lock:
+            stats = cls._rule(rule_id)
+            stats.match.add(ms)
+            stats.matched += matched
+
+    @classmethod
+    def record_action(cls, rule_id, ms, queries):
+        with cls._lock:
+            stats = cls._rule(rule_id)
+            stats.action.add(ms)
+            stats.queries += queries
+
+    @classmethod
+    def record_outcome(cls, rule_id, outcome):
+        """Count an execution outcome ('success', 'failed' or 'skipped')."""
+        if not _setting('AUTOMATION_PROFILER_ENABLED', True):
+            return
+        with cls._lock:
+            stats = cls._rule(rule_id)
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+        cls.maybe_flush()
+
+    @staticmethod
+    @contextmanager
+    def count_queries():
+        """Count queries run on the default connection inside the block."""
+        counter = [0]
+
+        def wrapper(execute, sql, params, many, context):
+            counter[0] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            yield counter
+
+    # ── Flushing ──────────────────────────────────────────────
+
+    @classmethod
+    def maybe_flush(cls):
+        """
+        Schedule a flush (after commit) once the flush interval has passed.
+        A flush scheduled in a transaction that rolls back never runs, so
+        a schedule older than one interval no longer holds the next one back.
+        """
+        interval = _setting('AUTOMATION_PROFILER_FLUSH_SECONDS', 60)
+        now = time.monotonic()
+        with cls._lock:
+            if now - cls._last_flush < interval:
+                return
+            if cls._flush_scheduled is not None and now - cls._flush_scheduled < interval:
+                return
+            cls._flush_scheduled = now
+        transaction.on_commit(cls.flush)
+
+    @classmethod
+    def flush(cls):
+        """
+        Merge this process's histograms into the current period's metric
+        rows and reset them. Returns the number of rules written.
+        """
+        from automation.models import AutomationRule, AutomationRuleMetric
+
+        with cls._lock:
+            stats, cls._stats = cls._stats, {}
+            cls._last_flush = time.monotonic()
+            cls._flush_scheduled = None
+        if not stats:
+            return 0
+
+        period = _setting('AUTOMATION_PROFILER_PERIOD_MINUTES', 5)
+        now = timezone.now()
+        period_start = now.replace(minute=now.minute - now.minute % period, second=0, microsecond=0)
+
+        try:
+            # Rules deleted since they ran are dropped
+            rule_ids = set(AutomationRule.objects.filter(id__in=list(stats)).values_list('id', flat=True))
+            with transaction.atomic():
+                AutomationRuleMetric.objects.bulk_create(
+                    [AutomationRuleMetric(rule_id=rule_id, period_start=period_start) for rule_id in rule_ids],
+                    ignore_conflicts=True,
+                )
+                rows = list(
+                    AutomationRuleMetric.objects.select_for_update()
+                    .filter(rule_id__in=rule_ids, period_start=period_start)
+                )
+                for row in rows:
+                    cls._merge(row, stats[row.rule_id])
+                AutomationRuleMetric.objects.bulk_update(rows, [
+                    'success', 'failed', 'skipped',
+                    'match_samples', 'matched', 'match_total_ms', 'match_max_ms', 'match_histogram',
+                    'action_samples', 'action_total_ms', 'action_max_ms', 'action_histogram', 'queries',
+                ])
+        except Exception as e:
+            logger.error(f'Automation profiler flush failed, {len(stats)} rules dropped: {e}')
+            return 0
+        return len(rows)
+
+    @staticmethod
+    def _merge(row, stats):
+        row.success += stats.success
+        row.failed += stats.failed
+        row.skipped += stats.skipped
+        row.match_samples += stats.match.count
+        row.matched += stats.matched
+        row.match_total_ms += stats.match.total
+        row.match_max_ms = max(row.match_max_ms, stats.match.max)
+        row.match_histogram = merge_histograms(row.match_histogram, stats.match.buckets)
+        row.action_samples += stats.action.count
+        row.action_total_ms += stats.action.total
+        row.action_max_ms = max(row.action_max_ms, stats.action.max)
+        row.action_histogram = merge_histograms(row.action_histogram, stats.action.buckets)
+        row.queries += stats.queries
+
+    @staticmethod
+    def purge():
+        """Delete metric rows past the retention window. Returns the count deleted."""
+        from automation.models import AutomationRuleMetric
+
+        cutoff = timezone.now() - timedelta(days=_setting('AUTOMATION_PROFILER_RETENTION_DAYS', 14))
+        deleted, _ = AutomationRuleMetric.objects.filter(period_start__lt=cutoff).delete()
+        return deleted
+
+    # ── Reporting ─────────────────────────────────────────────
+
+    @staticmethod
+    def summarize(hours=24, rule_id=None):
+        """
+        Per-rule profile over the last ``hours``: outcome counts, sampled
+        match / action latency (avg, p50, p95, max) and queries per
+        sampled execution, slowest p95 action time first.
+        """
+        from automation.models import AutomationRuleMetric
+
+        rows = AutomationRuleMetric.objects.filter(
+            period_start__gte=timezone.now() - timedelta(hours=hours),
+        ).select_related('rule').order_by('period_start')
+        if rule_id:
+            rows = rows.filter(rule_id=rule_id)
+
+        totals = {}
+        for row in rows:
+            total = totals.get(row.rule_id)
+            if total is None:
+                total = totals[row.rule_id] = {
+                    'rule_id': str(row.rule_id), 'rule_name': row.rule.name,
+                    'success': 0, 'failed': 0, 'skipped': 0,
+                    'match_samples': 0, 'matched': 0, 'match_total_ms': 0.0, 'match_max_ms': 0.0,
+                    'match_histogram': [], 'action_samples': 0, 'action_total_ms': 0.0,
+                    'action_max_ms': 0.0, 'action_histogram': [], 'queries': 0,
+                }
+            for field in ('success', 'failed', 'skipped', 'match_samples', 'matched',
+                          'match_total_ms', 'action_samples', 'action_total_ms', 'queries'):
+                total[field] += getattr(row, field)
+            total['match_max_ms'] = max(total['match_max_ms'], row.match_max_ms)
+            total['action_max_ms'] = max(total['action_max_ms'], row.action_max_ms)
+            total['match_histogram'] = merge_histograms(total['match_histogram'], row.match_histogram)
+            total['action_histogram'] = merge_histograms(total['action_histogram'], row.action_histogram)
+
+        summary = []
+        for total in totals.values():
+            executions = total['success'] + total['failed'] + total['skipped']
+            match_samples, action_samples = total['match_samples'], total['action_samples']
+            summary.append({
+                'rule_id': total['rule_id'],
+                'rule_name': total['rule_name'],
+                'executions': executions,
+                'success': total['success'],
+                'failed': total['failed'],
+                'skipped': total['skipped'],
+                'match': {
+                    'samples': match_samples,
+                    'match_rate': round(total['matched'] / match_samples * 100, 1) if match_samples else None,
+                    'avg_ms': round(total['match_total_ms'] / match_samples, 3) if match_samples else None,
+                    'p50_ms': percentile(total['match_histogram'], 0.5, total['match_max_ms']),
+                    'p95_ms': percentile(total['match_histogram'], 0.95, total['match_max_ms']),
+                    'max_ms': round(total['match_max_ms'], 3),
+                },
+                'action': {
+                    'samples': action_samples,
+                    'avg_ms': round(total['action_total_ms'] / action_samples, 2) if action_samples else None,
+                    'p50_ms': percentile(total['action_histogram'], 0.5, total['action_max_ms']),
+                    'p95_ms': percentile(total['action_histogram'], 0.95, total['action_max_ms']),
+                    'max_ms': round(total['action_max_ms'], 2),
+                    'avg_queries': round(total['queries'] / action_samples, 1) if action_samples else None,
+                },
+            })
+        summary.sort(key=lambda item: item['action']['p95_ms'] or 0, reverse=True)
+        return summary
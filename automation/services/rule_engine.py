@@ -0,0 +1,429 @@
+"""
+JeyaRamaDesk — Automation Rule Engine
+Compiles the active automation rules into an in-memory, per-trigger index
+of precompiled predicates. Matching a ticket is a few attribute reads and
+comparisons and no queries. The index is rebuilt when the rule version
+stamp changes (see automation.signals).
+
+Conditions are a JSON object of ``field: expected`` pairs, all of which
+must hold. ``field`` is a ticket attribute, optionally traversing
+relations with ``__`` (``category__name``). ``expected`` is either a
+plain value (case-insensitive equality, as before) or an object of
+operators, e.g.::
+
+    {
+        "priority": {"in": ["high", "urgent"]},
+        "title": {"contains": "refund"},
+        "customer__email": {"regex": "@example\\\\.com$"},
+        "escalation_level": {"gte": 2}
+    }
+"""
+
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import models
+from django.utils.dateparse import parse_date, parse_datetime
+
+logger = logging.getLogger('jeyaramadesk')
+
+VERSION_CACHE_KEY = 'automation:rule_index:version'
+
+# Rebuild at least this often even if no version bump was seen
+# (covers processes whose cache is not shared, e.g. LocMemCache).
+MAX_INDEX_AGE_SECONDS = 60
+
+OPERATORS = (
+    'eq', 'ne', 'in', 'not_in', 'contains', 'startswith', 'endswith',
+    'regex', 'gt', 'gte', 'lt', 'lte', 'isnull',
+)
+
+_COMPARISONS = {
+    'gt': lambda a, b: a > b,
+    'gte': lambda a, b: a >= b,
+    'lt': lambda a, b: a < b,
+    'lte': lambda a, b: a <= b,
+}
+
+
+class ConditionError(ValueError):
+    """Raised when a rule's conditions cannot be compiled."""
+
+
+class ActionError(ValueError):
+    """Raised when a rule's additional actions are malformed."""
+
+
+class ScheduleError(ValueError):
+    """Raised when a time-based rule's schedule is invalid."""
+
+
+# ── Compilation ───────────────────────────────────────────────
+
+def _resolve_field(path):
+    """
+    Map a condition key to (attribute chain, model field, relations used).
+    A bare foreign key (``category``) reads the local ``category_id``
+    column, so it never triggers a query.
+    """
+    from tickets.models import Ticket
+
+    model = Ticket
+    parts = path.split('__')
+    attrs = []
+    related = []
+    field = None
+    for i, part in enumerate(parts):
+        try:
+            field = model._meta.get_field(part)
+        except Exception:
+            raise ConditionError(f'Unknown ticket field: {path}')
+        if field.many_to_many or field.one_to_many:
+            raise ConditionError(f'Multi-valued field not supported in conditions: {path}')
+        is_last = i == len(parts) - 1
+        if field.is_relation:
+            if is_last:
+                attrs.append(field.attname)
+                break
+            attrs.append(field.name)
+            related.append('__'.join(parts[:i + 1]))
+            model = field.related_model
+        else:
+            if not is_last:
+                raise ConditionError(f'Cannot traverse non-relation field: {path}')
+            attrs.append(field.attname)
+    return tuple(attrs), field, related
+
+
+def _make_getter(attrs):
+    if len(attrs) == 1:
+        name = attrs[0]
+        return lambda ticket: getattr(ticket, name, None)
+
+    def getter(ticket):
+        obj = ticket
+        for name in attrs:
+            obj = getattr(obj, name, None)
+            if obj is None:
+                return None
+        return obj
+    return getter
+
+
+def _coerce(field, value):
+    """Convert a JSON operand to the field's Python type for comparisons."""
+    if value is None:
+        return None
+    if isinstance(field, models.DateTimeField):
+        parsed = parse_datetime(str(value))
+    elif isinstance(field, models.DateField):
+        parsed = parse_date(str(value))
+    elif isinstance(field, (models.IntegerField, models.FloatField, models.DecimalField)):
+        try:
+            parsed = float(value)
+        except (TypeError, ValueError):
+            parsed = None
+    else:
+        return str(value)
+    if parsed is None:
+        raise ConditionError(f'Invalid value for {field.name}: {value!r}')
+    return parsed
+
+
+def _as_text(value):
+    return str(value).lower()
+
+
+def _compile_operator(getter, field, op, expected):
+    """Return a predicate ``ticket -> bool`` for one operator."""
+    if op in ('eq', 'ne'):
+        target = _as_text(expected)
+        if op == 'eq':
+            return lambda t: _as_text(getter(t)) == target
+        return lambda t: _as_text(getter(t)) != target
+
+    if op in ('in', 'not_in'):
+        if not isinstance(expected, (list, tuple)):
+            raise ConditionError(f'"{op}" expects a list')
+        targets = frozenset(_as_text(v) for v in expected)
+        if op == 'in':
+            return lambda t: _as_text(getter(t)) in targets
+        return lambda t: _as_text(getter(t)) not in targets
+
+    if op in ('contains', 'startswith', 'endswith'):
+        needle = _as_text(expected)
+        if op == 'contains':
+            return lambda t: needle in _as_text(getter(t) or '')
+        if op == 'startswith':
+            return lambda t: _as_text(getter(t) or '').startswith(needle)
+        return lambda t: _as_text(getter(t) or '').endswith(needle)
+
+    if op == 'regex':
+        try:
+            pattern = re.compile(str(expected), re.IGNORECASE)
+        except re.error as e:
+            raise ConditionError(f'Invalid regex {expected!r}: {e}')
+        return lambda t: pattern.search(str(getter(t) or '')) is not None
+
+    if op in _COMPARISONS:
+        compare = _COMPARISONS[op]
+        operand = _coerce(field, expected)
+        numeric = isinstance(operand, float)
+
+        def predicate(t):
+            actual = getter(t)
+            if actual is None:
+                return False
+            try:
+                return compare(float(actual) if numeric else actual, operand)
+            except (TypeError, ValueError):
+                return False
+        return predicate
+
+    if op == 'isnull':
+        want_null = bool(expected)
+        return lambda t: (getter(t) in (None, '')) == want_null
+
+    raise ConditionError(f'Unknown operator "{op}" (expected one of {", ".join(OPERATORS)})')
+
+
+def compile_conditions(conditions):
+    """
+    Compile a conditions dict into (predicate, related paths).
+
+    Raises:
+        ConditionError: for unknown fields, operators or malformed operands.
+    """
+    if not conditions:
+        return (lambda ticket: True), []
+    if not isinstance(conditions, dict):
+        raise ConditionError('Conditions must be a JSON object')
+
+    predicates = []
+    related = set()
+    for path, expected in conditions.items():
+        attrs, field, rel = _resolve_field(path)
+        related.update(rel)
+        getter = _make_getter(attrs)
+        if isinstance(expected, dict):
+            if not expected:
+                raise ConditionError(f'Empty operator object for {path}')
+            for op, operand in expected.items():
+                predicates.append(_compile_operator(getter, field, op, operand))
+        else:
+            predicates.append(_compile_operator(getter, field, 'eq', expected))
+
+    if len(predicates) == 1:
+        return predicates[0], sorted(related)
+    predicates = tuple(predicates)
+    return (lambda ticket: all(p(ticket) for p in predicates)), sorted(related)
+
+
+def validate_conditions(conditions):
+    """Raise ConditionError if the conditions would not compile."""
+    compile_conditions(conditions)
+
+
+def validate_actions(actions):
+    """
+    Check a rule's additional actions: a list of ``{"type", "params"}``
+    objects with known action types.
+
+    Raises:
+        ActionError: if the list is malformed.
+    """
+    from automation.models import AutomationRule
+
+    if not actions:
+        return
+    if not isinstance(actions, list):
+        raise ActionError('Actions must be a JSON list')
+    for i, action in enumerate(actions, start=1):
+        if not isinstance(action, dict):
+            raise ActionError(f'Action {i} must be an object with "type" and "params"')
+        if action.get('type') not in AutomationRule.ActionType.values:
+            raise ActionError(f'Action {i}: unknown type {action.get("type")!r}')
+        if not isinstance(action.get('params', {}), dict):
+            raise ActionError(f'Action {i}: "params" must be an object')
+
+
+def parse_cron(expression):
+    """
+    Parse a five-field cron expression ("minute hour day-of-month month
+    day-of-week") into a Celery ``crontab``.
+
+    Raises:
+        ScheduleError: if the expression is malformed.
+    """
+    from celery.schedules import crontab
+
+    parts = (expression or '').split()
+    if len(parts) != 5:
+        raise ScheduleError('Cron schedule needs five fields: minute hour day-of-month month day-of-week')
+    minute, hour, day_of_month, month_of_year, day_of_week = parts
+    try:
+        return crontab(
+            minute=minute, hour=hour, day_of_month=day_of_month,
+            month_of_year=month_of_year, day_of_week=day_of_week,
+        )
+    except ValueError as e:
+        raise ScheduleError(f'Invalid cron schedule {expression!r}: {e}')
+
+
+def validate_schedule(trigger_event, schedule_cron):
+    """Raise ScheduleError if a "Schedule" rule has no valid cron expression."""
+    from automation.models import AutomationRule
+
+    if trigger_event == AutomationRule.TriggerEvent.SCHEDULE:
+        parse_cron(schedule_cron)
+
+
+# ── Index ─────────────────────────────────────────────────────
+
+class CompiledRule:
+    """Immutable snapshot of an active rule plus its compiled predicate."""
+
+    __slots__ = ('id', 'name', 'trigger_event', 'action_type', 'action_params',
+                 'actions', 'priority_order', 'stop_processing',
+                 'idle_threshold_hours', 'schedule_hours', 'schedule_cron',
+                 'matches', 'related')
+
+    def __init__(self, rule, predicate, related):
+        self.id = rule.id
+        self.name = rule.name
+        self.trigger_event = rule.trigger_event
+        self.action_type = rule.action_type
+        self.action_params = rule.action_params or {}
+        self.actions = tuple(rule.get_actions())
+        self.priority_order = rule.priority_order
+        self.stop_processing = rule.stop_processing
+        self.idle_threshold_hours = rule.idle_threshold_hours
+        self.schedule_hours = rule.schedule_hours
+        self.schedule_cron = rule.schedule_cron
+        self.matches = predicate
+        self.related = related
+
+    def get_action_type_display(self):
+        from automation.models import AutomationRule
+        labels = []
+        for action_type, _ in self.actions:
+            try:
+                labels.append(AutomationRule.ActionType(action_type).label)
+            except ValueError:
+                labels.append(str(action_type))
+        return ', '.join(labels)
+
+    def __repr__(self):
+        return f'<CompiledRule {self.name} ({self.trigger_event})>'
+
+
+class CompiledRuleIndex:
+    """Immutable trigger_event → ordered tuple of CompiledRule."""
+
+    def __init__(self, rules, version=None):
+        self.version = version
+        self.compiled_at = time.monotonic()
+        self.invalid = {}
+        by_trigger = defaultdict(list)
+        related = defaultdict(set)
+        for rule in rules:
+            try:
+                predicate, rel = compile_conditions(rule.conditions)
+                validate_actions(rule.actions)
+                validate_schedule(rule.trigger_event, rule.schedule_cron)
+            except (ConditionError, ActionError, ScheduleError) as e:
+                # A broken rule must not take the others down with it
+                self.invalid[rule.id] = str(e)
+                logger.error(f'Automation rule "{rule.name}" ({rule.id}) skipped: {e}')
+                continue
+            by_trigger[rule.trigger_event].append(CompiledRule(rule, predicate, rel))
+            related[rule.trigger_event].update(rel)
+        self._by_trigger = {k: tuple(v) for k, v in by_trigger.items()}
+        self._by_id = {rule.id: rule for rules in self._by_trigger.values() for rule in rules}
+        self._related = {k: tuple(sorted(v)) for k, v in related.items()}
+
+    def __len__(self):
+        return sum(len(rules) for rules in self._by_trigger.values())
+
+    def rules_for(self, trigger_event):
+        """Active rules for a trigger, in execution order."""
+        return self._by_trigger.get(trigger_event, ())
+
+    def get_rule(self, rule_id):
+        """Compiled rule by id, or None if it is inactive or invalid."""
+        return self._by_id.get(rule_id)
+
+    def related_for(self, trigger_event):
+        """Relations the trigger's conditions traverse (for select_related)."""
+        return self._related.get(trigger_event, ())
+
+    def match(self, trigger_event, ticket):
+        """
+        Yield the rules that match, honouring ``stop_processing``.
+        Pure evaluation — no queries, no side effects.
+        """
+        for rule in self.rules_for(trigger_event):
+            if rule.matches(ticket):
+                yield rule
+                if rule.stop_processing:
+                    return
+
+
+class AutomationRuleEngine:
+    """Process-wide access to the compiled rule index."""
+
+    _lock = threading.Lock()
+    _index = None
+
+    @staticmethod
+    def compile(version=None):
+        """Load active rules (one query) and build a fresh index."""
+        from automation.models import AutomationRule
+        rules = AutomationRule.objects.filter(is_active=True).order_by(
+            'priority_order', '-created_at',
+        )
+        index = CompiledRuleIndex(rules, version=version)
+        logger.debug(f'Automation rule index compiled: {len(index)} rules (version {version})')
+        return index
+
+    @classmethod
+    def get_index(cls):
+        """
+        Return the current index, recompiling if another process bumped the
+        version stamp or the index is older than MAX_INDEX_AGE_SECONDS.
+        """
+        version = cache.get(VERSION_CACHE_KEY)
+        index = cls._index
+        if (index is None or index.version != version
+                or time.monotonic() - index.compiled_at > MAX_INDEX_AGE_SECONDS):
+            with cls._lock:
+                index = cls._index
+                if (index is None or index.version != version
+                        or time.monotonic() - index.compiled_at > MAX_INDEX_AGE_SECONDS):
+                    index = cls.compile(version)
+                    cls._index = index
+        return index
+
+    @staticmethod
+    def load_rule(rule_id):
+        """
+        Compile one rule straight from the database (one query), bypassing
+        this process's index, which may not have seen a just-saved rule yet.
+        Returns None if the rule is inactive, invalid or gone.
+        """
+        from automation.models import AutomationRule
+        rule_id = uuid.UUID(str(rule_id))
+        return CompiledRuleIndex(
+            AutomationRule.objects.filter(pk=rule_id, is_active=True),
+        ).get_rule(rule_id)
+
+    @classmethod
+    def invalidate(cls):
+        """Bump the shared version stamp and drop this process's index."""
+        cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+        cls._index = None
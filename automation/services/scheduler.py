@@ -0,0 +1,347 @@
+"""
+JeyaRamaDesk — Automation Scheduler
+Timers for time-based rules:
+
+- "Time After Created": fires ``schedule_hours`` after the ticket was created.
+- "Before SLA Deadline": fires ``schedule_hours`` before the ticket's next
+  SLA deadline (the response deadline until the first response, then the
+  resolution deadline).
+- "Schedule": fires on a cron expression and runs over all open tickets.
+
+Each (rule, open ticket) pair keeps one ``AutomationTimer`` row holding its
+next fire time. Rows are recomputed when a ticket is created or one of
+its scheduling fields changes, and rebuilt for all open tickets when a
+time-based rule is saved. Closing a ticket deletes its timers.
+
+Every minute the beat task claims due rows through the ``fire_at`` index
+(``ORDER BY fire_at LIMIT AUTOMATION_TIMER_BATCH_SIZE``), groups them by
+rule and fans the ticket ids out to workers in chunks. Nothing here scans
+``jrd_tickets``. The exception is a cron rule, which by definition
+applies to every open ticket when it fires.
+"""
+
+import logging
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from automation.models import AutomationRule, AutomationTimer
+from automation.services.automation_service import AutomationService
+from automation.services.idle_sweep import OPEN_STATUSES
+from automation.services.log_service import AutomationLogBuffer
+from automation.services.rule_engine import AutomationRuleEngine, parse_cron
+from tickets.events import TicketEventBus
+from tickets.models import Ticket
+
+logger = logging.getLogger('jeyaramadesk')
+
+TICKET_TIMER_TRIGGERS = (
+    AutomationRule.TriggerEvent.TIME_AFTER_CREATED,
+    AutomationRule.TriggerEvent.BEFORE_SLA_DEADLINE,
+)
+SCHEDULED_TRIGGERS = TICKET_TIMER_TRIGGERS + (AutomationRule.TriggerEvent.SCHEDULE,)
+
+# Ticket fields a timer is computed from
+SCHEDULE_FIELDS = frozenset({
+    'status', 'created_at', 'first_response_at',
+    'sla_response_deadline', 'sla_resolution_deadline',
+})
+TIMER_TICKET_FIELDS = ('id', *sorted(SCHEDULE_FIELDS))
+
+FIRE_LOCK_KEY = 'automation:timers:lock'
+FIRE_LOCK_TIMEOUT = 300
+
+
+def next_cron_fire(expression, after):
+    """First time strictly after ``after`` that matches the cron expression."""
+    schedule = parse_cron(expression)
+    local = timezone.localtime(after)
+    schedule.nowfun = lambda: local
+    return local + schedule.remaining_estimate(local)
+
+
+class AutomationScheduler:
+    """Maintains and fires timers for time-based automation rules."""
+
+    @staticmethod
+    def fire_time(rule, ticket):
+        """
+        Compute a ticket timer.
+
+        Returns:
+            (anchor, fire_at), or (None, None) if the rule has nothing to
+            wait for on this ticket (e.g. no SLA deadline).
+        """
+        hours = timedelta(hours=rule.schedule_hours)
+        if rule.trigger_event == AutomationRule.TriggerEvent.TIME_AFTER_CREATED:
+            anchor = ticket.created_at
+            return (anchor, anchor + hours) if anchor else (None, None)
+
+        if ticket.first_response_at is None and ticket.sla_response_deadline:
+            anchor = ticket.sla_response_deadline
+        else:
+            anchor = ticket.sla_resolution_deadline
+        return (anchor, anchor - hours) if anchor else (None, None)
+
+    @staticmethod
+    def ticket_rules():
+        """Active rules that keep per-ticket timers."""
+        index = AutomationRuleEngine.get_index()
+        return [rule for trigger in TICKET_TIMER_TRIGGERS for rule in index.rules_for(trigger)]
+
+    # ── Maintaining timers ────────────────────────────────────
+
+    @staticmethod
+    def schedule_tickets(tickets, rules=None, arm_past=True):
+        """
+        Recompute the timers of ``tickets`` for ``rules`` (default: all
+        active ticket-timer rules).
+
+        A timer whose anchor is unchanged is left alone, so a timer that
+        already fired stays fired. A changed anchor re-arms it. With
+        ``arm_past`` a fire time that has already passed fires on the next
+        beat run; without it (rule backfills) such timers are stored as
+        already fired.
+
+        Returns:
+            Number of timers written.
+        """
+        rules = AutomationScheduler.ticket_rules() if rules is None else rules
+        if not rules:
+            return 0
+
+        open_tickets = [t for t in tickets if t.status in OPEN_STATUSES]
+        closed_ids = [t.pk for t in tickets if t.status not in OPEN_STATUSES]
+        if closed_ids:
+            AutomationTimer.objects.filter(ticket_id__in=closed_ids).delete()
+        if not open_tickets:
+            return 0
+
+        rule_ids = [rule.id for rule in rules]
+        existing = {
+            (rule_id, ticket_id): (pk, anchor)
+            for pk, rule_id, ticket_id, anchor in AutomationTimer.objects.filter(
+                ticket_id__in=[t.pk for t in open_tickets], rule_id__in=rule_ids,
+            ).values_list('id', 'rule_id', 'ticket_id', 'anchor')
+        }
+
+        now = timezone.now()
+        timers = []
+        stale = []
+        for ticket in open_tickets:
+            for rule in rules:
+                anchor, fire_at = AutomationScheduler.fire_time(rule, ticket)
+                current = existing.get((rule.id, ticket.pk))
+                if anchor is None:
+                    if current:
+                        stale.append(current[0])
+                    continue
+                if current and current[1] == anchor:
+                    continue
+                if not arm_past and fire_at <= now:
+                    fire_at = None
+                timers.append(AutomationTimer(
+                    rule_id=rule.id, ticket_id=ticket.pk, anchor=anchor, fire_at=fire_at,
+                ))
+
+        if stale:
+            AutomationTimer.objects.filter(id__in=stale).delete()
+        if timers:
+            AutomationTimer.objects.bulk_create(
+                timers,
+                update_conflicts=True,
+                unique_fields=['rule', 'ticket'],
+                update_fields=['anchor', 'fire_at', 'updated_at'],
+            )
+        return len(timers)
+
+    @staticmethod
+    def schedule_ticket(ticket):
+        """Recompute one ticket's timers after it was created or changed."""
+        return AutomationScheduler.schedule_tickets([ticket])
+
+    @staticmethod
+    def rebuild_rule(rule_id):
+        """
+        Replace a rule's timers: one cron row for "Schedule" rules, or one
+        row per open ticket (future fire times only) for ticket-timer rules.
+        Inactive or non time-based rules just lose their timers.
+
+        The rule is read from the database, not this worker's rule index,
+        which may predate the save that queued the rebuild.
+
+        Returns:
+            Number of timers created.
+        """
+        rule = AutomationRuleEngine.load_rule(rule_id)
+        AutomationTimer.objects.filter(rule_id=rule_id).delete()
+        if rule is None or rule.trigger_event not in SCHEDULED_TRIGGERS:
+            return 0
+
+        if rule.trigger_event == AutomationRule.TriggerEvent.SCHEDULE:
+            AutomationTimer.objects.create(
+                rule_id=rule.id, fire_at=next_cron_fire(rule.schedule_cron, timezone.now()),
+            )
+            return 1
+
+        chunk_size = getattr(settings, 'AUTOMATION_TIMER_BACKFILL_CHUNK', 2000)
+        qs = Ticket.objects.filter(status__in=OPEN_STATUSES).only(*TIMER_TICKET_FIELDS).order_by('id')
+        created = 0
+        last_id = 0
+        while True:
+            tickets = list(qs.filter(id__gt=last_id)[:chunk_size])
+            if not tickets:
+                break
+            created += AutomationScheduler.schedule_tickets(tickets, rules=[rule], arm_past=False)
+            last_id = tickets[-1].id
+            if len(tickets) < chunk_size:
+                break
+        logger.info(f'Automation timers rebuilt for rule "{rule.name}": {created} timers')
+        return created
+
+    # ── Firing ────────────────────────────────────────────────
+
+    @staticmethod
+    def fire_due():
+        """
+        Claim due timers and dispatch them to workers. Returns a summary dict.
+        """
+        if not cache.add(FIRE_LOCK_KEY, 1, FIRE_LOCK_TIMEOUT):
+            logger.info('Automation timers: previous run still in progress, skipping.')
+            return {'due': 0, 'chunks': 0, 'schedules': 0}
+        try:
+            return AutomationScheduler._fire_due()
+        finally:
+            cache.delete(FIRE_LOCK_KEY)
+
+    @staticmethod
+    def _fire_due():
+        from automation.tasks import process_scheduled_chunk, run_scheduled_rule
+
+        batch_size = getattr(settings, 'AUTOMATION_TIMER_BATCH_SIZE', 5000)
+        chunk_size = getattr(settings, 'AUTOMATION_IDLE_CHUNK_SIZE', 500)
+        queue = getattr(settings, 'AUTOMATION_SCHEDULE_QUEUE', None) or None
+        now = timezone.now()
+
+        due = list(
+            AutomationTimer.objects.filter(fire_at__lte=now)
+            .order_by('fire_at')
+            .values_list('id', 'rule_id', 'ticket_id')[:batch_size]
+        )
+        if not due:
+            return {'due': 0, 'chunks': 0, 'schedules': 0}
+
+        index = AutomationRuleEngine.get_index()
+        by_rule = defaultdict(list)
+        claimed = []
+        schedules = 0
+        for pk, rule_id, ticket_id in due:
+            if ticket_id is not None:
+                by_rule[rule_id].append(ticket_id)
+                claimed.append(pk)
+                continue
+            # Cron row: move it to the next slot and run the rule
+            rule = index.get_rule(rule_id) or AutomationRuleEngine.load_rule(rule_id)
+            if rule is None or rule.trigger_event != AutomationRule.TriggerEvent.SCHEDULE:
+                AutomationTimer.objects.filter(id=pk).delete()
+                continue
+            AutomationTimer.objects.filter(id=pk).update(
+                fire_at=next_cron_fire(rule.schedule_cron, now), updated_at=now,
+            )
+            run_scheduled_rule.apply_async(args=[str(rule_id)], queue=queue)
+            schedules += 1
+
+        # Mark as fired; a timer re-armed meanwhile (fire_at moved) is left alone
+        if claimed:
+            AutomationTimer.objects.filter(id__in=claimed, fire_at__lte=now).update(fire_at=None)
+
+        chunks = 0
+        for rule_id, ticket_ids in by_rule.items():
+            for start in range(0, len(ticket_ids), chunk_size):
+                process_scheduled_chunk.apply_async(
+                    args=[str(rule_id), ticket_ids[start:start + chunk_size]], queue=queue,
+                )
+                chunks += 1
+
+        if len(due) == batch_size:
+            logger.warning(f'Automation timers: batch of {batch_size} full, more timers are due.')
+        logger.info(
+            f'Automation timers: {len(claimed)} ticket timers in {chunks} chunks, '
+            f'{schedules} scheduled rules dispatched.'
+        )
+        return {'due': len(due), 'chunks': chunks, 'schedules': schedules}
+
+    @staticmethod
+    def dispatch_rule(rule_id):
+        """
+        Fan a cron rule out over all open tickets (keyset pages on the
+        status index). Returns the number of chunks dispatched.
+        """
+        from automation.tasks import process_scheduled_chunk
+
+        chunk_size = getattr(settings, 'AUTOMATION_IDLE_CHUNK_SIZE', 500)
+        queue = getattr(settings, 'AUTOMATION_SCHEDULE_QUEUE', None) or None
+        qs = Ticket.objects.filter(status__in=OPEN_STATUSES).order_by('id')
+        chunks = 0
+        last_id = 0
+        while True:
+            ids = list(qs.filter(id__gt=last_id).values_list('id', flat=True)[:chunk_size])
+            if not ids:
+                break
+            process_scheduled_chunk.apply_async(args=[str(rule_id), ids], queue=queue)
+            chunks += 1
+            last_id = ids[-1]
+            if len(ids) < chunk_size:
+                break
+        return chunks
+
+    @staticmethod
+    def process_chunk(rule_id, ticket_ids):
+        """
+        Run a time-based rule over a chunk of tickets (on a worker).
+        Ticket timers are re-checked, so a ticket whose deadline moved or
+        that was closed since it was claimed is skipped.
+
+        Returns:
+            Number of tickets the rule fired on.
+        """
+        index = AutomationRuleEngine.get_index()
+        # A rule saved moments ago may not be in this worker's index yet
+        rule = index.get_rule(uuid.UUID(str(rule_id))) or AutomationRuleEngine.load_rule(rule_id)
+        if rule is None or rule.trigger_event not in SCHEDULED_TRIGGERS:
+            return 0
+
+        tickets = Ticket.objects.filter(id__in=ticket_ids, status__in=OPEN_STATUSES)
+        related = rule.related
+        if related:
+            # select_related() with no arguments would follow every relation
+            tickets = tickets.select_related(*related)
+
+        now = timezone.now()
+        check_timer = rule.trigger_event in TICKET_TIMER_TRIGGERS
+        fired = 0
+        # Same execution model as the idle sweep: changes don't trigger
+        # further rules, no rate limits (chunks are paced by the beat
+        # task), circuit breaker still applies.
+        with TicketEventBus.muted(), AutomationLogBuffer.collect():
+            for ticket in tickets:
+                if check_timer:
+                    _, fire_at = AutomationScheduler.fire_time(rule, ticket)
+                    if fire_at is None or fire_at > now:
+                        continue
+                if rule.matches(ticket):
+                    AutomationService.run_rule(rule, ticket, throttle=False)
+                    fired += 1
+        return fired
+
+    @staticmethod
+    def get_next_runs(rule_ids):
+        """Next fire time of each "Schedule" rule, for the rule list."""
+        return dict(
+            AutomationTimer.objects.filter(rule_id__in=rule_ids, ticket__isnull=True)
+            .values_list('rule_id', 'fire_at')
+        )
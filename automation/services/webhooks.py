@@ -0,0 +1,310 @@
+"""
+JeyaRamaDesk — Automation Webhooks
+Delivers ``webhook`` actions to external endpoints.
+
+The action only builds the payload. Delivery is queued once the rule's
+transaction commits and runs as a Celery task on
+AUTOMATION_WEBHOOK_QUEUE, so neither the request path nor the automation
+worker waits on a remote server.
+
+Delivery:
+    Each worker process keeps one pooled HTTP session
+    (AUTOMATION_WEBHOOK_POOL_SIZE keep-alive connections per host). The
+    body is signed with the endpoint secret::
+
+        X-JRD-Timestamp: <unix seconds>
+        X-JRD-Signature: sha256=HMAC_SHA256(secret, "<timestamp>.<body>")
+
+    Receivers should recompute the signature and reject old timestamps.
+    ``X-JRD-Delivery`` stays the same across retries, so receivers can
+    de-duplicate on it.
+
+Retries:
+    Timeouts, connection errors, 408, 429 and 5xx responses are retried
+    with exponential backoff (AUTOMATION_WEBHOOK_BACKOFF_BASE doubling up
+    to AUTOMATION_WEBHOOK_BACKOFF_MAX, plus jitter) until the endpoint's
+    ``max_attempts``. Other 4xx responses are not retried. Deliveries that
+    give up go to ``WebhookDeadLetter`` and can be replayed from the admin.
+
+Concurrency:
+    Each endpoint allows at most ``max_concurrency`` requests in flight
+    across all workers (a cache counter). A delivery that finds no free
+    slot is re-queued after AUTOMATION_WEBHOOK_BUSY_DELAY seconds without
+    using up an attempt.
+
+Circuit breaker:
+    Retryable failures are counted per endpoint. After
+    AUTOMATION_WEBHOOK_BREAKER_THRESHOLD in a row the breaker opens for
+    AUTOMATION_WEBHOOK_BREAKER_COOLDOWN seconds. While it is open,
+    deliveries to the endpoint are re-queued for when it closes, without
+    being sent and without using up an attempt. The first delivery after
+    the cooldown is a probe: another failure re-opens the breaker at once,
+    and a success (or any non-retryable answer) resets the count.
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from automation.models import WebhookDeadLetter, WebhookEndpoint
+from automation.services.execution_guard import _incr
+
+logger = logging.getLogger('jeyaramadesk')
+
+USER_AGENT = 'JeyaRamaDesk-Webhooks/1.0'
+
+RETRYABLE_STATUS = frozenset({408, 429})
+
+TICKET_PAYLOAD_FIELDS = (
+    'ticket_id', 'title', 'status', 'priority', 'source',
+    'category_id', 'customer_id', 'assigned_agent_id',
+    'is_escalated', 'escalation_level',
+    'created_at', 'updated_at', 'first_response_at',
+    'sla_response_deadline', 'sla_resolution_deadline',
+)
+
+# Outcomes of a single delivery attempt
+DELIVERED = 'delivered'
+BUSY = 'busy'
+RETRY = 'retry'
+DEAD = 'dead'
+SKIPPED = 'skipped'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _json_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _slot_key(endpoint_id):
+    return f'automation:webhook:inflight:{endpoint_id}'
+
+
+def _breaker_keys(endpoint_id):
+    prefix = f'automation:webhook:breaker:{endpoint_id}'
+    return f'{prefix}:failures', f'{prefix}:open'
+
+
+class WebhookDispatcher:
+    """Builds, signs, sends and retries webhook deliveries."""
+
+    _session = None
+
+    # ── Payload ───────────────────────────────────────────────
+
+    @staticmethod
+    def build_payload(ticket, rule=None, changed_fields=()):
+        """JSON-safe snapshot of the ticket after the rule's changes."""
+        return {
+            'event': 'automation.rule_matched',
+            'created_at': timezone.now().isoformat(),
+            'rule': {
+                'id': str(rule.id),
+                'name': rule.name,
+                'trigger_event': rule.trigger_event,
+            } if rule is not None else None,
+            'ticket': {
+                'id': ticket.pk,
+                **{field: _json_value(getattr(ticket, field)) for field in TICKET_PAYLOAD_FIELDS},
+            },
+            'changed_fields': list(changed_fields),
+        }
+
+    @staticmethod
+    def sign(secret, timestamp, body):
+        """Hex HMAC-SHA256 of ``"<timestamp>.<body>"``."""
+        message = f'{timestamp}.'.encode() + body
+        return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+    # ── Queueing ──────────────────────────────────────────────
+
+    @staticmethod
+    def enqueue(endpoint_id, payload, delivery_id=None):
+        """Queue a delivery on the webhook queue. Returns the delivery id."""
+        from automation.tasks import deliver_webhook
+
+        delivery_id = str(delivery_id or uuid.uuid4())
+        try:
+            deliver_webhook.apply_async(
+                args=[str(endpoint_id), payload, delivery_id],
+                queue=_setting('AUTOMATION_WEBHOOK_QUEUE', None) or None,
+            )
+        except Exception as e:
+            WebhookDispatcher.dead_letter(endpoint_id, payload, delivery_id, 0, None, f'Could not queue: {e}')
+        return delivery_id
+
+    @staticmethod
+    def replay(dead_letter):
+        """Queue a dead letter again with the same delivery id."""
+        WebhookDispatcher.enqueue(dead_letter.endpoint_id, dead_letter.payload, dead_letter.delivery_id)
+        WebhookDeadLetter.objects.filter(pk=dead_letter.pk).update(replayed_at=timezone.now())
+
+    # ── Delivering (workers) ──────────────────────────────────
+
+    @classmethod
+    def session(cls):
+        """This process's pooled HTTP session."""
+        if cls._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            pool_size = _setting('AUTOMATION_WEBHOOK_POOL_SIZE', 10)
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            cls._session = session
+        return cls._session
+
+    @staticmethod
+    def send(endpoint, payload, delivery_id):
+        """
+        POST one signed delivery.
+
+        Returns:
+            (status code or None, error message or '')
+        """
+        import requests
+
+        body = json.dumps(payload, separators=(',', ':'), sort_keys=True).encode()
+        timestamp = str(int(time.time()))
+        headers = {
+            'Content-Type': 'application/json',
+            'X-JRD-Event': payload.get('event', ''),
+            'X-JRD-Delivery': str(delivery_id),
+            'X-JRD-Timestamp': timestamp,
+            'X-JRD-Signature': f'sha256={WebhookDispatcher.sign(endpoint.secret, timestamp, body)}',
+        }
+        try:
+            response = WebhookDispatcher.session().post(
+                endpoint.url, data=body, headers=headers, timeout=endpoint.timeout_seconds,
+            )
+        except requests.RequestException as e:
+            return None, f'{type(e).__name__}: {e}'
+        if 200 <= response.status_code < 300:
+            return response.status_code, ''
+        return response.status_code, f'HTTP {response.status_code}: {response.text[:200]}'
+
+    @staticmethod
+    def acquire_slot(endpoint):
+        """Reserve one in-flight request for the endpoint; False if it is at its limit."""
+        key = _slot_key(endpoint.pk)
+        if _incr(key, endpoint.timeout_seconds * 2 + 60) <= endpoint.max_concurrency:
+            return True
+        WebhookDispatcher.release_slot(endpoint)
+        return False
+
+    @staticmethod
+    def release_slot(endpoint):
+        try:
+            cache.decr(_slot_key(endpoint.pk))
+        except ValueError:
+            pass  # counter expired
+
+    @staticmethod
+    def breaker_open(endpoint):
+        """Seconds until the endpoint's breaker closes, or 0 when it is closed."""
+        until = cache.get(_breaker_keys(endpoint.pk)[1])
+        return max(0.0, until - time.time()) if until else 0
+
+    @staticmethod
+    def record_health(endpoint, healthy):
+        """Reset or count consecutive failures, opening the breaker at the threshold."""
+        failures_key, open_key = _breaker_keys(endpoint.pk)
+        if healthy:
+            cache.delete(failures_key)
+            return
+        cooldown = _setting('AUTOMATION_WEBHOOK_BREAKER_COOLDOWN', 60)
+        threshold = _setting('AUTOMATION_WEBHOOK_BREAKER_THRESHOLD', 5)
+        failures = _incr(failures_key, cooldown * 10)
+        if failures >= threshold:
+            cache.set(open_key, time.time() + cooldown, cooldown)
+            logger.warning(
+                f'Webhook endpoint "{endpoint.name}": {failures} failures in a row, '
+                f'pausing deliveries for {cooldown}s'
+            )
+
+    @staticmethod
+    def backoff(attempt):
+        """Seconds to wait before attempt ``attempt + 1``."""
+        base = _setting('AUTOMATION_WEBHOOK_BACKOFF_BASE', 30)
+        ceiling = _setting('AUTOMATION_WEBHOOK_BACKOFF_MAX', 3600)
+        delay = min(base * 2 ** (attempt - 1), ceiling)
+        return delay + random.uniform(0, delay / 10)
+
+    @staticmethod
+    def attempt(endpoint_id, payload, delivery_id, attempt=1):
+        """
+        Make one delivery attempt.
+
+        Returns:
+            (outcome, countdown): DELIVERED / SKIPPED / DEAD with no
+            countdown, or BUSY / RETRY with the delay before the next try.
+        """
+        endpoint = WebhookEndpoint.objects.filter(pk=endpoint_id, is_active=True).first()
+        if endpoint is None:
+            logger.warning(f'Webhook {delivery_id} dropped: endpoint {endpoint_id} is missing or inactive')
+            return SKIPPED, None
+
+        closes_in = WebhookDispatcher.breaker_open(endpoint)
+        if closes_in:
+            # Wait out the cooldown; spread the backlog over a few seconds
+            delay = _setting('AUTOMATION_WEBHOOK_BUSY_DELAY', 5)
+            return BUSY, closes_in + random.uniform(0, delay)
+
+        if not WebhookDispatcher.acquire_slot(endpoint):
+            delay = _setting('AUTOMATION_WEBHOOK_BUSY_DELAY', 5)
+            return BUSY, delay + random.uniform(0, delay)
+
+        try:
+            status_code, error = WebhookDispatcher.send(endpoint, payload, delivery_id)
+        finally:
+            WebhookDispatcher.release_slot(endpoint)
+
+        retryable = bool(error) and (
+            status_code is None or status_code >= 500 or status_code in RETRYABLE_STATUS
+        )
+        WebhookDispatcher.record_health(endpoint, healthy=not retryable)
+
+        if not error:
+            logger.info(f'Webhook {delivery_id} delivered to "{endpoint.name}" (attempt {attempt})')
+            return DELIVERED, None
+
+        if retryable and attempt < endpoint.max_attempts:
+            countdown = WebhookDispatcher.backoff(attempt)
+            logger.warning(
+                f'Webhook {delivery_id} to "{endpoint.name}" failed (attempt {attempt}): {error}; '
+                f'retrying in {countdown:.0f}s'
+            )
+            return RETRY, countdown
+
+        WebhookDispatcher.dead_letter(endpoint.pk, payload, delivery_id, attempt, status_code, error)
+        return DEAD, None
+
+    @staticmethod
+    def dead_letter(endpoint_id, payload, delivery_id, attempts, status_code, error):
+        WebhookDeadLetter.objects.create(
+            endpoint_id=endpoint_id,
+            delivery_id=delivery_id,
+            payload=payload,
+            attempts=attempts,
+            last_status_code=status_code,
+            last_error=error,
+        )
+        logger.error(f'Webhook {delivery_id} to endpoint {endpoint_id} dead-lettered after {attempts} attempts: {error}')
@@ -0,0 +1,57 @@
+"""
+JeyaRamaDesk — Automation Signals
+Keeps the compiled automation rule index in sync with rule edits, and
+the timers of time-based rules in sync with rule and ticket changes.
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from automation.models import AutomationRule, AutomationTimer
+from tickets.models import Ticket
+
+logger = logging.getLogger('jeyaramadesk')
+
+
+@receiver(post_save, sender=AutomationRule)
+@receiver(post_delete, sender=AutomationRule)
+def automation_rule_changed(sender, instance, **kwargs):
+    """Invalidate the rule index once the change is committed."""
+    from automation.services.rule_engine import AutomationRuleEngine
+    transaction.on_commit(AutomationRuleEngine.invalidate)
+
+
+@receiver(post_save, sender=AutomationRule)
+def automation_rule_timers(sender, instance, **kwargs):
+    """Rebuild a time-based rule's timers; drop them for any other rule."""
+    from automation.services.scheduler import SCHEDULED_TRIGGERS
+    from automation.tasks import rebuild_automation_timers
+
+    if not (instance.is_active and instance.trigger_event in SCHEDULED_TRIGGERS):
+        AutomationTimer.objects.filter(rule_id=instance.id).delete()
+        return
+
+    def enqueue():
+        try:
+            rebuild_automation_timers.delay(str(instance.id))
+        except Exception as e:
+            # Saving the rule again retries the rebuild
+            logger.error(f'Could not enqueue timer rebuild for rule "{instance.name}": {e}')
+
+    # Runs after the index invalidation registered above
+    transaction.on_commit(enqueue)
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_timers(sender, instance, update_fields=None, **kwargs):
+    """Recompute a ticket's timers when a field they depend on may have changed."""
+    from automation.services.scheduler import AutomationScheduler, SCHEDULE_FIELDS
+
+    if update_fields is not None and SCHEDULE_FIELDS.isdisjoint(update_fields):
+        return
+    try:
+        AutomationScheduler.schedule_ticket(instance)
+    except Exception as e:
+        logger.error(f'Automation timers for ticket {instance.ticket_id} not updated: {e}')
@@ -1,6 +1,7 @@
 """
 JeyaRamaDesk — Automation Celery Tasks
-Background tasks for running automation rules on idle tickets.
+Background tasks for running automation rules on idle tickets and
+time-based timers, and for delivering webhooks.
 """
 
 from celery import shared_task
@@ -12,35 +13,99 @@ logger = logging.getLogger('jeyaramadesk')
 @shared_task(name='automation.run_idle_ticket_rules')
 def run_idle_ticket_rules():
     """
-    Periodic task: Find tickets that have been idle (no updates)
-    and run 'ticket_idle' automation rules against them.
+    Periodic task: find tickets that went idle since the last run for each
+    active 'ticket_idle' rule and fan them out in chunks.
     Runs every minute via Celery Beat.
     """
-    from django.utils import timezone
-    from datetime import timedelta
-    from tickets.models import Ticket
-    from automation.services.automation_service import AutomationService
-    from automation.models import AutomationRule
-
-    # Only process if there are active idle rules
-    idle_rules = AutomationRule.objects.filter(
-        trigger_event='ticket_idle',
-        is_active=True,
-    )
-    if not idle_rules.exists():
+    from automation.services.idle_sweep import IdleSweepService
+
+    summary = IdleSweepService.sweep()
+    if not summary['rules']:
         return 'No active idle rules'
+    return (
+        f'Dispatched {summary["tickets"]} idle tickets in {summary["chunks"]} chunks '
+        f'(backlog {summary["backlog"]})'
+    )
+
+
+@shared_task(name='automation.rollup_automation_logs')
+def rollup_automation_logs():
+    """
+    Periodic task: compact complete days of AutomationLog into per-rule
+    daily counters, then purge raw logs and profiler metrics past their
+    retention windows.
+    """
+    from automation.services.log_service import AutomationLogService
+    from automation.services.profiler import RuleProfiler
+
+    days = AutomationLogService.rollup()
+    purged = AutomationLogService.purge()
+    metrics = RuleProfiler.purge()
+    return f'Rolled up {days} days, purged {purged} logs and {metrics} metric rows'
+
+
+@shared_task(name='automation.process_idle_ticket_chunk')
+def process_idle_ticket_chunk(rule_id, ticket_ids):
+    """Run one idle rule over a chunk of ticket ids."""
+    from automation.services.idle_sweep import IdleSweepService
+
+    fired = IdleSweepService.process_chunk(rule_id, ticket_ids)
+    logger.info(f'Automation: idle rule {rule_id} fired on {fired}/{len(ticket_ids)} tickets')
+    return fired
+
+
+@shared_task(name='automation.fire_due_automation_timers')
+def fire_due_automation_timers():
+    """
+    Periodic task: claim due timers of time-based rules and fan them out
+    in chunks. Runs every minute via Celery Beat.
+    """
+    from automation.services.scheduler import AutomationScheduler
+
+    summary = AutomationScheduler.fire_due()
+    return f'Dispatched {summary["chunks"]} timer chunks and {summary["schedules"]} scheduled rules'
+
+
+@shared_task(name='automation.process_scheduled_chunk')
+def process_scheduled_chunk(rule_id, ticket_ids):
+    """Run one time-based rule over a chunk of ticket ids."""
+    from automation.services.scheduler import AutomationScheduler
+
+    fired = AutomationScheduler.process_chunk(rule_id, ticket_ids)
+    logger.info(f'Automation: scheduled rule {rule_id} fired on {fired}/{len(ticket_ids)} tickets')
+    return fired
+
+
+@shared_task(name='automation.run_scheduled_rule')
+def run_scheduled_rule(rule_id):
+    """Fan a cron rule out over all open tickets."""
+    from automation.services.scheduler import AutomationScheduler
+
+    chunks = AutomationScheduler.dispatch_rule(rule_id)
+    return f'Dispatched {chunks} chunks for scheduled rule {rule_id}'
+
+
+@shared_task(name='automation.rebuild_automation_timers')
+def rebuild_automation_timers(rule_id):
+    """Rebuild a time-based rule's timers after it was saved."""
+    from automation.services.scheduler import AutomationScheduler
+
+    created = AutomationScheduler.rebuild_rule(rule_id)
+    return f'Created {created} timers for rule {rule_id}'
 
-    # Find tickets idle for more than 24 hours
-    idle_threshold = timezone.now() - timedelta(hours=24)
-    idle_tickets = Ticket.objects.filter(
-        status__in=['open', 'assigned', 'in_progress'],
-        updated_at__lt=idle_threshold,
-    ).select_related('assigned_agent', 'customer', 'category')
 
-    count = 0
-    for ticket in idle_tickets[:100]:  # Process max 100 per run
-        AutomationService.run_rules('ticket_idle', ticket)
-        count += 1
+@shared_task(bind=True, name='automation.deliver_webhook', max_retries=None, acks_late=True)
+def deliver_webhook(self, endpoint_id, payload, delivery_id, attempt=1):
+    """Deliver one webhook; re-queues itself with backoff until it succeeds or dead-letters."""
+    from automation.services.webhooks import WebhookDispatcher, BUSY, RETRY
 
-    logger.info(f'Automation: Processed {count} idle tickets')
-    return f'Processed {count} idle tickets'
+    outcome, countdown = WebhookDispatcher.attempt(endpoint_id, payload, delivery_id, attempt)
+    if outcome in (BUSY, RETRY):
+        # A busy endpoint doesn't use up an attempt
+        next_attempt = attempt + 1 if outcome == RETRY else attempt
+        raise self.retry(
+            args=[endpoint_id, payload, delivery_id],
+            kwargs={'attempt': next_attempt},
+            countdown=countdown,
+        )
+    return outcome
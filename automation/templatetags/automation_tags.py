@@ -0,0 +1,15 @@
+"""
+JeyaRamaDesk — Automation Template Tags
+"""
+
+import json
+
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def to_json(value):
+    """Render a JSONField value as JSON text (for form textareas)."""
+    return json.dumps(value, indent=None)
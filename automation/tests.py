@@ -1,3 +1,280 @@
-from django.test import TestCase
+"""
+JeyaRamaDesk — Automation Tests
+Webhook deliveries: signing, retries with backoff, the per-endpoint
+circuit breaker, dead letters and their replay. The HTTP session is
+mocked, so nothing leaves the process. Rule profiler flush scheduling.
+Timers of time-based rules: one fire per anchor, re-arming on a moved
+SLA deadline, cleanup on close and the cron row moving on. Task
+dispatch is mocked.
+"""
 
-# Create your tests here.
+import hashlib
+import hmac
+import json
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from automation.models import AutomationRule, AutomationTimer, WebhookDeadLetter, WebhookEndpoint
+from automation.services.profiler import RuleProfiler
+from automation.services.rule_engine import AutomationRuleEngine
+from automation.services.scheduler import AutomationScheduler
+from automation.services.webhooks import BUSY, DEAD, DELIVERED, RETRY, WebhookDispatcher
+from automation.tasks import deliver_webhook, process_scheduled_chunk, run_scheduled_rule
+from tickets.models import Ticket
+
+User = get_user_model()
+
+PAYLOAD = {'event': 'automation.rule_matched', 'ticket': {'id': 1, 'status': 'open'}}
+
+
+def _response(status_code, text=''):
+    return mock.Mock(status_code=status_code, text=text)
+
+
+@override_settings(
+    AUTOMATION_WEBHOOK_BACKOFF_BASE=30,
+    AUTOMATION_WEBHOOK_BACKOFF_MAX=3600,
+    AUTOMATION_WEBHOOK_BREAKER_THRESHOLD=3,
+    AUTOMATION_WEBHOOK_BREAKER_COOLDOWN=60,
+)
+class WebhookDeliveryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.endpoint = WebhookEndpoint.objects.create(
+            name='Hook', url='http://hooks.example.com/in', secret='s3cret', max_attempts=4,
+        )
+        self.post = mock.Mock(return_value=_response(200))
+        session = mock.patch.object(WebhookDispatcher, '_session', mock.Mock(post=self.post))
+        session.start()
+        self.addCleanup(session.stop)
+        self.delivery_id = str(uuid.uuid4())
+
+    def _attempt(self, attempt=1):
+        return WebhookDispatcher.attempt(self.endpoint.pk, PAYLOAD, self.delivery_id, attempt)
+
+    def test_delivery_is_signed(self):
+        self.assertEqual(self._attempt(), (DELIVERED, None))
+
+        (url,), kwargs = self.post.call_args
+        headers, body = kwargs['headers'], kwargs['data']
+        expected = hmac.new(
+            b's3cret', f'{headers["X-JRD-Timestamp"]}.'.encode() + body, hashlib.sha256,
+        ).hexdigest()
+        self.assertEqual(url, self.endpoint.url)
+        self.assertEqual(headers['X-JRD-Signature'], f'sha256={expected}')
+        self.assertEqual(headers['X-JRD-Delivery'], self.delivery_id)
+        self.assertEqual(headers['X-JRD-Event'], 'automation.rule_matched')
+        self.assertEqual(json.loads(body), PAYLOAD)
+
+    def test_server_error_is_retried_with_backoff(self):
+        self.post.return_value = _response(503, 'down')
+
+        outcome, countdown = self._attempt(attempt=2)
+
+        self.assertEqual(outcome, RETRY)
+        self.assertGreaterEqual(countdown, 60)
+        self.assertLessEqual(countdown, 66)
+
+    def test_timeout_is_retried_with_backoff(self):
+        self.post.side_effect = requests.Timeout('read timed out')
+
+        outcome, countdown = self._attempt()
+
+        self.assertEqual(outcome, RETRY)
+        self.assertGreaterEqual(countdown, 30)
+        self.assertLessEqual(countdown, 33)
+
+    def test_client_error_is_dead_lettered_at_once(self):
+        self.post.return_value = _response(400, 'bad payload')
+
+        self.assertEqual(self._attempt(), (DEAD, None))
+        self.assertEqual(WebhookDeadLetter.objects.get().last_status_code, 400)
+
+    def test_last_attempt_is_dead_lettered(self):
+        self.post.return_value = _response(500, 'boom')
+
+        self.assertEqual(self._attempt(attempt=4), (DEAD, None))
+
+        dead = WebhookDeadLetter.objects.get()
+        self.assertEqual(dead.endpoint_id, self.endpoint.pk)
+        self.assertEqual(str(dead.delivery_id), self.delivery_id)
+        self.assertEqual(dead.payload, PAYLOAD)
+        self.assertEqual(dead.attempts, 4)
+        self.assertEqual(dead.last_status_code, 500)
+        self.assertIn('boom', dead.last_error)
+
+    def test_breaker_opens_after_failures_in_a_row(self):
+        self.post.return_value = _response(502)
+        for _ in range(3):
+            self.assertEqual(self._attempt()[0], RETRY)
+
+        outcome, countdown = self._attempt()
+
+        self.assertEqual(outcome, BUSY)
+        self.assertGreater(countdown, 55)
+        self.assertEqual(self.post.call_count, 3)
+        self.assertFalse(WebhookDeadLetter.objects.exists())
+
+    def test_success_resets_the_failure_count(self):
+        self.post.return_value = _response(502)
+        self._attempt()
+        self._attempt()
+        self.post.return_value = _response(204)
+        self._attempt()
+        self.post.return_value = _response(502)
+
+        self.assertEqual(self._attempt()[0], RETRY)
+        self.assertEqual(self._attempt()[0], RETRY)
+        self.assertEqual(WebhookDispatcher.breaker_open(self.endpoint), 0)
+
+    def test_task_retries_until_delivered(self):
+        self.post.side_effect = [_response(500), requests.ConnectionError('refused'), _response(200)]
+
+        deliver_webhook.apply(args=[str(self.endpoint.pk), PAYLOAD, self.delivery_id])
+
+        self.assertEqual(self.post.call_count, 3)
+        self.assertFalse(WebhookDeadLetter.objects.exists())
+
+    def test_replay_requeues_with_the_same_delivery_id(self):
+        dead = WebhookDeadLetter.objects.create(
+            endpoint=self.endpoint, delivery_id=self.delivery_id, payload=PAYLOAD, attempts=4,
+        )
+
+        with mock.patch.object(deliver_webhook, 'apply_async') as apply_async:
+            WebhookDispatcher.replay(dead)
+
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.kwargs['args'], [str(self.endpoint.pk), PAYLOAD, self.delivery_id])
+        dead.refresh_from_db()
+        self.assertIsNotNone(dead.replayed_at)
+
+
+@override_settings(AUTOMATION_PROFILER_FLUSH_SECONDS=60)
+class RuleProfilerFlushTests(TestCase):
+
+    def setUp(self):
+        for name, value in (('_last_flush', 0), ('_flush_scheduled', None), ('_stats', {})):
+            patcher = mock.patch.object(RuleProfiler, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _maybe_flush_at(self, now, rollback=False):
+        """Call maybe_flush at monotonic time ``now``; return the flushes scheduled."""
+        with mock.patch('automation.services.profiler.time.monotonic', return_value=now), \
+                self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    RuleProfiler.maybe_flush()
+                    if rollback:
+                        raise RuntimeError('rolled back')
+            except RuntimeError:
+                pass
+        return len(callbacks)
+
+    def test_one_flush_per_interval(self):
+        self.assertEqual(self._maybe_flush_at(1000), 1)
+        self.assertEqual(self._maybe_flush_at(1010), 0)
+
+    def test_rolled_back_flush_is_scheduled_again(self):
+        self.assertEqual(self._maybe_flush_at(1000, rollback=True), 0)
+        self.assertEqual(self._maybe_flush_at(1030), 0)
+
+        self.assertEqual(self._maybe_flush_at(1061), 1)
+
+
+@override_settings(TICKET_EVENTS_ASYNC=False, NOTIFICATION_OUTBOX_ASYNC=False)
+class AutomationSchedulerTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='x', first_name='Cus', last_name='Tomer', role='customer',
+        )
+        for task in (process_scheduled_chunk, run_scheduled_rule):
+            patcher = mock.patch.object(task, 'apply_async')
+            setattr(self, task.__name__, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def _rule(self, trigger_event, **fields):
+        rule = AutomationRule.objects.create(
+            name=trigger_event, trigger_event=trigger_event,
+            action_type='add_tag', action_params={'tag': 'timed'}, **fields,
+        )
+        # on_commit never runs in a TestCase, so refresh the index by hand
+        AutomationRuleEngine.invalidate()
+        return rule
+
+    def _ticket(self):
+        return Ticket.objects.create(title='t', description='d', customer=self.customer)
+
+    def _timer(self, rule, ticket=None):
+        return AutomationTimer.objects.get(rule=rule, ticket=ticket)
+
+    def _dispatched(self):
+        return [call.kwargs['args'][1] for call in self.process_scheduled_chunk.call_args_list]
+
+    def test_timer_fires_once_per_anchor(self):
+        rule = self._rule('time_after_created', schedule_hours=1)
+        ticket = self._ticket()
+        Ticket.objects.filter(pk=ticket.pk).update(created_at=timezone.now() - timedelta(hours=2))
+        ticket.refresh_from_db()
+        AutomationScheduler.schedule_ticket(ticket)
+
+        AutomationScheduler.fire_due()
+        # Saving the ticket recomputes the same anchor, which stays fired
+        ticket.save()
+        AutomationScheduler.fire_due()
+
+        self.assertEqual(self._dispatched(), [[ticket.pk]])
+        timer = self._timer(rule, ticket)
+        self.assertIsNone(timer.fire_at)
+        self.assertEqual(timer.anchor, ticket.created_at)
+
+    def test_moved_sla_deadline_rearms_the_timer(self):
+        rule = self._rule('before_sla_deadline', schedule_hours=1)
+        ticket = self._ticket()
+        ticket.sla_response_deadline = timezone.now() + timedelta(minutes=30)
+        ticket.save(update_fields=['sla_response_deadline'])
+        AutomationScheduler.fire_due()
+        self.assertIsNone(self._timer(rule, ticket).fire_at)
+
+        ticket.sla_response_deadline = timezone.now() + timedelta(hours=3)
+        ticket.save(update_fields=['sla_response_deadline'])
+
+        timer = self._timer(rule, ticket)
+        self.assertEqual(timer.anchor, ticket.sla_response_deadline)
+        self.assertEqual(timer.fire_at, ticket.sla_response_deadline - timedelta(hours=1))
+        self.assertEqual(self._dispatched(), [[ticket.pk]])
+
+    def test_closing_the_ticket_deletes_its_timers(self):
+        rule = self._rule('time_after_created', schedule_hours=4)
+        ticket = self._ticket()
+        self.assertTrue(AutomationTimer.objects.filter(rule=rule, ticket=ticket).exists())
+
+        ticket.status = 'closed'
+        ticket.save(update_fields=['status'])
+
+        self.assertFalse(AutomationTimer.objects.filter(ticket=ticket).exists())
+
+    def test_cron_row_moves_to_the_next_slot(self):
+        rule = self._rule('schedule', schedule_cron='0 * * * *')
+        AutomationScheduler.rebuild_rule(rule.pk)
+        AutomationTimer.objects.filter(rule=rule).update(fire_at=timezone.now() - timedelta(minutes=1))
+
+        summary = AutomationScheduler.fire_due()
+
+        self.assertEqual(summary['schedules'], 1)
+        self.assertEqual(self.run_scheduled_rule.call_args.kwargs['args'], [str(rule.pk)])
+        fire_at = self._timer(rule).fire_at
+        self.assertGreater(fire_at, timezone.now())
+        self.assertLessEqual(fire_at, timezone.now() + timedelta(hours=1))
+        self.assertEqual(timezone.localtime(fire_at).minute, 0)
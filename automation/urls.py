@@ -8,5 +8,6 @@ urlpatterns = [
     path('create/', views.rule_create_view, name='create'),
     path('<uuid:pk>/edit/', views.rule_edit_view, name='edit'),
     path('<uuid:pk>/delete/', views.rule_delete_view, name='delete'),
+    path('dry-run/', views.rule_dry_run_view, name='dry_run'),
     path('logs/', views.rule_logs_view, name='logs'),
 ]
@@ -4,13 +4,24 @@ Template views for managing automation rules.
 """
 
 import json
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
+from django.http import JsonResponse
+from django.views.decorators.http import require_POST
 
-from .models import AutomationRule, AutomationLog
+from .models import AutomationRule, AutomationLog, WebhookEndpoint
 from .services.automation_service import AutomationService
+from .services.dry_run import AutomationDryRunService
+from .services.execution_guard import ExecutionGuard
+from .services.profiler import RuleProfiler
+from .services.rule_engine import (
+    ActionError, ConditionError, ScheduleError,
+    validate_actions, validate_conditions, validate_schedule,
+)
+from .services.scheduler import AutomationScheduler
 
 
 @login_required
@@ -20,7 +31,14 @@ def rule_list_view(request):
         messages.error(request, 'Access denied.')
         return redirect('dashboard:index')
 
-    rules = AutomationRule.objects.all().order_by('priority_order', '-created_at')
+    rules = list(AutomationRule.objects.all().order_by('priority_order', '-created_at'))
+    guard = ExecutionGuard.get_status([rule.id for rule in rules])
+    next_runs = AutomationScheduler.get_next_runs(
+        [rule.id for rule in rules if rule.trigger_event == AutomationRule.TriggerEvent.SCHEDULE]
+    )
+    for rule in rules:
+        rule.guard = guard[rule.id]
+        rule.next_run = next_runs.get(rule.id)
     recent_logs = AutomationLog.objects.select_related(
         'rule', 'ticket'
     ).order_by('-executed_at')[:20]
@@ -30,6 +48,7 @@ def rule_list_view(request):
         'rules': rules,
         'recent_logs': recent_logs,
         'stats': stats,
+        'rule_burst': getattr(settings, 'AUTOMATION_RULE_BURST', 200),
     })
 
 
@@ -44,9 +63,15 @@ def rule_create_view(request):
         try:
             conditions_str = request.POST.get('conditions', '{}')
             action_params_str = request.POST.get('action_params', '{}')
+            actions_str = request.POST.get('actions', '[]')
 
             conditions = json.loads(conditions_str) if conditions_str else {}
             action_params = json.loads(action_params_str) if action_params_str else {}
+            actions = json.loads(actions_str) if actions_str else []
+            validate_conditions(conditions)
+            validate_actions(actions)
+            schedule_cron = request.POST.get('schedule_cron', '').strip()
+            validate_schedule(request.POST.get('trigger_event'), schedule_cron)
 
             rule = AutomationRule.objects.create(
                 name=request.POST.get('name'),
@@ -55,7 +80,11 @@ def rule_create_view(request):
                 conditions=conditions,
                 action_type=request.POST.get('action_type'),
                 action_params=action_params,
+                actions=actions,
                 priority_order=int(request.POST.get('priority_order', 0)),
+                idle_threshold_hours=int(request.POST.get('idle_threshold_hours') or 24),
+                schedule_hours=int(request.POST.get('schedule_hours') or 0),
+                schedule_cron=schedule_cron,
                 is_active=request.POST.get('is_active') == 'on',
                 stop_processing=request.POST.get('stop_processing') == 'on',
                 created_by=request.user,
@@ -63,13 +92,20 @@ def rule_create_view(request):
             messages.success(request, f'Rule "{rule.name}" created successfully.')
             return redirect('automation:list')
         except json.JSONDecodeError:
-            messages.error(request, 'Invalid JSON in conditions or action parameters.')
+            messages.error(request, 'Invalid JSON in conditions, action parameters or actions.')
+        except ConditionError as e:
+            messages.error(request, f'Invalid conditions: {e}')
+        except ActionError as e:
+            messages.error(request, f'Invalid actions: {e}')
+        except ScheduleError as e:
+            messages.error(request, f'Invalid schedule: {e}')
         except Exception as e:
             messages.error(request, f'Error creating rule: {e}')
 
     return render(request, 'automation/rule_form.html', {
         'trigger_choices': AutomationRule.TriggerEvent.choices,
         'action_choices': AutomationRule.ActionType.choices,
+        'webhook_endpoints': WebhookEndpoint.objects.filter(is_active=True).only('id', 'name'),
     })
 
 
@@ -91,9 +127,17 @@ def rule_edit_view(request, pk):
             rule.description = request.POST.get('description', '')
             rule.trigger_event = request.POST.get('trigger_event')
             rule.conditions = json.loads(conditions_str) if conditions_str else {}
+            validate_conditions(rule.conditions)
             rule.action_type = request.POST.get('action_type')
             rule.action_params = json.loads(action_params_str) if action_params_str else {}
+            actions_str = request.POST.get('actions', '[]')
+            rule.actions = json.loads(actions_str) if actions_str else []
+            validate_actions(rule.actions)
             rule.priority_order = int(request.POST.get('priority_order', 0))
+            rule.idle_threshold_hours = int(request.POST.get('idle_threshold_hours') or 24)
+            rule.schedule_hours = int(request.POST.get('schedule_hours') or 0)
+            rule.schedule_cron = request.POST.get('schedule_cron', '').strip()
+            validate_schedule(rule.trigger_event, rule.schedule_cron)
             rule.is_active = request.POST.get('is_active') == 'on'
             rule.stop_processing = request.POST.get('stop_processing') == 'on'
             rule.save()
@@ -101,7 +145,13 @@ def rule_edit_view(request, pk):
             messages.success(request, f'Rule "{rule.name}" updated successfully.')
             return redirect('automation:list')
         except json.JSONDecodeError:
-            messages.error(request, 'Invalid JSON in conditions or action parameters.')
+            messages.error(request, 'Invalid JSON in conditions, action parameters or actions.')
+        except ConditionError as e:
+            messages.error(request, f'Invalid conditions: {e}')
+        except ActionError as e:
+            messages.error(request, f'Invalid actions: {e}')
+        except ScheduleError as e:
+            messages.error(request, f'Invalid schedule: {e}')
         except Exception as e:
             messages.error(request, f'Error updating rule: {e}')
 
@@ -109,6 +159,7 @@ def rule_edit_view(request, pk):
         'rule': rule,
         'trigger_choices': AutomationRule.TriggerEvent.choices,
         'action_choices': AutomationRule.ActionType.choices,
+        'webhook_endpoints': WebhookEndpoint.objects.filter(is_active=True).only('id', 'name'),
     })
 
 
@@ -130,9 +181,30 @@ def rule_delete_view(request, pk):
     return render(request, 'automation/rule_confirm_delete.html', {'rule': rule})
 
 
+@login_required
+@require_POST
+def rule_dry_run_view(request):
+    """AJAX: test the conditions on the rule form against the last N days of tickets."""
+    if request.user.is_customer:
+        return JsonResponse({'error': 'Access denied.'}, status=403)
+
+    try:
+        conditions_str = request.POST.get('conditions', '{}')
+        conditions = json.loads(conditions_str) if conditions_str else {}
+        days = min(max(int(request.POST.get('days') or 30), 1), 365)
+        result = AutomationDryRunService.run(conditions, days=days)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON in conditions.'}, status=400)
+    except ConditionError as e:
+        return JsonResponse({'error': f'Invalid conditions: {e}'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(result)
+
+
 @login_required
 def rule_logs_view(request):
-    """View automation execution logs."""
+    """View automation execution logs and per-rule performance."""
     if request.user.is_customer:
         messages.error(request, 'Access denied.')
         return redirect('dashboard:index')
@@ -149,7 +221,15 @@ def rule_logs_view(request):
     page = request.GET.get('page')
     logs_page = paginator.get_page(page)
 
+    try:
+        hours = min(max(int(request.GET.get('hours') or 24), 1), 24 * 14)
+    except ValueError:
+        hours = 24
+
     return render(request, 'automation/rule_logs.html', {
         'logs': logs_page,
         'status_filter': status_filter,
+        'profile': RuleProfiler.summarize(hours=hours),
+        'profile_hours': hours,
+        'sample_rate': getattr(settings, 'AUTOMATION_PROFILER_SAMPLE_RATE', 0.1),
     })
@@ -173,12 +173,158 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'sla.tasks.check_sla_breaches',
         'schedule': 300.0,
     },
+    'send-sla-breach-digests': {
+        'task': 'sla.tasks.send_sla_breach_digests',
+        'schedule': 60.0,
+    },
+    'refresh-sla-rollups': {
+        'task': 'sla.tasks.refresh_sla_rollups',
+        'schedule': 300.0,
+    },
+    'sweep-ticket-events': {
+        'task': 'tickets.tasks.sweep_ticket_events',
+        'schedule': 60.0,
+    },
+    'rollup-automation-logs': {
+        'task': 'automation.rollup_automation_logs',
+        'schedule': 3600.0,
+    },
     'run-automation-rules': {
-        'task': 'automation.tasks.run_scheduled_automations',
+        'task': 'automation.run_idle_ticket_rules',
+        'schedule': 60.0,
+    },
+    'fire-automation-timers': {
+        'task': 'automation.fire_due_automation_timers',
+        'schedule': 60.0,
+    },
+    'sweep-notification-outbox': {
+        'task': 'notifications.tasks.sweep_notification_outbox',
+        'schedule': 60.0,
+    },
+    'reconcile-unread-notification-counts': {
+        'task': 'notifications.tasks.reconcile_unread_counts',
+        'schedule': 600.0,
+    },
+    'purge-notifications': {
+        'task': 'notifications.tasks.purge_notifications',
+        'schedule': 3600.0,
+    },
+    'send-notification-emails': {
+        'task': 'notifications.tasks.send_notification_emails',
         'schedule': 60.0,
     },
 }
 
+# ── SLA Breach Notifications ─────────────────────────────────
+# Digest mode: breaches are collected and sent as one notification per
+# recipient per beat window instead of one per breach per recipient.
+SLA_BREACH_DIGEST_ENABLED = True
+SLA_BREACH_DIGEST_MAX_LISTED = 10        # ticket IDs named in one digest
+SLA_BREACH_DIGEST_BATCH_SIZE = 5000      # breaches handled per run
+
+# ── Ticket Domain Events ─────────────────────────────────────
+# Events are dispatched to automation on Celery workers after commit.
+# Set TICKET_EVENTS_ASYNC = False to handle them inline (no worker needed).
+TICKET_EVENTS_ASYNC = True
+TICKET_EVENT_RETENTION_DAYS = 7          # processed events kept this long
+
+# ── Notification Outbox ──────────────────────────────────────
+# Ticket/comment signals write outbox rows; a worker creates the
+# notifications after commit. Set NOTIFICATION_OUTBOX_ASYNC = False to
+# create them inline on commit (no worker needed).
+NOTIFICATION_OUTBOX_ASYNC = True
+NOTIFICATION_OUTBOX_BATCH_SIZE = 200     # events per insert transaction
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = 5     # failed builds retried this many times
+NOTIFICATION_OUTBOX_RETENTION_DAYS = 7   # processed events kept this long
+
+# ── Unread Notification Counter ──────────────────────────────
+# Cached per-user unread counts; the beat reconcile runs every 10 minutes.
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = 86400  # seconds a counter lives without being read
+
+# ── Notification Preferences ─────────────────────────────────
+NOTIFICATION_PREFERENCE_CACHE_TIMEOUT = 3600  # per-user channel choices
+NOTIFICATION_STAFF_CACHE_TIMEOUT = 300   # active manager/superadmin id set
+
+# ── Notification Retention ───────────────────────────────────
+# Hourly purge in small batches; 0 disables a rule.
+NOTIFICATION_READ_RETENTION_DAYS = 30    # read notifications kept this long
+NOTIFICATION_MAX_PER_USER = 1000         # newest notifications kept per user
+NOTIFICATION_PURGE_USER_CHUNK = 500      # users counted per cap query; a cursor resumes the next run
+NOTIFICATION_PURGE_BATCH_SIZE = 500      # rows per DELETE
+NOTIFICATION_PURGE_PAUSE = 0.05          # seconds between batches
+NOTIFICATION_PURGE_TIME_BUDGET = 60      # seconds per run; the next run continues
+NOTIFICATION_PURGE_LOG_EVERY = 50        # progress log line every N batches
+
+# ── Notification WebSocket ───────────────────────────────────
+NOTIFICATION_RESUME_LIMIT = 100          # missed notifications replayed on reconnect; more = reload
+NOTIFICATION_PRESENCE_ENABLED = True     # push only to users with an open socket
+NOTIFICATION_PRESENCE_TIMEOUT = 180      # seconds a socket counts as online without a heartbeat
+NOTIFICATION_PUSH_COALESCE_WINDOW = 0.25  # seconds of pushes merged into one frame; 0 = send at once
+NOTIFICATION_PUSH_MAX_PENDING = 20       # pushes held per window before merging into an overflow frame
+
+# ── Notification Email ───────────────────────────────────────
+# Queued rows are sent every minute as one digest per recipient over a
+# single reused connection to EMAIL_BACKEND.
+NOTIFICATION_EMAIL_ENABLED = True
+NOTIFICATION_EMAIL_SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')  # base for links
+NOTIFICATION_EMAIL_BATCH_SIZE = 1000     # queued rows claimed per run
+NOTIFICATION_EMAIL_MAX_ATTEMPTS = 5      # failed digests retried this many times
+NOTIFICATION_EMAIL_BACKOFF_BASE = 60     # seconds before the first retry, doubling
+NOTIFICATION_EMAIL_BACKOFF_MAX = 3600    # longest wait between retries
+NOTIFICATION_EMAIL_RETENTION_DAYS = 7    # sent/failed/skipped rows kept this long
+
+# ── Live Chat ────────────────────────────────────────────────
+LIVECHAT_ROOM_CACHE_TIMEOUT = 3600       # cached room participants; dropped on room saves
+LIVECHAT_WRITE_BEHIND = True             # broadcast first, store in batches; False = store each message first
+LIVECHAT_FLUSH_INTERVAL = 0.5            # seconds between write-behind flushes
+LIVECHAT_FLUSH_BATCH_SIZE = 500          # pending messages that trigger an early flush
+LIVECHAT_FLUSH_MAX_ATTEMPTS = 5          # failed writes before a message is dropped
+
+# ── Automation Idle Sweep ────────────────────────────────────
+AUTOMATION_IDLE_CHUNK_SIZE = 500         # tickets per worker task
+AUTOMATION_IDLE_MAX_CHUNKS = 200         # chunks dispatched per sweep (all rules)
+AUTOMATION_IDLE_QUEUE = 'automation_idle'  # dedicated queue; '' = default queue
+
+# ── Automation Scheduled Triggers ────────────────────────────
+AUTOMATION_TIMER_BATCH_SIZE = 5000       # due timers claimed per beat run
+AUTOMATION_TIMER_BACKFILL_CHUNK = 2000   # tickets per query when (re)building a rule's timers
+AUTOMATION_SCHEDULE_QUEUE = 'automation_idle'  # queue for timer chunks; '' = default queue
+
+# ── Automation Webhooks ──────────────────────────────────────
+AUTOMATION_WEBHOOK_QUEUE = 'webhooks'     # deliveries run on their own worker queue
+AUTOMATION_WEBHOOK_POOL_SIZE = 10         # keep-alive connections per host, per worker process
+AUTOMATION_WEBHOOK_BACKOFF_BASE = 30      # seconds before the 2nd attempt; doubles each retry
+AUTOMATION_WEBHOOK_BACKOFF_MAX = 3600     # cap on the retry delay
+AUTOMATION_WEBHOOK_BUSY_DELAY = 5         # re-queue delay when an endpoint is at its concurrency limit
+AUTOMATION_WEBHOOK_BREAKER_THRESHOLD = 5  # failures in a row that pause an endpoint
+AUTOMATION_WEBHOOK_BREAKER_COOLDOWN = 60  # seconds an endpoint stays paused
+
+# ── Automation Logs ──────────────────────────────────────────
+AUTOMATION_LOG_BUFFER_SIZE = 500         # buffered rows per bulk insert
+AUTOMATION_LOG_RETENTION_DAYS = 30       # raw logs kept after daily rollup
+
+# ── Automation Execution Guard ───────────────────────────────
+AUTOMATION_MAX_DEPTH = 3                  # rule-triggered event chains stop here
+AUTOMATION_RULE_BURST = 200               # per-rule token bucket size
+AUTOMATION_RULE_RATE_PER_MINUTE = 600     # per-rule refill rate
+AUTOMATION_TICKET_BURST = 10              # per-ticket token bucket size
+AUTOMATION_TICKET_RATE_PER_MINUTE = 30    # per-ticket refill rate
+AUTOMATION_BREAKER_WINDOW_SECONDS = 300   # failure-rate window
+AUTOMATION_BREAKER_MIN_RUNS = 20          # runs in a window before the breaker can trip
+AUTOMATION_BREAKER_FAILURE_RATE = 0.5     # failure ratio that auto-disables a rule
+
+# ── Automation Profiler ──────────────────────────────────────
+AUTOMATION_PROFILER_ENABLED = True
+AUTOMATION_PROFILER_SAMPLE_RATE = 0.1     # fraction of rule evaluations timed (1.0 = all)
+AUTOMATION_PROFILER_FLUSH_SECONDS = 60    # per-process flush of in-memory histograms
+AUTOMATION_PROFILER_PERIOD_MINUTES = 5    # metric row granularity (divides 60)
+AUTOMATION_PROFILER_RETENTION_DAYS = 14   # metric rows kept this long
+
+# ── Automation Dry Run ───────────────────────────────────────
+AUTOMATION_DRY_RUN_CHUNK_SIZE = 2000     # tickets fetched per query
+AUTOMATION_DRY_RUN_MAX_TICKETS = 100000  # scan cap per run
+AUTOMATION_DRY_RUN_TIME_BUDGET = 5.0     # seconds before a run stops early
+
 # ── File Upload ───────────────────────────────────────────────
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10 MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
@@ -49,6 +49,14 @@ CHANNEL_LAYERS = {
     }
 }
 
+# ── Cache (Redis — shared by web and Celery processes) ────────
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('CACHE_URL', 'redis://localhost:6379/2'),
+    }
+}
+
 # ── CORS ──────────────────────────────────────────────────────
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = os.environ.get(
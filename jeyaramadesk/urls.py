@@ -27,6 +27,7 @@ _urlpatterns = [
     path('api/accounts/', include('accounts.api.urls')),
     path('api/tickets/', include('tickets.api.urls')),
     path('api/sla/', include('sla.api.urls')),
+    path('api/automation/', include('automation.api.urls')),
     path('api/dashboard/', include('dashboard.api.urls')),
     path('api/notifications/', include('notifications.api.urls')),
     path('api/reports/', include('reports.api.urls')),
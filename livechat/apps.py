@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class LivechatConfig(AppConfig):
     name = "livechat"
+
+    def ready(self):
+        import livechat.signals  # noqa
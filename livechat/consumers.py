@@ -1,15 +1,45 @@
 """
 JeyaRamaDesk — Live Chat WebSocket Consumer
 Handles real-time bidirectional messaging between customer and agent.
+
+The room's participants come from the membership cache in ``connect``
+(see livechat.services.membership) and are kept on the consumer with the
+sender's name and role. Joining and posting are checked against that
+copy, which room saves refresh through a ``room_update`` group event, so
+neither check queries the database.
+
+Users who may not join are accepted and closed at once with code 4403,
+so the page stops reconnecting.
+
+Each message gets its id and timestamp here. The id is always generated
+by the server; the client's ``client_id`` (if it is a UUID) is kept in
+its own column, unique per sender, and echoed in the broadcast so the
+sending tab can match its optimistic copy. With LIVECHAT_WRITE_BEHIND on
+the message is broadcast at once and written by the process's
+write-behind buffer, which flushes in batches (see
+livechat.services.persistence). Otherwise it is written first, in one
+database hop: the INSERT plus the room's ``updated_at`` UPDATE by
+primary key, without fetching the room again. A resend of a stored
+``client_id`` is then not broadcast again.
 """
 
 import json
 import logging
+import uuid
+from asgiref.sync import sync_to_async
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+from django.utils import timezone
+
+from livechat.services.membership import RoomMembership
+from livechat.services.persistence import write_buffer
 
 logger = logging.getLogger('jeyaramadesk')
 
+# Close code for users who may not join the room
+FORBIDDEN = 4403
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
     """
@@ -26,6 +56,20 @@ class ChatConsumer(AsyncWebsocketConsumer):
             await self.close()
             return
 
+        self.room = await sync_to_async(RoomMembership.get)(self.room_id)
+        if not RoomMembership.can_join(self.room, self.user):
+            logger.warning(f'WS Chat join refused: {self.user.email} → room {self.room_id}')
+            await self.accept()
+            await self.close(code=FORBIDDEN)
+            return
+
+        # Sender identity doesn't change during a connection
+        self.sender = {
+            'sender_id': str(self.user.id),
+            'sender_name': self.user.full_name or self.user.email,
+            'sender_role': self.user.role,
+        }
+
         # Join room group
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -45,6 +89,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 self.room_group_name,
                 self.channel_name,
             )
+        if write_buffer.pending:
+            # Leaving the page: store what this process still holds
+            await write_buffer.flush()
 
     async def receive(self, text_data=None, bytes_data=None):
         """Handle incoming messages from the WebSocket client."""
@@ -57,9 +104,22 @@ class ChatConsumer(AsyncWebsocketConsumer):
         content = data.get('message', '').strip()
         if not content:
             return
+        if not RoomMembership.can_post(self.room, self.user):
+            return
 
-        # Persist the message to the database
-        msg = await self._save_message(content, message_type)
+        from livechat.models import ChatMessage
+        msg = ChatMessage(
+            client_id=self._client_id(data.get('client_id')),
+            room_id=self.room_id,
+            sender=self.user,
+            content=content,
+            message_type=message_type,
+            created_at=timezone.now(),
+        )
+        if getattr(settings, 'LIVECHAT_WRITE_BEHIND', True):
+            write_buffer.add(msg)
+        elif not await self._save_message(msg):
+            return  # a resend of a stored message
 
         # Broadcast to room group
         await self.channel_layer.group_send(
@@ -67,19 +127,32 @@ class ChatConsumer(AsyncWebsocketConsumer):
             {
                 'type': 'chat_message',
                 'message': {
-                    'id': str(msg['id']),
-                    'content': msg['content'],
-                    'message_type': msg['message_type'],
-                    'sender_id': str(self.user.id),
-                    'sender_name': await self._get_display_name(),
-                    'sender_role': await self._get_role(),
-                    'created_at': msg['created_at'],
+                    'id': str(msg.id),
+                    'client_id': str(msg.client_id) if msg.client_id else None,
+                    'content': msg.content,
+                    'message_type': msg.message_type,
+                    **self.sender,
+                    'created_at': msg.created_at.isoformat(),
                 },
             },
         )
 
+    @staticmethod
+    def _client_id(client_id):
+        """The client's id for the message when it is a valid UUID, else None."""
+        try:
+            return uuid.UUID(str(client_id))
+        except ValueError:
+            return None
+
     # ── Group event handlers ──────────────────────────────────
 
+    async def room_update(self, event):
+        """Refresh the room's participants after an assignment, close or delete."""
+        self.room = event['room']
+        if not RoomMembership.can_join(self.room, self.user):
+            await self.close(code=FORBIDDEN)
+
     async def chat_message(self, event):
         """Send a chat message event to the WebSocket client."""
         await self.send(text_data=json.dumps({
@@ -108,29 +181,10 @@ class ChatConsumer(AsyncWebsocketConsumer):
     # ── Database helpers (sync → async) ───────────────────────
 
     @database_sync_to_async
-    def _save_message(self, content, message_type='text'):
-        from livechat.models import ChatRoom, ChatMessage
-        room = ChatRoom.objects.get(pk=self.room_id)
-        msg = ChatMessage.objects.create(
-            room=room,
-            sender=self.user,
-            content=content,
-            message_type=message_type,
-        )
-        # Update room timestamp
-        room.save(update_fields=['updated_at'])
-        return {
-            'id': msg.id,
-            'content': msg.content,
-            'message_type': msg.message_type,
-            'created_at': msg.created_at.isoformat(),
-        }
+    def _save_message(self, msg):
+        """
+        Write-through path (LIVECHAT_WRITE_BEHIND off): one hop per message,
+        touching the room by pk (it was loaded at connect). False if skipped.
+        """
+        return write_buffer.insert([msg]) == 1
 
-    @database_sync_to_async
-    def _get_display_name(self):
-        name = self.user.full_name
-        return name if name else self.user.email
-
-    @database_sync_to_async
-    def _get_role(self):
-        return self.user.role
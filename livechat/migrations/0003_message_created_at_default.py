@@ -0,0 +1,19 @@
+# Generated by Django 4.2.28 on 2026-10-19 00:20
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('livechat', '0002_alter_chatmessage_table_alter_chatroom_table'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -6,6 +6,7 @@ Real-time messaging between customers and support agents.
 import uuid
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class ChatRoom(models.Model):
@@ -91,7 +92,10 @@ class ChatMessage(models.Model):
         default=MessageType.TEXT,
     )
     is_read = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # The sending tab's id for the message; a resend with the same one is stored once
+    client_id = models.UUIDField(null=True, blank=True, editable=False)
+    # Stamped on receipt, so write-behind inserts keep the broadcast time
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         db_table = 'jrd_chat_messages'
@@ -100,6 +104,9 @@ class ChatMessage(models.Model):
             models.Index(fields=['room', 'created_at'], name='idx_chatmsg_room_time'),
             models.Index(fields=['room', 'is_read'], name='idx_chatmsg_unread'),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['sender', 'client_id'], name='uniq_chatmsg_sender_client'),
+        ]
 
     def __str__(self):
         sender_name = (self.sender.full_name or self.sender.email) if self.sender else 'System'
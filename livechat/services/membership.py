@@ -0,0 +1,81 @@
+"""
+JeyaRamaDesk — Live Chat Room Membership
+Who may join a chat room's WebSocket group and post in it.
+
+Rules (the HTTP views' customer check, plus assignment for agents):
+    customer            their own rooms only
+    agent               rooms assigned to them, and waiting rooms
+    manager/superadmin  every room
+Nobody posts in a closed room.
+
+A room's participants (customer, agent, status) are cached as
+``livechat:room:<room id>`` for LIVECHAT_ROOM_CACHE_TIMEOUT seconds, so a
+join costs a cache read instead of a query. Saving or deleting a room
+(assignment, closing) drops the entry after commit and tells the room's
+open consumers, which keep their own copy for the per-message check (see
+livechat.signals). Message inserts bump ``updated_at`` with an UPDATE and
+don't touch the cache.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger('jeyaramadesk')
+
+STAFF_ROLES = ('superadmin', 'manager')
+
+
+def _key(room_id):
+    return f'livechat:room:{room_id}'
+
+
+class RoomMembership:
+    """Cached room participants and the join / post checks."""
+
+    @staticmethod
+    def get(room_id):
+        """``{'customer_id', 'agent_id', 'status'}`` for a room (ids as strings), or None."""
+        room = cache.get(_key(room_id))
+        if room is None:
+            from livechat.models import ChatRoom
+            row = ChatRoom.objects.filter(pk=room_id).values('customer_id', 'agent_id', 'status').first()
+            if row is None:
+                return None
+            room = RoomMembership.snapshot(row)
+            cache.set(_key(room_id), room, getattr(settings, 'LIVECHAT_ROOM_CACHE_TIMEOUT', 3600))
+        return room
+
+    @staticmethod
+    def snapshot(room):
+        """Cacheable participants of a ChatRoom instance or ``values()`` row."""
+        if isinstance(room, dict):
+            customer_id, agent_id, status = room['customer_id'], room['agent_id'], room['status']
+        else:
+            customer_id, agent_id, status = room.customer_id, room.agent_id, room.status
+        return {
+            'customer_id': str(customer_id),
+            'agent_id': str(agent_id) if agent_id else None,
+            'status': status,
+        }
+
+    @staticmethod
+    def can_join(room, user):
+        if room is None:
+            return False
+        if user.role in STAFF_ROLES:
+            return True
+        user_id = str(user.pk)
+        if user.role == 'customer':
+            return room['customer_id'] == user_id
+        return room['agent_id'] == user_id or room['status'] == 'waiting'
+
+    @staticmethod
+    def can_post(room, user):
+        return RoomMembership.can_join(room, user) and room['status'] != 'closed'
+
+    @staticmethod
+    def invalidate(room_id):
+        transaction.on_commit(lambda: cache.delete(_key(room_id)))
@@ -0,0 +1,186 @@
+"""
+JeyaRamaDesk — Live Chat Write-behind Persistence
+Takes the database off the path of WebSocket chat messages.
+
+Flow:
+    ``ChatConsumer.receive`` gives every message a server-generated id,
+    keeps the client's ``client_id`` (when it is a valid UUID) in its own
+    column, stamps ``created_at``, broadcasts it to the room at once, and
+    hands it to
+    ``ChatWriteBuffer.add``. The buffer is flushed every
+    LIVECHAT_FLUSH_INTERVAL seconds, or as soon as LIVECHAT_FLUSH_BATCH_SIZE
+    messages are waiting: one ``bulk_create`` for the batch and one
+    ``updated_at`` UPDATE per room, in one transaction.
+
+Ordering:
+    ``created_at`` is stamped when the consumer receives the message, not
+    when it is written, so history and polling order messages as they
+    were broadcast. Within one server process a room's messages are
+    written in arrival order and a flush commits whole, so what the
+    database holds is always a prefix of what was broadcast. Messages of
+    one room received by different processes are ordered by their
+    processes' clocks.
+
+Durability:
+    A message is acknowledged (broadcast) before it is stored. Up to one
+    flush interval of messages is lost if the process dies; a consumer
+    disconnecting flushes right away. A failed flush is retried on the
+    next tick. After a failure the batch is written room by room, so one
+    bad room (deleted meanwhile) can't hold back the others. Messages still
+    failing after LIVECHAT_FLUSH_MAX_ATTEMPTS are dropped with an error
+    log. ``(sender, client_id)`` is unique and inserts ignore conflicts,
+    so a retried or resent message is stored once; the skipped duplicates
+    are logged and not counted as stored.
+
+Set LIVECHAT_WRITE_BEHIND = False to write each message before it is
+broadcast instead.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger('jeyaramadesk')
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ChatWriteBuffer:
+    """Per-process buffer of broadcast chat messages awaiting their INSERT."""
+
+    def __init__(self):
+        self.pending = []
+        self.attempts = {}
+        self.task = None
+        self.urgent = None
+        self.lock = None
+        self.lock_loop = None
+
+    # ── Buffering ─────────────────────────────────────────────
+
+    def add(self, message):
+        """Queue an unsaved ChatMessage (id and created_at set); call from the event loop."""
+        self.pending.append(message)
+        if len(self.pending) >= _setting('LIVECHAT_FLUSH_BATCH_SIZE', 500):
+            self.urgent = asyncio.get_running_loop().create_task(self.flush())
+        self._schedule()
+
+    def _schedule(self):
+        loop = asyncio.get_running_loop()
+        if self.task is not None and not self.task.done() and self.task.get_loop() is loop:
+            return
+        self.task = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(_setting('LIVECHAT_FLUSH_INTERVAL', 0.5))
+        await self.flush()
+        self.task = None
+        if self.pending:
+            # Retries and messages that arrived during the write
+            self._schedule()
+
+    # ── Flushing ──────────────────────────────────────────────
+
+    async def flush(self):
+        """Write everything pending. Returns the number of messages stored."""
+        # Flushes run one at a time, so batches commit in arrival order
+        loop = asyncio.get_running_loop()
+        if self.lock_loop is not loop:
+            self.lock, self.lock_loop = asyncio.Lock(), loop
+        async with self.lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return 0
+            stored, failed = await database_sync_to_async(self.write)(batch)
+            # Failed messages go back in front, keeping arrival order
+            self.pending = self._retry(failed) + self.pending
+            return stored
+
+    def write(self, batch):
+        """
+        Store a batch (sync).
+
+        Returns:
+            (number of messages stored, the messages that couldn't be written)
+        """
+        try:
+            return self.insert(batch), []
+        except Exception as e:
+            logger.warning(f'Chat flush of {len(batch)} messages failed, writing room by room: {e}')
+
+        by_room = defaultdict(list)
+        for message in batch:
+            by_room[message.room_id].append(message)
+        stored, failed = 0, []
+        for room_id, messages in by_room.items():
+            try:
+                stored += self.insert(messages)
+            except Exception as e:
+                logger.warning(f'Chat flush for room {room_id} failed ({len(messages)} messages): {e}')
+                failed.extend(messages)
+        return stored, failed
+
+    @staticmethod
+    def insert(messages):
+        """
+        INSERT messages and touch their rooms in one transaction. Resends
+        of an already stored ``(sender, client_id)`` are skipped and logged.
+
+        Returns:
+            Number of messages stored.
+        """
+        from livechat.models import ChatMessage
+
+        with transaction.atomic():
+            ChatMessage.objects.bulk_create(messages, ignore_conflicts=True)
+            skipped = []
+            if any(message.client_id for message in messages):
+                # Ids are generated here, so only a resend can conflict
+                stored = set(ChatMessage.objects.filter(
+                    pk__in=[message.pk for message in messages],
+                ).values_list('pk', flat=True))
+                skipped = [message for message in messages if message.pk not in stored]
+            ChatWriteBuffer._touch_rooms([message for message in messages if message not in skipped])
+        for message in skipped:
+            logger.warning(
+                f'Chat message {message.client_id} from user {message.sender_id} in room '
+                f'{message.room_id} not stored: already received'
+            )
+        return len(messages) - len(skipped)
+
+    @staticmethod
+    def _touch_rooms(messages):
+        """One ``updated_at`` UPDATE per room: its newest message's time."""
+        from livechat.models import ChatRoom
+
+        newest = {}
+        for message in messages:
+            if message.room_id not in newest or message.created_at > newest[message.room_id]:
+                newest[message.room_id] = message.created_at
+        for room_id, updated_at in newest.items():
+            ChatRoom.objects.filter(pk=room_id).update(updated_at=updated_at)
+
+    def _retry(self, failed):
+        """Failed messages still worth retrying; drops (and logs) the rest."""
+        max_attempts = _setting('LIVECHAT_FLUSH_MAX_ATTEMPTS', 5)
+        retry, attempts = [], {}
+        for message in failed:
+            count = self.attempts.get(message.pk, 0) + 1
+            if count >= max_attempts:
+                logger.error(f'Chat message {message.pk} in room {message.room_id} dropped after {count} failed writes')
+            else:
+                attempts[message.pk] = count
+                retry.append(message)
+        # Every pending message was in the batch: the others were written
+        self.attempts = attempts
+        return retry
+
+
+# One buffer per server process, shared by its consumers
+write_buffer = ChatWriteBuffer()
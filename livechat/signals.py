@@ -0,0 +1,45 @@
+"""
+JeyaRamaDesk — Live Chat Signals
+Keeps cached room membership in sync when a room is assigned, closed or
+deleted, and tells the room's open consumers about the change.
+"""
+
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from livechat.models import ChatRoom
+from livechat.services.membership import RoomMembership
+
+logger = logging.getLogger('jeyaramadesk')
+
+
+@receiver(post_save, sender=ChatRoom)
+def room_saved(sender, instance, created, **kwargs):
+    if created:
+        return
+    RoomMembership.invalidate(instance.pk)
+    room = RoomMembership.snapshot(instance)
+    transaction.on_commit(lambda: _notify_consumers(instance.pk, room))
+
+
+@receiver(post_delete, sender=ChatRoom)
+def room_deleted(sender, instance, **kwargs):
+    RoomMembership.invalidate(instance.pk)
+    transaction.on_commit(lambda: _notify_consumers(instance.pk, None))
+
+
+def _notify_consumers(room_id, room):
+    """Send the new participants to the room's consumers (fails silently)."""
+    try:
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            return
+        async_to_sync(channel_layer.group_send)(f'chat_{room_id}', {'type': 'room_update', 'room': room})
+    except Exception as e:
+        logger.debug(f'Chat room update not broadcast: {e}')
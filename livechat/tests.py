@@ -1,3 +1,276 @@
-from django.test import TestCase
+"""
+JeyaRamaDesk — Live Chat Tests
+Write-behind persistence of WebSocket chat messages: ordering,
+durability (retries, per-room isolation, idempotent ids) and the
+broadcast-before-store flow of ChatConsumer, and server-side message ids.
+"""
 
-# Create your tests here.
+import asyncio
+import json
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from livechat.models import ChatMessage, ChatRoom
+from livechat.routing import websocket_urlpatterns
+from livechat.services.persistence import ChatWriteBuffer, write_buffer
+
+User = get_user_model()
+
+CHANNEL_LAYERS = {'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}}
+
+
+def _message(room, sender, content, created_at=None, **fields):
+    return ChatMessage(
+        id=uuid.uuid4(), room_id=room.pk, sender=sender, content=content,
+        created_at=created_at or timezone.now(), **fields,
+    )
+
+
+# Consumers hop to the database from worker threads, so these tests
+# commit for real instead of running inside one transaction.
+class ChatWriteBufferTests(TransactionTestCase):
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='x', first_name='Cus', last_name='Tomer', role='customer',
+        )
+        self.room = ChatRoom.objects.create(customer=self.customer)
+        self.buffer = ChatWriteBuffer()
+
+    def test_flush_stores_batch_and_touches_room_once(self):
+        start = timezone.now()
+        batch = [_message(self.room, self.customer, f'm{i}', start + timedelta(seconds=i)) for i in range(3)]
+        for message in batch:
+            self.buffer.pending.append(message)
+
+        with CaptureQueriesContext(connection) as queries:
+            stored = async_to_sync(self.buffer.flush)()
+
+        statements = [q['sql'].split()[0] for q in queries.captured_queries]
+        self.assertEqual([sql for sql in statements if sql in ('INSERT', 'UPDATE')], ['INSERT', 'UPDATE'])
+
+        self.assertEqual(stored, 3)
+        self.assertEqual(self.buffer.pending, [])
+        self.assertEqual(
+            list(self.room.messages.values_list('content', flat=True)), ['m0', 'm1', 'm2'],
+        )
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.updated_at, batch[-1].created_at)
+
+    def test_history_keeps_receive_order_not_write_order(self):
+        start = timezone.now()
+        first = _message(self.room, self.customer, 'first', start)
+        second = _message(self.room, self.customer, 'second', start + timedelta(milliseconds=5))
+        # Written in reverse: created_at (stamped on receipt) still orders them
+        self.buffer.write([second])
+        self.buffer.write([first])
+
+        self.assertEqual(list(self.room.messages.values_list('content', flat=True)), ['first', 'second'])
+        self.assertEqual(ChatMessage.objects.get(pk=first.pk).created_at, start)
+
+    def test_resent_or_retried_message_is_stored_once(self):
+        client_id = uuid.uuid4()
+        message = _message(self.room, self.customer, 'hello', client_id=client_id)
+        self.assertEqual(self.buffer.write([message]), (1, []))
+        resent = _message(self.room, self.customer, 'hello', client_id=client_id)
+
+        with self.assertLogs('jeyaramadesk', level='WARNING') as logs:
+            self.assertEqual(self.buffer.write([resent]), (0, []))
+
+        self.assertIn('already received', logs.output[0])
+        self.assertEqual(list(ChatMessage.objects.filter(client_id=client_id).values_list('pk', flat=True)), [message.pk])
+
+    def test_client_id_is_unique_per_sender_only(self):
+        agent = User.objects.create_user(
+            email='agent@example.com', password='x', first_name='Ag', last_name='Ent', role='agent',
+        )
+        client_id = uuid.uuid4()
+
+        stored, _ = self.buffer.write([
+            _message(self.room, self.customer, 'mine', client_id=client_id),
+            _message(self.room, agent, 'theirs', client_id=client_id),
+        ])
+
+        self.assertEqual(stored, 2)
+
+    def test_failing_room_does_not_hold_back_others(self):
+        other = ChatRoom.objects.create(customer=self.customer)
+        good = _message(self.room, self.customer, 'kept')
+        orphan = _message(other, self.customer, 'orphan')
+        other.delete()
+
+        stored, failed = self.buffer.write([good, orphan])
+
+        self.assertEqual((stored, failed), (1, [orphan]))
+        self.assertTrue(ChatMessage.objects.filter(pk=good.pk).exists())
+        self.assertFalse(ChatMessage.objects.filter(pk=orphan.pk).exists())
+
+    @override_settings(LIVECHAT_FLUSH_MAX_ATTEMPTS=2)
+    def test_failed_messages_are_retried_then_dropped(self):
+        other = ChatRoom.objects.create(customer=self.customer)
+        orphan = _message(other, self.customer, 'orphan')
+        other.delete()
+        self.buffer.pending.append(orphan)
+
+        async_to_sync(self.buffer.flush)()
+        self.assertEqual(self.buffer.pending, [orphan])
+        self.assertEqual(self.buffer.attempts, {orphan.pk: 1})
+
+        with self.assertLogs('jeyaramadesk', level='ERROR'):
+            async_to_sync(self.buffer.flush)()
+        self.assertEqual(self.buffer.pending, [])
+        self.assertEqual(self.buffer.attempts, {})
+
+    def test_retried_messages_stay_ahead_of_newer_ones(self):
+        other = ChatRoom.objects.create(customer=self.customer)
+        orphan = _message(other, self.customer, 'orphan')
+        other.delete()
+        self.buffer.pending.append(orphan)
+        newer = _message(self.room, self.customer, 'newer')
+
+        async def flush_while_receiving():
+            await self.buffer.flush()
+            self.buffer.pending.append(newer)
+
+        async_to_sync(flush_while_receiving)()
+        self.assertEqual(self.buffer.pending, [orphan, newer])
+
+    @override_settings(LIVECHAT_FLUSH_INTERVAL=0.01, LIVECHAT_FLUSH_BATCH_SIZE=1000)
+    def test_add_schedules_a_single_flush(self):
+        async def receive_burst():
+            for i in range(5):
+                self.buffer.add(_message(self.room, self.customer, f'm{i}'))
+            task = self.buffer.task
+            await asyncio.sleep(0.1)
+            return task
+
+        task = async_to_sync(receive_burst)()
+        self.assertTrue(task.done())
+        self.assertEqual(self.room.messages.count(), 5)
+
+
+@override_settings(CHANNEL_LAYERS=CHANNEL_LAYERS, LIVECHAT_FLUSH_INTERVAL=60)
+class ChatConsumerPersistenceTests(TransactionTestCase):
+
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            email='customer@example.com', password='x', first_name='Cus', last_name='Tomer', role='customer',
+        )
+        self.room = ChatRoom.objects.create(customer=self.customer)
+        write_buffer.pending.clear()
+
+    def tearDown(self):
+        write_buffer.pending.clear()
+
+    async def _connect(self):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/desk/ws/chat/{self.room.pk}/')
+        communicator.scope['user'] = self.customer
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    def test_message_is_broadcast_before_it_is_stored(self):
+        client_id = str(uuid.uuid4())
+
+        async def scenario():
+            communicator = await self._connect()
+            await communicator.send_to(text_data=json.dumps({'message': 'hi', 'client_id': client_id}))
+            frame = json.loads(await communicator.receive_from())
+            stored_before_flush = await ChatMessage.objects.filter(client_id=client_id).aexists()
+            await write_buffer.flush()
+            await communicator.disconnect()
+            return frame, stored_before_flush
+
+        frame, stored_before_flush = async_to_sync(scenario)()
+
+        self.assertEqual(frame['message']['client_id'], client_id)
+        self.assertNotEqual(frame['message']['id'], client_id)
+        self.assertFalse(stored_before_flush)
+        stored = ChatMessage.objects.get(pk=frame['message']['id'])
+        self.assertEqual(str(stored.client_id), client_id)
+        self.assertEqual(stored.content, 'hi')
+        self.assertEqual(stored.created_at.isoformat(), frame['message']['created_at'])
+
+    def test_reused_message_id_does_not_replace_the_original(self):
+        original = ChatMessage.objects.create(room=self.room, sender=self.customer, content='original')
+
+        async def scenario():
+            communicator = await self._connect()
+            await communicator.send_to(text_data=json.dumps({'message': 'forged', 'client_id': str(original.pk)}))
+            frame = json.loads(await communicator.receive_from())
+            await write_buffer.flush()
+            await communicator.disconnect()
+            return frame
+
+        frame = async_to_sync(scenario)()
+
+        self.assertNotEqual(frame['message']['id'], str(original.pk))
+        original.refresh_from_db()
+        self.assertEqual(original.content, 'original')
+        self.assertEqual(ChatMessage.objects.get(pk=frame['message']['id']).content, 'forged')
+
+    def test_invalid_client_id_gets_a_server_id(self):
+        async def scenario():
+            communicator = await self._connect()
+            await communicator.send_to(text_data=json.dumps({'message': 'hi', 'client_id': 'temp-123'}))
+            frame = json.loads(await communicator.receive_from())
+            await communicator.disconnect()
+            return frame
+
+        frame = async_to_sync(scenario)()
+
+        uuid.UUID(frame['message']['id'])
+        self.assertIsNone(frame['message']['client_id'])
+        self.assertTrue(ChatMessage.objects.filter(pk=frame['message']['id']).exists())
+
+    def test_disconnect_flushes_pending_messages(self):
+        async def scenario():
+            communicator = await self._connect()
+            for text in ('one', 'two', 'three'):
+                await communicator.send_to(text_data=json.dumps({'message': text}))
+                await communicator.receive_from()
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+        self.assertEqual(list(self.room.messages.values_list('content', flat=True)), ['one', 'two', 'three'])
+
+    @override_settings(LIVECHAT_WRITE_BEHIND=False)
+    def test_write_through_stores_before_broadcast(self):
+        async def scenario():
+            communicator = await self._connect()
+            await communicator.send_to(text_data=json.dumps({'message': 'now'}))
+            frame = json.loads(await communicator.receive_from())
+            stored = await ChatMessage.objects.filter(pk=frame['message']['id']).aexists()
+            await communicator.disconnect()
+            return stored
+
+        self.assertTrue(async_to_sync(scenario)())
+        self.assertEqual(write_buffer.pending, [])
+
+    @override_settings(LIVECHAT_WRITE_BEHIND=False)
+    def test_write_through_resend_is_not_broadcast_again(self):
+        client_id = str(uuid.uuid4())
+
+        async def scenario():
+            communicator = await self._connect()
+            payload = json.dumps({'message': 'once', 'client_id': client_id})
+            await communicator.send_to(text_data=payload)
+            await communicator.receive_from()
+            await communicator.send_to(text_data=payload)
+            resent_broadcast = not await communicator.receive_nothing(timeout=0.2)
+            await communicator.disconnect()
+            return resent_broadcast
+
+        with self.assertLogs('jeyaramadesk', level='WARNING'):
+            self.assertFalse(async_to_sync(scenario)())
+        self.assertEqual(ChatMessage.objects.filter(client_id=client_id).count(), 1)
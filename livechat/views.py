@@ -192,6 +192,7 @@ def fetch_messages(request, room_id):
     for m in qs[:50]:
         msgs.append({
             'id': str(m.id),
+            'client_id': str(m.client_id) if m.client_id else None,
             'content': m.content,
             'message_type': m.message_type,
             'sender_id': str(m.sender_id) if m.sender_id else '',
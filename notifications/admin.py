@@ -1,7 +1,7 @@
 """JeyaRamaDesk — Notification Admin"""
 
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, NotificationEmail, NotificationEvent, NotificationPreference
 
 
 @admin.register(Notification)
@@ -19,8 +19,87 @@ class NotificationAdmin(admin.ModelAdmin):
     @admin.action(description='Mark selected as read')
     def mark_read(self, request, queryset):
         from django.utils import timezone
+        from notifications.services.unread_counter import UnreadCounter
+        UnreadCounter.invalidate(set(queryset.values_list('user_id', flat=True)))
         queryset.filter(is_read=False).update(is_read=True, read_at=timezone.now())
 
     @admin.action(description='Mark selected as unread')
     def mark_unread(self, request, queryset):
+        from notifications.services.unread_counter import UnreadCounter
+        UnreadCounter.invalidate(set(queryset.values_list('user_id', flat=True)))
         queryset.update(is_read=False, read_at=None)
+
+
+@admin.register(NotificationEvent)
+class NotificationEventAdmin(admin.ModelAdmin):
+    list_display = ('event_type', 'ticket', 'attempts', 'created_at', 'processed_at')
+    list_filter = ('event_type', 'processed_at')
+    search_fields = ('dedup_key', 'last_error')
+    readonly_fields = (
+        'event_type', 'dedup_key', 'ticket', 'payload', 'attempts',
+        'last_error', 'created_at', 'processed_at',
+    )
+    list_per_page = 50
+
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected events')
+    def retry(self, request, queryset):
+        from notifications.services.outbox import NotificationOutbox
+        count = queryset.update(processed_at=None, attempts=0, last_error='')
+        NotificationOutbox.enqueue()
+        self.message_user(request, f'{count} events queued for another drain.')
+
+
+@admin.register(NotificationEmail)
+class NotificationEmailAdmin(admin.ModelAdmin):
+    list_display = ('user', 'notification', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('user__email', 'last_error')
+    readonly_fields = (
+        'notification', 'user', 'status', 'attempts', 'next_attempt_at',
+        'last_error', 'created_at', 'sent_at',
+    )
+    list_per_page = 50
+
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='Retry selected emails')
+    def retry(self, request, queryset):
+        from django.utils import timezone
+        count = queryset.exclude(status=NotificationEmail.Status.SENT).update(
+            status=NotificationEmail.Status.PENDING, attempts=0, last_error='',
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f'{count} emails queued for the next run.')
+
+
+@admin.register(NotificationPreference)
+class NotificationPreferenceAdmin(admin.ModelAdmin):
+    list_display = ('user', 'notification_type', 'in_app', 'websocket', 'email')
+    list_filter = ('notification_type', 'in_app', 'websocket', 'email')
+    search_fields = ('user__email',)
+    raw_id_fields = ('user',)
+
+    def save_model(self, request, obj, form, change):
+        from notifications.services.preferences import NotificationPreferences
+        super().save_model(request, obj, form, change)
+        NotificationPreferences.invalidate(obj.user_id)
+
+    def delete_model(self, request, obj):
+        from notifications.services.preferences import NotificationPreferences
+        super().delete_model(request, obj)
+        NotificationPreferences.invalidate(obj.user_id)
+
+    def delete_queryset(self, request, queryset):
+        from notifications.services.preferences import NotificationPreferences
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for user_id in user_ids:
+            NotificationPreferences.invalidate(user_id)
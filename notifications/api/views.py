@@ -7,6 +7,7 @@ from rest_framework.response import Response
 from django.utils import timezone
 
 from notifications.models import Notification
+from notifications.services.unread_counter import UnreadCounter
 from .serializers import NotificationSerializer
 
 
@@ -24,7 +25,7 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        qs = Notification.objects.filter(user=self.request.user)
+        qs = Notification.objects.filter(user=self.request.user, in_app=True)
         is_read = self.request.query_params.get('is_read')
         if is_read is not None:
             qs = qs.filter(is_read=is_read.lower() in ('true', '1'))
@@ -43,4 +44,5 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
         count = Notification.objects.filter(
             user=request.user, is_read=False,
         ).update(is_read=True, read_at=timezone.now())
+        UnreadCounter.read(request.user.pk, count)
         return Response({'marked_read': count})
@@ -1,11 +1,44 @@
 """
 JeyaRamaDesk — WebSocket Consumer for Real-time Notifications
 Delivers notifications to authenticated users via a per-user channel group.
+
+Resume protocol:
+    A reconnecting client passes the id of the last notification it saw
+    as ``?cursor=<id>``. The consumer joins the live group first, then
+    replays what was created after the cursor (oldest first, flagged
+    ``"backfill": true``) and finishes with a ``{"event": "resumed"}``
+    frame carrying the count, the new cursor and the unread count. Live
+    pushes queued during the replay are delivered afterwards, minus the
+    ones already replayed. A cursor that can't be resumed (unknown,
+    purged, or more than NOTIFICATION_RESUME_LIMIT behind) gets
+    ``"complete": false`` so the client reloads once.
+
+    Without a cursor the consumer sends ``{"event": "ready"}`` with the
+    newest notification id to use as the first cursor.
+
+Presence and coalescing:
+    Connects, disconnects and the client's ``{"action": "ping"}``
+    heartbeats keep the user's presence up to date, so pushes skip users
+    without a socket (see notifications.services.presence). Pushes that
+    arrive within NOTIFICATION_PUSH_COALESCE_WINDOW seconds are sent as
+    one frame: a single notification as before, several as
+    ``{"event": "batch", "notifications": [...]}``. When more than
+    NOTIFICATION_PUSH_MAX_PENDING pile up in one window (a slow client or
+    a big fan-out), they are dropped for one ``{"event": "overflow"}``
+    frame carrying the newest id, and the client reloads once.
 """
 
+import asyncio
 import json
 import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+
+from notifications.services.presence import NotificationPresence
 
 logger = logging.getLogger('jeyaramadesk')
 
@@ -17,29 +50,134 @@ class NotificationConsumer(AsyncWebsocketConsumer):
     """
 
     async def connect(self):
-        """Accept the connection and join the user's notification group."""
+        """Accept the connection, join the user's group and backfill from the cursor."""
         self.user = self.scope.get('user')
         if self.user and self.user.is_authenticated:
             self.group_name = f'notifications_{self.user.id}'
+            self.replayed = set()
+            self.pending = []
+            self.dropped = 0
+            self.flush_task = None
+            # Online before joining, and joined before reading the backlog,
+            # so nothing falls in between
+            await self._presence(NotificationPresence.connected)
             await self.channel_layer.group_add(self.group_name, self.channel_name)
             await self.accept()
             logger.debug(f'WS connected: {self.user.email}')
+
+            cursor = parse_qs(self.scope.get('query_string', b'').decode()).get('cursor', [''])[0]
+            if cursor:
+                await self._resume(cursor)
+            else:
+                await self.send(text_data=json.dumps({'event': 'ready', 'cursor': await self._newest_id()}))
         else:
             await self.close()
 
     async def disconnect(self, close_code):
         """Leave the notification group on disconnect."""
         if hasattr(self, 'group_name'):
+            if self.flush_task:
+                self.flush_task.cancel()
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await self._presence(NotificationPresence.disconnected)
             logger.debug(f'WS disconnected: {self.user.email}')
 
     async def receive(self, text_data=None, bytes_data=None):
-        """Handle incoming messages (currently unused — one-way push)."""
-        pass
+        """Handle client heartbeats (otherwise one-way push)."""
+        try:
+            data = json.loads(text_data)
+        except (json.JSONDecodeError, TypeError):
+            return
+        if isinstance(data, dict) and data.get('action') == 'ping':
+            await self._presence(NotificationPresence.heartbeat)
 
-    async def send_notification(self, event):
+    async def send_notifications(self, event):
         """
-        Handler for the ``send_notification`` event type dispatched
-        by NotificationService._push_realtime().
+        Handler for the ``send_notifications`` event type dispatched
+        by NotificationService._push_realtime_bulk(): one user's
+        notifications from one batch.
         """
-        await self.send(text_data=json.dumps(event['notification']))
+        for notification in event['notifications']:
+            if notification['id'] in self.replayed:
+                # Already sent by the backfill
+                self.replayed.discard(notification['id'])
+                continue
+            if len(self.pending) < getattr(settings, 'NOTIFICATION_PUSH_MAX_PENDING', 20):
+                self.pending.append(notification)
+            else:
+                # Backpressure: keep only the newest id for the overflow frame
+                self.dropped += 1
+                self.pending[-1] = notification
+
+        window = getattr(settings, 'NOTIFICATION_PUSH_COALESCE_WINDOW', 0.25)
+        if not window:
+            await self._flush()
+        elif self.pending and self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self._flush_later(window))
+
+    # ── Coalescing ────────────────────────────────────────────
+
+    async def _flush_later(self, window):
+        try:
+            await asyncio.sleep(window)
+        except asyncio.CancelledError:
+            return
+        self.flush_task = None
+        await self._flush()
+
+    async def _flush(self):
+        pending, dropped = self.pending, self.dropped
+        self.pending, self.dropped = [], 0
+        if not pending:
+            return
+        if dropped:
+            frame = {'event': 'overflow', 'count': len(pending) + dropped, 'cursor': pending[-1]['id']}
+            logger.debug(f'WS backpressure: {self.user.email}, {frame["count"]} notifications merged')
+        elif len(pending) == 1:
+            frame = pending[0]
+        else:
+            frame = {'event': 'batch', 'notifications': pending, 'cursor': pending[-1]['id']}
+        await self.send(text_data=json.dumps(frame))
+
+    async def _presence(self, update):
+        try:
+            await sync_to_async(update)(self.user.pk)
+        except Exception as e:
+            logger.debug(f'Notification presence not updated: {e}')
+
+    # ── Resume ────────────────────────────────────────────────
+
+    async def _resume(self, cursor):
+        frames, complete, unread = await self._missed(cursor)
+        for frame in frames:
+            self.replayed.add(frame['id'])
+            await self.send(text_data=json.dumps({**frame, 'backfill': True}))
+        await self.send(text_data=json.dumps({
+            'event': 'resumed',
+            'count': len(frames),
+            'complete': complete,
+            'cursor': frames[-1]['id'] if frames else cursor,
+            'unread_count': unread,
+        }))
+        if frames or not complete:
+            logger.debug(f'WS resumed: {self.user.email}, {len(frames)} replayed, complete={complete}')
+
+    @database_sync_to_async
+    def _missed(self, cursor):
+        from django.core.exceptions import ValidationError
+        from notifications.services.notification_service import NotificationService
+
+        try:
+            missed, complete = NotificationService.missed_since(
+                self.user.pk, cursor, getattr(settings, 'NOTIFICATION_RESUME_LIMIT', 100),
+            )
+        except (ValidationError, ValueError):
+            missed, complete = [], False  # malformed cursor
+        frames = [NotificationService._ws_payload(n) for n in missed]
+        return frames, complete, NotificationService.get_unread_count(self.user)
+
+    @database_sync_to_async
+    def _newest_id(self):
+        from notifications.models import Notification
+        newest = Notification.objects.filter(user_id=self.user.pk, in_app=True).values_list('id', flat=True).first()
+        return str(newest) if newest else None
@@ -1,18 +1,17 @@
 """JeyaRamaDesk — Notification Context Processor"""
 
-from notifications.models import Notification
+from django.utils.functional import SimpleLazyObject
+
+from notifications.services.unread_counter import UnreadCounter
 
 
 def unread_notifications_count(request):
     """
-    Inject ``unread_notifications_count`` into every template context
-    so the topbar badge can be rendered without an extra query in every view.
+    Inject ``unread_notifications_count`` into every template context for
+    the topbar badge. The value is lazy: it reads the cached counter only
+    when a template renders it, so pages without the badge pay nothing.
     """
     if request.user.is_authenticated:
-        return {
-            'unread_notifications_count': Notification.objects.filter(
-                user=request.user,
-                is_read=False,
-            ).count()
-        }
+        user_id = request.user.pk
+        return {'unread_notifications_count': SimpleLazyObject(lambda: UnreadCounter.get(user_id))}
     return {'unread_notifications_count': 0}
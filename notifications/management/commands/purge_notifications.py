@@ -0,0 +1,41 @@
+"""
+JeyaRamaDesk — Apply notification retention now.
+
+Usage:
+    python manage.py purge_notifications [--dry-run]
+"""
+
+from django.core.management.base import BaseCommand
+
+from notifications.services.retention import NotificationRetention
+
+
+class Command(BaseCommand):
+    help = 'Delete expired read notifications and notifications beyond the per-user cap, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report how many notifications would be deleted without deleting.',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            plan = NotificationRetention.plan()
+            self.stdout.write(self.style.SUCCESS(
+                f'{plan["expired"]} expired read notifications and {plan["over_cap"]} '
+                f'over the cap ({plan["users_over_cap"]} users) would be deleted.'
+            ))
+            return
+
+        stats = NotificationRetention.purge()
+        if stats is None:
+            self.stdout.write(self.style.WARNING('A purge is already running.'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {stats["expired_deleted"]} expired and {stats["capped_deleted"]} over-cap '
+            f'notifications ({stats["users_capped"]} users) in {stats["batches"]} batches, '
+            f'{stats["seconds"]}s.'
+        ))
+        if not stats['complete']:
+            self.stdout.write('Time budget reached; run again to continue.')
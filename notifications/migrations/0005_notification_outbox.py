@@ -0,0 +1,36 @@
+# Generated by Django 4.2.28 on 2026-10-19 00:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticketevent_depth'),
+        ('notifications', '0004_alter_notification_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(max_length=30)),
+                ('dedup_key', models.CharField(help_text='Identifies the event; recording it again is a no-op.', max_length=191, unique=True)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, help_text='When notifications were created, or the event was given up on (null = pending).', null=True)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_events', to='tickets.ticket')),
+            ],
+            options={
+                'verbose_name': 'Notification Outbox Event',
+                'verbose_name_plural': 'Notification Outbox',
+                'db_table': 'jrd_notification_outbox',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['processed_at', 'id'], name='idx_notif_outbox_pending')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.28 on 2026-10-19 00:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0006_notification_read_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationPreference',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('notification_type', models.CharField(choices=[('ticket_created', 'Ticket Created'), ('ticket_assigned', 'Ticket Assigned'), ('ticket_updated', 'Ticket Updated'), ('ticket_resolved', 'Ticket Resolved'), ('comment_added', 'Comment Added'), ('status_change', 'Status Changed'), ('priority_change', 'Priority Changed'), ('sla_breach', 'SLA Breach'), ('automation', 'Automation'), ('system', 'System')], max_length=25)),
+                ('in_app', models.BooleanField(default=True, help_text='Store the notification in the notification list.')),
+                ('websocket', models.BooleanField(default=True, help_text='Push it live to open browser tabs.')),
+                ('email', models.BooleanField(default=True, help_text='Include it in email (also needs the email_notifications switch).')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_preferences', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notification Preference',
+                'verbose_name_plural': 'Notification Preferences',
+                'db_table': 'jrd_notification_preferences',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='notificationpreference',
+            constraint=models.UniqueConstraint(fields=('user', 'notification_type'), name='uniq_notif_pref_user_type'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.28 on 2026-10-19 01:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0008_notification_emails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='in_app',
+            field=models.BooleanField(default=True, help_text='Shown in the notification list. Off for a type the recipient only wants by email.'),
+        ),
+        migrations.AlterField(
+            model_name='notificationpreference',
+            name='in_app',
+            field=models.BooleanField(default=True, help_text='Show the notification in the notification list.'),
+        ),
+    ]
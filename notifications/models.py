@@ -48,6 +48,10 @@ class Notification(models.Model):
         help_text='Ticket this notification relates to (optional).',
     )
     is_read = models.BooleanField(default=False, db_index=True)
+    in_app = models.BooleanField(
+        default=True,
+        help_text='Shown in the notification list. Off for a type the recipient only wants by email.',
+    )
     read_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -57,6 +61,7 @@ class Notification(models.Model):
         indexes = [
             models.Index(fields=['user', '-created_at'], name='idx_notif_user_created'),
             models.Index(fields=['user', 'is_read'], name='idx_notif_user_unread'),
+            models.Index(fields=['is_read', 'created_at'], name='idx_notif_read_created'),
         ]
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
@@ -68,6 +73,121 @@ class Notification(models.Model):
         """Mark this notification as read."""
         if not self.is_read:
             from django.utils import timezone
+            from notifications.services.unread_counter import UnreadCounter
             self.is_read = True
             self.read_at = timezone.now()
-            self.save(update_fields=['is_read', 'read_at'])
+            # Conditional update: only the request that flips the flag discounts it
+            if Notification.objects.filter(pk=self.pk, is_read=False).update(is_read=True, read_at=self.read_at):
+                UnreadCounter.read(self.user_id)
+
+
+class NotificationPreference(models.Model):
+    """
+    A user's delivery choice for one notification type. Only choices that
+    differ from the defaults are stored (see
+    notifications.services.preferences); no row means the defaults apply.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='notification_preferences',
+    )
+    notification_type = models.CharField(max_length=25, choices=Notification.NotificationType.choices)
+    in_app = models.BooleanField(default=True, help_text='Show the notification in the notification list.')
+    websocket = models.BooleanField(default=True, help_text='Push it live to open browser tabs.')
+    email = models.BooleanField(default=True, help_text='Include it in email (also needs the email_notifications switch).')
+
+    class Meta:
+        db_table = 'jrd_notification_preferences'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'notification_type'], name='uniq_notif_pref_user_type'),
+        ]
+        verbose_name = 'Notification Preference'
+        verbose_name_plural = 'Notification Preferences'
+
+    def __str__(self):
+        return f'{self.user_id} / {self.notification_type}'
+
+
+class NotificationEmail(models.Model):
+    """
+    A notification waiting to go out by email. Rows are queued next to
+    the notification for recipients with the email channel on and sent
+    in per-user digests (see notifications.services.email_delivery).
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        SENT    = 'sent',    'Sent'
+        FAILED  = 'failed',  'Failed'
+        SKIPPED = 'skipped', 'Skipped'
+
+    id = models.BigAutoField(primary_key=True)
+    notification = models.ForeignKey(
+        Notification, on_delete=models.CASCADE, related_name='emails',
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notification_emails',
+    )
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(help_text='Not sent before this time (retry backoff).')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'jrd_notification_emails'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='idx_notif_email_due'),
+        ]
+        verbose_name = 'Notification Email'
+        verbose_name_plural = 'Notification Emails'
+
+    def __str__(self):
+        return f'{self.notification_id} → {self.user_id} ({self.status})'
+
+
+class NotificationEvent(models.Model):
+    """
+    Transactional outbox row for signal-driven notifications (see
+    notifications.services.outbox). Written inside the transaction that
+    saved the ticket / comment and turned into notifications by a worker
+    once it commits.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    event_type = models.CharField(max_length=30)
+    dedup_key = models.CharField(
+        max_length=191,
+        unique=True,
+        help_text='Identifies the event; recording it again is a no-op.',
+    )
+    ticket = models.ForeignKey(
+        'tickets.Ticket',
+        on_delete=models.CASCADE,
+        related_name='notification_events',
+    )
+    payload = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text='When notifications were created, or the event was given up on (null = pending).',
+    )
+
+    class Meta:
+        db_table = 'jrd_notification_outbox'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['processed_at', 'id'], name='idx_notif_outbox_pending'),
+        ]
+        verbose_name = 'Notification Outbox Event'
+        verbose_name_plural = 'Notification Outbox'
+
+    def __str__(self):
+        return f'{self.event_type} on ticket {self.ticket_id}'
@@ -0,0 +1,213 @@
+"""
+JeyaRamaDesk — Notification Email Delivery
+The email channel: notifications are queued as ``NotificationEmail`` rows
+and sent as one digest per recipient per run.
+
+Queueing:
+    ``NotificationService.create_bulk`` queues a row for every
+    notification whose recipient has the email channel on for its type
+    (see notifications.services.preferences), with the same INSERT
+    transaction. Nothing talks to SMTP on the request path.
+
+Sending:
+    The ``send_notification_emails`` beat task claims due rows
+    (``idx_notif_email_due``), up to NOTIFICATION_EMAIL_BATCH_SIZE, and
+    groups them by recipient. Each recipient gets one message listing all
+    of their pending notifications, newest first. The subject, text and
+    HTML templates are loaded once per run and rendered per recipient.
+    All messages of a run go over one SMTP connection from
+    ``get_connection()``, opened once and reused by ``send_messages``.
+    The connection is re-opened only after a failure.
+
+Retries:
+    A digest that fails to send leaves its rows pending with
+    ``next_attempt_at`` pushed back (NOTIFICATION_EMAIL_BACKOFF_BASE
+    seconds, doubling, capped at NOTIFICATION_EMAIL_BACKOFF_MAX). After
+    NOTIFICATION_EMAIL_MAX_ATTEMPTS the rows are marked failed. Rows for
+    users who turned email off or lost their address since are skipped.
+
+The backend is Django's EMAIL_BACKEND, so the locmem backend (tests) and
+the console backend (development) work unchanged.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications.models import NotificationEmail
+
+logger = logging.getLogger('jeyaramadesk')
+
+LOCK_KEY = 'notifications:email:lock'
+LOCK_TIMEOUT = 600
+
+SUBJECT_TEMPLATE = 'notifications/email/digest_subject.txt'
+TEXT_TEMPLATE = 'notifications/email/digest.txt'
+HTML_TEMPLATE = 'notifications/email/digest.html'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class EmailDelivery:
+    """Queueing and batched, pooled sending of notification emails."""
+
+    # ── Queueing ──────────────────────────────────────────────
+
+    @staticmethod
+    def queue(notifications):
+        """Queue saved notifications for email (same transaction as the insert)."""
+        if not notifications or not _setting('NOTIFICATION_EMAIL_ENABLED', True):
+            return
+        now = timezone.now()
+        NotificationEmail.objects.bulk_create([
+            NotificationEmail(notification=n, user_id=n.user_id, next_attempt_at=now)
+            for n in notifications
+        ])
+
+    # ── Sending (workers) ─────────────────────────────────────
+
+    @staticmethod
+    def send_due():
+        """
+        Send one digest per recipient for due rows. Returns a summary dict.
+        """
+        if not cache.add(LOCK_KEY, 1, LOCK_TIMEOUT):
+            logger.info('Notification emails: previous run still in progress, skipping.')
+            return {'digests': 0, 'sent': 0, 'failed': 0, 'skipped': 0}
+        try:
+            return EmailDelivery._send_due()
+        finally:
+            cache.delete(LOCK_KEY)
+
+    @staticmethod
+    def _send_due():
+        now = timezone.now()
+        rows = list(
+            NotificationEmail.objects.filter(
+                status=NotificationEmail.Status.PENDING, next_attempt_at__lte=now,
+            ).select_related('user', 'notification__ticket')
+            .order_by('next_attempt_at', 'id')[:_setting('NOTIFICATION_EMAIL_BATCH_SIZE', 1000)]
+        )
+        summary = {'digests': 0, 'sent': 0, 'failed': 0, 'skipped': 0}
+        if not rows:
+            return summary
+
+        by_user = defaultdict(list)
+        skipped = []
+        for row in rows:
+            user = row.user
+            if not (user.is_active and user.email and user.email_notifications):
+                skipped.append(row.id)
+            else:
+                by_user[user].append(row)
+        if skipped:
+            NotificationEmail.objects.filter(id__in=skipped).update(status=NotificationEmail.Status.SKIPPED)
+            summary['skipped'] = len(skipped)
+
+        templates = (get_template(SUBJECT_TEMPLATE), get_template(TEXT_TEMPLATE), get_template(HTML_TEMPLATE))
+        context = {
+            'site_url': _setting('NOTIFICATION_EMAIL_SITE_URL', '').rstrip('/'),
+            'notifications_path': reverse('notifications:list'),
+            'preferences_path': reverse('notifications:preferences'),
+        }
+        connection = get_connection()
+        try:
+            for user, user_rows in by_user.items():
+                message = EmailDelivery.render(user, user_rows, templates, context, connection)
+                error = EmailDelivery._send(connection, message)
+                ids = [row.id for row in user_rows]
+                summary['digests'] += 1
+                if error is None:
+                    NotificationEmail.objects.filter(id__in=ids).update(
+                        status=NotificationEmail.Status.SENT, sent_at=timezone.now(), last_error='',
+                    )
+                    summary['sent'] += len(ids)
+                elif EmailDelivery._failed(user, user_rows, error):
+                    summary['failed'] += len(ids)
+        finally:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+        logger.info(
+            f'Notification emails: {summary["digests"]} digests, {summary["sent"]} notifications sent, '
+            f'{summary["failed"]} failed, {summary["skipped"]} skipped'
+        )
+        return summary
+
+    @staticmethod
+    def render(user, rows, templates, context, connection=None):
+        """Build one recipient's digest message from pre-loaded templates."""
+        subject_template, text_template, html_template = templates
+        notifications = sorted((row.notification for row in rows), key=lambda n: n.created_at, reverse=True)
+        context = {**context, 'user': user, 'notifications': notifications, 'count': len(notifications)}
+        subject = ' '.join(subject_template.render(context).split())
+        message = EmailMultiAlternatives(
+            subject=subject,
+            body=text_template.render(context),
+            from_email=_setting('DEFAULT_FROM_EMAIL', None),
+            to=[user.email],
+            connection=connection,
+        )
+        message.attach_alternative(html_template.render(context), 'text/html')
+        return message
+
+    @staticmethod
+    def _send(connection, message):
+        """Send over the shared connection, re-opening it once if it dropped. Returns an error or None."""
+        for attempt in (1, 2):
+            try:
+                connection.open()
+                if connection.send_messages([message]) == 1:
+                    return None
+                return 'Backend accepted no message'
+            except Exception as e:
+                error = f'{type(e).__name__}: {e}'
+                try:
+                    connection.close()
+                except Exception:
+                    pass
+                if attempt == 2:
+                    return error
+
+    @staticmethod
+    def backoff(attempts):
+        """Seconds to wait after ``attempts`` failed tries."""
+        base = _setting('NOTIFICATION_EMAIL_BACKOFF_BASE', 60)
+        return min(base * 2 ** (attempts - 1), _setting('NOTIFICATION_EMAIL_BACKOFF_MAX', 3600))
+
+    @staticmethod
+    def _failed(user, rows, error):
+        """Reschedule or give up on a recipient's rows. Returns True when given up."""
+        attempts = max(row.attempts for row in rows) + 1
+        give_up = attempts >= _setting('NOTIFICATION_EMAIL_MAX_ATTEMPTS', 5)
+        NotificationEmail.objects.filter(id__in=[row.id for row in rows]).update(
+            attempts=attempts,
+            last_error=error[:1000],
+            status=NotificationEmail.Status.FAILED if give_up else NotificationEmail.Status.PENDING,
+            next_attempt_at=timezone.now() + timedelta(seconds=EmailDelivery.backoff(attempts)),
+        )
+        if give_up:
+            logger.error(f'Notification digest to {user.email} failed after {attempts} attempts: {error}')
+        else:
+            logger.warning(f'Notification digest to {user.email} failed (attempt {attempts}): {error}')
+        return give_up
+
+    @staticmethod
+    def purge():
+        """Delete sent, failed and skipped rows past the retention window."""
+        cutoff = timezone.now() - timedelta(days=_setting('NOTIFICATION_EMAIL_RETENTION_DAYS', 7))
+        deleted, _ = NotificationEmail.objects.filter(
+            created_at__lt=cutoff,
+        ).exclude(status=NotificationEmail.Status.PENDING).delete()
+        return deleted
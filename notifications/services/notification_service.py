@@ -2,11 +2,30 @@
 JeyaRamaDesk — Notification Service
 Centralised helper for creating notifications and optionally
 pushing them to the connected WebSocket consumer.
+
+Fan-out to several recipients goes through ``create_bulk`` /
+``create_for_users``: one ``bulk_create`` for all rows and one event-loop
+pass that sends every channel group message concurrently, instead of an
+INSERT plus a blocking ``group_send`` per recipient.
+
+Every notification passes the recipient's preferences first (see
+notifications.services.preferences). Each channel is decided on its
+own: a type wanted only by email is stored hidden from the list, one
+wanted only live is pushed but not stored, and one with live push off
+is stored but not pushed.
 """
 
+import asyncio
 import logging
+from collections import defaultdict
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from notifications.models import Notification
+from notifications.services.email_delivery import EmailDelivery
+from notifications.services.preferences import RecipientResolver
+from notifications.services.presence import NotificationPresence
+from notifications.services.unread_counter import UnreadCounter
 
 logger = logging.getLogger('jeyaramadesk')
 
@@ -29,160 +48,269 @@ class NotificationService:
             ticket: related Ticket instance (optional)
 
         Returns:
-            Notification instance
+            Notification instance, or None if nothing was stored (the
+            user wants the type on no channel, or only live)
         """
-        notification = Notification.objects.create(
+        created = NotificationService.create_bulk([Notification(
             user=user,
             title=title,
             message=message,
             notification_type=notification_type,
             ticket=ticket,
+        )])
+        if created:
+            logger.info(f'Notification created: "{title}" → {user.email}')
+        return created[0] if created else None
+
+    @staticmethod
+    def create_bulk(notifications):
+        """
+        Persist many unsaved Notification instances with one INSERT, after
+        applying their recipients' channels, queue email for recipients
+        who want it, and push them all in one event-loop pass once the
+        current transaction commits.
+
+        Returns:
+            The saved notifications.
+        """
+        notifications, push, email = RecipientResolver.resolve([n for n in notifications if n.user_id])
+        if notifications:
+            Notification.objects.bulk_create(notifications)
+            UnreadCounter.created(notifications)
+            EmailDelivery.queue(email)
+        if push:
+            now = timezone.now()
+            for notification in push:
+                if notification.created_at is None:
+                    notification.created_at = now  # pushed live only, never saved
+            # Attempt WebSocket push (fail silently if Channels unavailable)
+            transaction.on_commit(lambda: NotificationService._push_realtime_bulk(push))
+        logger.info(
+            f'Notifications created: {len(notifications)} '
+            f'({", ".join(sorted({n.title for n in notifications}))})'
         )
-        # Attempt WebSocket push (fail silently if Channels unavailable)
-        NotificationService._push_realtime(notification)
-        logger.info(f'Notification created: "{title}" → {user.email}')
-        return notification
+        return notifications
+
+    @staticmethod
+    def create_for_users(users, *, title, message='', notification_type='system', ticket=None):
+        """Send the same notification to each of ``users`` (see create_bulk)."""
+        return NotificationService.create_bulk(NotificationService._for_users(
+            {user.pk for user in users},
+            title=title, message=message, notification_type=notification_type, ticket=ticket,
+        ))
+
+    @staticmethod
+    def _for_users(user_ids, **fields):
+        return [Notification(user_id=user_id, **fields) for user_id in user_ids]
+
+    @staticmethod
+    def _recipients(*user_ids, exclude=None):
+        """Distinct recipient ids (as strings), skipping blanks and ``exclude``."""
+        recipients = {str(user_id) for user_id in user_ids if user_id}
+        recipients.discard(str(exclude))
+        return recipients
 
     @staticmethod
     def get_unread_count(user):
-        """Return the number of unread notifications for a user."""
-        return Notification.objects.filter(user=user, is_read=False).count()
+        """Return the number of unread notifications for a user (cached counter)."""
+        return UnreadCounter.get(user.pk)
 
     @staticmethod
     def get_recent(user, limit=20):
         """Return the most recent notifications for a user."""
-        return Notification.objects.filter(user=user)[:limit]
+        return Notification.objects.filter(user=user, in_app=True)[:limit]
+
+    @staticmethod
+    def missed_since(user_id, cursor, limit):
+        """
+        A user's notifications created after the one named by ``cursor``
+        (a notification id), oldest first, for WebSocket resume.
+
+        Returns:
+            (notifications, complete). ``complete`` is False when the
+            cursor is unknown (invalid, another user's, or purged) or more
+            than ``limit`` notifications were missed; the client should
+            then reload instead of replaying.
+        """
+        from django.db.models import Q
+
+        anchor = (
+            Notification.objects.filter(user_id=user_id, pk=cursor)
+            .values_list('created_at', 'id').first()
+        )
+        if anchor is None:
+            return [], False
+        created_at, anchor_id = anchor
+        missed = list(
+            Notification.objects.filter(user_id=user_id, in_app=True)
+            .filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=anchor_id))
+            .order_by('created_at', 'id')[:limit + 1]
+        )
+        return missed[:limit], len(missed) <= limit
 
     # ── Convenience helpers (used by signals / automation) ────
 
+    # The notify_* helpers send right away. Each has a builder returning
+    # the unsaved notifications, which the outbox worker batches instead.
+
     @staticmethod
     def notify_new_ticket(ticket):
         """Notify managers and superadmins about a new ticket."""
-        from accounts.models import User
-        staff = User.objects.filter(
-            role__in=['superadmin', 'manager'],
-            is_active=True,
+        NotificationService.create_bulk(NotificationService.build_new_ticket(ticket))
+
+    @staticmethod
+    def build_new_ticket(ticket):
+        return NotificationService._for_users(
+            RecipientResolver.staff_ids(),
+            title='New Ticket Created',
+            message=f'Ticket {ticket.ticket_id}: {ticket.title}',
+            notification_type='ticket_created',
+            ticket=ticket,
         )
-        for user in staff:
-            NotificationService.create_notification(
-                user=user,
-                title='New Ticket Created',
-                message=f'Ticket {ticket.ticket_id}: {ticket.title}',
-                notification_type='ticket_created',
-                ticket=ticket,
-            )
 
     @staticmethod
     def notify_new_comment(comment):
         """Notify the ticket owner, assigned agent, and admins about a new comment."""
-        ticket = comment.ticket
-        recipients = set()
-
-        # Notify ticket customer (unless they wrote the comment)
-        if ticket.customer and ticket.customer != comment.author:
-            recipients.add(ticket.customer)
+        NotificationService.create_bulk(NotificationService.build_new_comment(comment))
 
-        # Notify assigned agent (unless they wrote the comment)
-        if ticket.assigned_agent and ticket.assigned_agent != comment.author:
-            recipients.add(ticket.assigned_agent)
-
-        # If the commenter is a customer, also notify managers / superadmins
+    @staticmethod
+    def build_new_comment(comment):
+        ticket = comment.ticket
+        # Ticket customer and assigned agent, plus managers / superadmins
+        # when a customer commented; never the comment's author
+        candidates = [ticket.customer_id, ticket.assigned_agent_id]
         if comment.author and hasattr(comment.author, 'is_customer') and comment.author.is_customer:
-            from accounts.models import User
-            staff = User.objects.filter(
-                role__in=['superadmin', 'manager'],
-                is_active=True,
-            ).exclude(pk=comment.author.pk)
-            recipients.update(staff)
-
-        for user in recipients:
-            NotificationService.create_notification(
-                user=user,
-                title='New Comment',
-                message=f'{comment.author.full_name or comment.author.email} commented on {ticket.ticket_id}',
-                notification_type='comment_added',
-                ticket=ticket,
-            )
+            candidates += RecipientResolver.staff_ids()
+        recipients = NotificationService._recipients(*candidates, exclude=comment.author_id)
+
+        return NotificationService._for_users(
+            recipients,
+            title='New Comment',
+            message=f'{comment.author.full_name or comment.author.email} commented on {ticket.ticket_id}',
+            notification_type='comment_added',
+            ticket=ticket,
+        )
 
     @staticmethod
     def notify_ticket_assigned(ticket):
         """Notify the assigned agent about their new assignment."""
-        if ticket.assigned_agent:
-            NotificationService.create_notification(
-                user=ticket.assigned_agent,
-                title='Ticket Assigned to You',
-                message=f'You have been assigned ticket {ticket.ticket_id}: {ticket.title}',
-                notification_type='ticket_assigned',
-                ticket=ticket,
-            )
+        NotificationService.create_bulk(
+            NotificationService.build_ticket_assigned(ticket, ticket.assigned_agent_id),
+        )
+
+    @staticmethod
+    def build_ticket_assigned(ticket, agent_id):
+        """``agent_id`` is the agent assigned at the time, who may have changed since."""
+        if not agent_id:
+            return []
+        return [Notification(
+            user_id=agent_id,
+            title='Ticket Assigned to You',
+            message=f'You have been assigned ticket {ticket.ticket_id}: {ticket.title}',
+            notification_type='ticket_assigned',
+            ticket=ticket,
+        )]
 
     @staticmethod
     def notify_sla_breach(ticket, breach_type='response'):
         """Notify agent and managers about an SLA breach."""
-        from accounts.models import User
-
         message = f'SLA {breach_type} breach on ticket {ticket.ticket_id}'
-        recipients = set()
+        recipients = NotificationService._recipients(ticket.assigned_agent_id, *RecipientResolver.staff_ids())
+
+        NotificationService.create_bulk(NotificationService._for_users(
+            recipients,
+            title='SLA Breach Alert',
+            message=message,
+            notification_type='sla_breach',
+            ticket=ticket,
+        ))
 
-        if ticket.assigned_agent:
-            recipients.add(ticket.assigned_agent)
+    @staticmethod
+    def notify_sla_breach_digest(user, breaches):
+        """Send a single notification summarising several SLA breaches."""
+        created = NotificationService.create_bulk([
+            NotificationService._breach_digest(user, breaches),
+        ])
+        return created[0] if created else None
 
-        managers = User.objects.filter(role__in=['superadmin', 'manager'], is_active=True)
-        recipients.update(managers)
+    @staticmethod
+    def notify_sla_breach_digests(digests):
+        """Send every recipient their digest: ``{user: [breach, ...]}``, one INSERT."""
+        return NotificationService.create_bulk([
+            NotificationService._breach_digest(user, breaches)
+            for user, breaches in digests.items()
+        ])
 
-        for user in recipients:
-            NotificationService.create_notification(
+    @staticmethod
+    def _breach_digest(user, breaches):
+        """
+        Unsaved digest notification. A one-breach digest reads like a
+        normal breach alert and links the ticket.
+        """
+        if len(breaches) == 1:
+            breach = breaches[0]
+            return Notification(
                 user=user,
                 title='SLA Breach Alert',
-                message=message,
+                message=f'SLA {breach.breach_type} breach on ticket {breach.ticket.ticket_id}',
                 notification_type='sla_breach',
-                ticket=ticket,
+                ticket=breach.ticket,
             )
 
+        max_listed = getattr(settings, 'SLA_BREACH_DIGEST_MAX_LISTED', 10)
+        listed = ', '.join(
+            f'{b.ticket.ticket_id} ({b.breach_type})' for b in breaches[:max_listed]
+        )
+        more = len(breaches) - max_listed
+        if more > 0:
+            listed += f' and {more} more'
+
+        return Notification(
+            user=user,
+            title=f'SLA Breach Alert: {len(breaches)} breaches',
+            message=f'{len(breaches)} SLA breaches detected: {listed}',
+            notification_type='sla_breach',
+        )
+
     @staticmethod
     def notify_status_change(ticket, old_status):
         """Notify customer and assigned agent when ticket status changes."""
-        recipients = set()
+        NotificationService.create_bulk(NotificationService.build_status_change(ticket, old_status))
 
-        # Notify the customer who raised the ticket
-        if ticket.customer:
-            recipients.add(ticket.customer)
-
-        # Notify the assigned agent
-        if ticket.assigned_agent:
-            recipients.add(ticket.assigned_agent)
+    @staticmethod
+    def build_status_change(ticket, old_status, new_status=None):
+        new_status = new_status or ticket.status
+        # The customer who raised the ticket and the assigned agent
+        recipients = NotificationService._recipients(ticket.customer_id, ticket.assigned_agent_id)
 
         display_old = old_status.replace('_', ' ').title()
-        display_new = ticket.status.replace('_', ' ').title()
+        display_new = new_status.replace('_', ' ').title()
 
-        for user in recipients:
-            NotificationService.create_notification(
-                user=user,
-                title='Ticket Status Updated',
-                message=f'Ticket {ticket.ticket_id} status changed from {display_old} to {display_new}.',
-                notification_type='status_change',
-                ticket=ticket,
-            )
+        return NotificationService._for_users(
+            recipients,
+            title='Ticket Status Updated',
+            message=f'Ticket {ticket.ticket_id} status changed from {display_old} to {display_new}.',
+            notification_type='status_change',
+            ticket=ticket,
+        )
 
     @staticmethod
     def notify_priority_change(ticket, old_priority):
         """Notify customer and assigned agent when ticket priority changes."""
-        recipients = set()
-
-        if ticket.customer:
-            recipients.add(ticket.customer)
-
-        if ticket.assigned_agent:
-            recipients.add(ticket.assigned_agent)
+        NotificationService.create_bulk(NotificationService.build_priority_change(ticket, old_priority))
 
-        for user in recipients:
-            NotificationService.create_notification(
-                user=user,
-                title='Ticket Priority Changed',
-                message=f'Ticket {ticket.ticket_id} priority changed from {old_priority.title()} to {ticket.priority.title()}.',
-                notification_type='priority_change',
-                ticket=ticket,
-            )
+    @staticmethod
+    def build_priority_change(ticket, old_priority, new_priority=None):
+        new_priority = new_priority or ticket.priority
+        recipients = NotificationService._recipients(ticket.customer_id, ticket.assigned_agent_id)
+
+        return NotificationService._for_users(
+            recipients,
+            title='Ticket Priority Changed',
+            message=f'Ticket {ticket.ticket_id} priority changed from {old_priority.title()} to {new_priority.title()}.',
+            notification_type='priority_change',
+            ticket=ticket,
+        )
 
     # ── WebSocket push ────────────────────────────────────────
 
@@ -192,6 +320,19 @@ class NotificationService:
         Push a notification to the user's WebSocket channel group.
         Fails silently if Channels / Redis is unavailable.
         """
+        NotificationService._push_realtime_bulk([notification])
+
+    @staticmethod
+    def _push_realtime_bulk(notifications):
+        """
+        Push notifications to their users' channel groups in one
+        ``async_to_sync`` call; the group sends run concurrently.
+
+        Only users with an open socket are sent to (see
+        notifications.services.presence), and each gets one message
+        carrying all of their notifications in the batch.
+        Fails silently if Channels / Redis is unavailable.
+        """
         try:
             from channels.layers import get_channel_layer
             from asgiref.sync import async_to_sync
@@ -200,20 +341,49 @@ class NotificationService:
             if channel_layer is None:
                 return
 
-            group_name = f'notifications_{notification.user.id}'
-            async_to_sync(channel_layer.group_send)(
-                group_name,
-                {
-                    'type': 'send_notification',
-                    'notification': {
-                        'id': str(notification.id),
-                        'title': notification.title,
-                        'message': notification.message,
-                        'type': notification.notification_type,
-                        'ticket_id': str(notification.ticket_id) if notification.ticket_id else None,
-                        'created_at': notification.created_at.isoformat(),
-                    },
-                },
-            )
+            by_user = defaultdict(list)
+            for n in notifications:
+                by_user[str(n.user_id)].append(n)
+            online = NotificationPresence.online(by_user)
+            if len(online) < len(by_user):
+                logger.debug(f'WebSocket push skipped for {len(by_user) - len(online)} offline users')
+            if not online:
+                return
+
+            messages = [
+                (f'notifications_{user_id}', NotificationService._ws_message(*by_user[user_id]))
+                for user_id in online
+            ]
+            async_to_sync(NotificationService._group_send_all)(channel_layer, messages)
         except Exception as e:
             logger.debug(f'WebSocket push skipped: {e}')
+
+    @staticmethod
+    async def _group_send_all(channel_layer, messages):
+        results = await asyncio.gather(
+            *(channel_layer.group_send(group, message) for group, message in messages),
+            return_exceptions=True,
+        )
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            logger.debug(f'WebSocket push skipped for {len(failed)} of {len(messages)} groups: {failed[0]}')
+
+    @staticmethod
+    def _ws_message(*notifications):
+        """One channel-layer message carrying one user's notifications."""
+        return {
+            'type': 'send_notifications',
+            'notifications': [NotificationService._ws_payload(n) for n in notifications],
+        }
+
+    @staticmethod
+    def _ws_payload(notification):
+        return {
+            'id': str(notification.id),
+            'title': notification.title,
+            'message': notification.message,
+            'type': notification.notification_type,
+            'ticket_id': str(notification.ticket_id) if notification.ticket_id else None,
+            'created_at': notification.created_at.isoformat(),
+            'in_app': notification.in_app,
+        }
@@ -0,0 +1,244 @@
+"""
+JeyaRamaDesk — Notification Outbox
+Takes notification work off the ticket save path.
+
+Recording:
+    Ticket and comment signals call ``record()``, which inserts one
+    ``NotificationEvent`` row in the caller's transaction and, once it
+    commits, queues ``notifications.tasks.drain_notification_outbox``.
+    A save therefore costs one small INSERT, and a rolled-back save
+    never notifies anyone.
+
+Dedup keys:
+    Every event carries a key naming what happened (``ticket_created:<id>``,
+    ``comment_added:<id>``, ``status_change:<id>:<old>:<new>:<updated_at>``,
+    ...). The key is unique, so recording the same event twice is a no-op.
+
+Draining:
+    One worker at a time (cache lock) reads pending rows in id batches of
+    NOTIFICATION_OUTBOX_BATCH_SIZE, loads their tickets and comments in
+    bulk, builds the notifications with the NotificationService builders,
+    and in one transaction bulk-inserts them and stamps ``processed_at``.
+    The WebSocket pushes go out after that commit.
+
+Delivery is at-least-once: an event stays pending until its batch
+commits, and because the insert and the stamp commit together a replayed
+batch never duplicates notifications. An event whose build fails is
+retried on later drains and given up after NOTIFICATION_OUTBOX_MAX_ATTEMPTS
+(``last_error`` is kept). The ``sweep_notification_outbox`` beat task
+re-queues the drain for events left pending and prunes processed rows.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from notifications.models import NotificationEvent
+from notifications.services.notification_service import NotificationService
+
+logger = logging.getLogger('jeyaramadesk')
+
+# Set while a drain is queued but hasn't started; saves one task per commit
+QUEUED_KEY = 'notifications:outbox:queued'
+QUEUED_TIMEOUT = 30
+
+# Held while a drain runs (worker or inline); longest it may be held
+DRAIN_LOCK_KEY = 'notifications:outbox:lock'
+DRAIN_LOCK_TIMEOUT = 300
+
+TICKET_CREATED = 'ticket_created'
+TICKET_ASSIGNED = 'ticket_assigned'
+STATUS_CHANGE = 'status_change'
+PRIORITY_CHANGE = 'priority_change'
+COMMENT_ADDED = 'comment_added'
+
+
+def _stamp(value):
+    return value.isoformat() if value else ''
+
+
+class NotificationOutbox:
+    """Transactional recording and batched draining of notification events."""
+
+    # ── Recording ─────────────────────────────────────────────
+
+    @staticmethod
+    def record(event_type, ticket, dedup_key, **payload):
+        """Write an outbox row in the current transaction; drain on commit."""
+        try:
+            # Savepoint, so a duplicate key doesn't break the caller's transaction
+            with transaction.atomic():
+                NotificationEvent.objects.create(
+                    event_type=event_type,
+                    dedup_key=f'{event_type}:{dedup_key}'[:191],
+                    ticket_id=ticket.pk,
+                    payload=payload,
+                )
+        except IntegrityError:
+            logger.debug(f'Notification event {event_type}:{dedup_key} already recorded')
+            return
+        transaction.on_commit(NotificationOutbox.enqueue)
+
+    @staticmethod
+    def ticket_created(ticket):
+        NotificationOutbox.record(TICKET_CREATED, ticket, ticket.pk)
+
+    @staticmethod
+    def ticket_assigned(ticket):
+        NotificationOutbox.record(
+            TICKET_ASSIGNED, ticket,
+            f'{ticket.pk}:{ticket.assigned_agent_id}:{_stamp(ticket.updated_at)}',
+            agent_id=str(ticket.assigned_agent_id),
+        )
+
+    @staticmethod
+    def status_changed(ticket, old_status):
+        NotificationOutbox.record(
+            STATUS_CHANGE, ticket,
+            f'{ticket.pk}:{old_status}:{ticket.status}:{_stamp(ticket.updated_at)}',
+            old=old_status, new=ticket.status,
+        )
+
+    @staticmethod
+    def priority_changed(ticket, old_priority):
+        NotificationOutbox.record(
+            PRIORITY_CHANGE, ticket,
+            f'{ticket.pk}:{old_priority}:{ticket.priority}:{_stamp(ticket.updated_at)}',
+            old=old_priority, new=ticket.priority,
+        )
+
+    @staticmethod
+    def comment_added(comment):
+        NotificationOutbox.record(
+            COMMENT_ADDED, comment.ticket, comment.pk, comment_id=comment.pk,
+        )
+
+    @staticmethod
+    def enqueue():
+        """Queue a drain unless one is already waiting (or drain inline when async is off)."""
+        if not getattr(settings, 'NOTIFICATION_OUTBOX_ASYNC', True):
+            # A drain already running reads until nothing is pending, and the
+            # beat sweep catches what it misses
+            NotificationOutbox.drain_locked()
+            return
+        if not cache.add(QUEUED_KEY, 1, QUEUED_TIMEOUT):
+            return
+        from notifications.tasks import drain_notification_outbox
+        try:
+            drain_notification_outbox.delay()
+        except Exception as e:
+            # Rows stay pending; the beat sweep will pick them up
+            cache.delete(QUEUED_KEY)
+            logger.error(f'Could not enqueue notification outbox drain: {e}')
+
+    # ── Draining (workers) ────────────────────────────────────
+
+    @staticmethod
+    def drain_locked(owner=1):
+        """
+        ``drain()`` under the drain lock, so concurrent drains never build
+        the same events twice.
+
+        Returns:
+            Number of events processed, or None if another drain holds the lock.
+        """
+        if not cache.add(DRAIN_LOCK_KEY, owner, DRAIN_LOCK_TIMEOUT):
+            return None
+        try:
+            return NotificationOutbox.drain()
+        finally:
+            cache.delete(DRAIN_LOCK_KEY)
+
+    @staticmethod
+    def drain():
+        """
+        Turn every pending event into notifications, batch by batch. The
+        caller must hold the drain lock when running concurrently (see
+        ``drain_locked``).
+
+        Returns:
+            Number of events processed.
+        """
+        # Commits from here on queue a fresh drain
+        cache.delete(QUEUED_KEY)
+        batch_size = getattr(settings, 'NOTIFICATION_OUTBOX_BATCH_SIZE', 200)
+        processed = 0
+        last_id = 0
+        while True:
+            batch = list(NotificationEvent.objects.filter(
+                processed_at__isnull=True, id__gt=last_id,
+            ).order_by('id')[:batch_size])
+            if not batch:
+                return processed
+            processed += NotificationOutbox.process_batch(batch)
+            last_id = batch[-1].id
+
+    @staticmethod
+    def process_batch(events):
+        """Build, insert and stamp one batch. Returns the number of events done."""
+        from tickets.models import Ticket, TicketComment
+
+        tickets = Ticket.objects.select_related('customer', 'assigned_agent').in_bulk(
+            {event.ticket_id for event in events},
+        )
+        comments = TicketComment.objects.select_related('author').in_bulk([
+            event.payload['comment_id'] for event in events if event.event_type == COMMENT_ADDED
+        ])
+
+        notifications, done, failed = [], [], []
+        for event in events:
+            try:
+                notifications.extend(NotificationOutbox._build(event, tickets, comments))
+                done.append(event.id)
+            except Exception as e:
+                failed.append((event, e))
+
+        now = timezone.now()
+        with transaction.atomic():
+            # Pushes are sent when this commits
+            notifications = NotificationService.create_bulk(notifications)
+            NotificationEvent.objects.filter(id__in=done).update(processed_at=now)
+
+        for event, error in failed:
+            NotificationOutbox._failed(event, error, now)
+        if notifications:
+            logger.info(f'Notification outbox: {len(done)} events → {len(notifications)} notifications')
+        return len(done)
+
+    @staticmethod
+    def _build(event, tickets, comments):
+        ticket = tickets[event.ticket_id]
+        payload = event.payload
+        if event.event_type == TICKET_CREATED:
+            return NotificationService.build_new_ticket(ticket)
+        if event.event_type == TICKET_ASSIGNED:
+            return NotificationService.build_ticket_assigned(ticket, payload['agent_id'])
+        if event.event_type == STATUS_CHANGE:
+            return NotificationService.build_status_change(ticket, payload['old'], payload['new'])
+        if event.event_type == PRIORITY_CHANGE:
+            return NotificationService.build_priority_change(ticket, payload['old'], payload['new'])
+        if event.event_type == COMMENT_ADDED:
+            comment = comments.get(payload['comment_id'])
+            if comment is None:
+                # Comment deleted before the drain: nothing to announce
+                return []
+            comment.ticket = ticket
+            return NotificationService.build_new_comment(comment)
+        raise ValueError(f'Unknown notification event type "{event.event_type}"')
+
+    @staticmethod
+    def _failed(event, error, now):
+        attempts = event.attempts + 1
+        give_up = attempts >= getattr(settings, 'NOTIFICATION_OUTBOX_MAX_ATTEMPTS', 5)
+        NotificationEvent.objects.filter(pk=event.pk).update(
+            attempts=attempts,
+            last_error=f'{type(error).__name__}: {error}'[:1000],
+            processed_at=now if give_up else None,
+        )
+        if give_up:
+            logger.error(f'Notification event {event.dedup_key} dropped after {attempts} attempts: {error}')
+        else:
+            logger.warning(f'Notification event {event.dedup_key} failed (attempt {attempts}): {error}')
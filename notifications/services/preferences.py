@@ -0,0 +1,180 @@
+"""
+JeyaRamaDesk — Notification Preferences
+Per-user, per-type, per-channel delivery choices and the recipient
+resolver that applies them before any notification row is written.
+
+Channels (each decided on its own):
+    in_app     show the notification in the list and the unread badge.
+    websocket  push it live to open tabs.
+    email      include it in email. Also needs ``User.email_notifications``.
+
+A row is written when in_app or email is on; email rows point at it.
+
+Defaults are all channels on, so only deviations are stored as
+``NotificationPreference`` rows. Each user's choices are cached
+(``notifications:prefs:<user id>``) and dropped when they change. A
+batch of recipients is resolved with one ``get_many`` plus, at most,
+one query for the users missing from the cache.
+
+The set of active managers and superadmins that most helpers notify is
+cached too, for NOTIFICATION_STAFF_CACHE_TIMEOUT seconds. It is dropped
+whenever a user's role or active flag may have changed.
+"""
+
+import logging
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from notifications.models import Notification, NotificationPreference
+
+logger = logging.getLogger('jeyaramadesk')
+
+CHANNELS = ('in_app', 'websocket', 'email')
+
+Channels = namedtuple('Channels', CHANNELS)
+
+DEFAULT_CHANNELS = Channels(True, True, True)
+
+STAFF_KEY = 'notifications:staff_ids'
+STAFF_ROLES = ('superadmin', 'manager')
+
+
+def _prefs_key(user_id):
+    return f'notifications:prefs:{user_id}'
+
+
+class NotificationPreferences:
+    """Storage and cached lookup of users' delivery choices."""
+
+    # ── Lookup ────────────────────────────────────────────────
+
+    @staticmethod
+    def for_users(user_ids):
+        """
+        ``{user_id: {'email': master switch, 'types': {type: Channels}}}``
+        for every id, from the cache where possible.
+        """
+        user_ids = {str(user_id) for user_id in user_ids}
+        cached = cache.get_many([_prefs_key(user_id) for user_id in user_ids])
+        prefs = {user_id: cached[_prefs_key(user_id)] for user_id in user_ids if _prefs_key(user_id) in cached}
+
+        missing = user_ids - prefs.keys()
+        if missing:
+            from accounts.models import User
+            loaded = {
+                str(user_id): {'email': email, 'types': {}}
+                for user_id, email in User.objects.filter(pk__in=missing).values_list('pk', 'email_notifications')
+            }
+            for row in NotificationPreference.objects.filter(user_id__in=missing):
+                loaded[str(row.user_id)]['types'][row.notification_type] = Channels(row.in_app, row.websocket, row.email)
+            cache.set_many(
+                {_prefs_key(user_id): value for user_id, value in loaded.items()},
+                getattr(settings, 'NOTIFICATION_PREFERENCE_CACHE_TIMEOUT', 3600),
+            )
+            prefs.update(loaded)
+        return prefs
+
+    @staticmethod
+    def channels(prefs, notification_type):
+        """Effective Channels for one user's cached ``prefs`` and a type."""
+        if prefs is None:
+            return DEFAULT_CHANNELS
+        chosen = prefs['types'].get(notification_type, DEFAULT_CHANNELS)
+        return chosen._replace(email=chosen.email and prefs['email'])
+
+    @staticmethod
+    def matrix(user):
+        """Rows for the preferences page: one per type with its three channels."""
+        stored = {
+            row.notification_type: row
+            for row in NotificationPreference.objects.filter(user=user)
+        }
+        rows = []
+        for value, label in Notification.NotificationType.choices:
+            row = stored.get(value)
+            rows.append({
+                'type': value,
+                'label': label,
+                'channels': Channels(row.in_app, row.websocket, row.email) if row else DEFAULT_CHANNELS,
+            })
+        return rows
+
+    # ── Updates ───────────────────────────────────────────────
+
+    @staticmethod
+    @transaction.atomic
+    def save(user, choices):
+        """
+        Store ``{type: Channels}`` for a user. Types set to the defaults
+        lose their row.
+        """
+        valid = set(Notification.NotificationType.values)
+        custom = {t: c for t, c in choices.items() if t in valid and c != DEFAULT_CHANNELS}
+        NotificationPreference.objects.filter(user=user).exclude(notification_type__in=custom).delete()
+        for notification_type, chosen in custom.items():
+            NotificationPreference.objects.update_or_create(
+                user=user, notification_type=notification_type,
+                defaults=chosen._asdict(),
+            )
+        NotificationPreferences.invalidate(user.pk)
+        logger.info(f'Notification preferences saved for {user.email}: {len(custom)} customised types')
+
+    @staticmethod
+    def invalidate(user_id):
+        transaction.on_commit(lambda: cache.delete(_prefs_key(user_id)))
+
+
+class RecipientResolver:
+    """Turns candidate recipients into the users who want a notification."""
+
+    @staticmethod
+    def staff_ids():
+        """Ids of active managers and superadmins (cached)."""
+        ids = cache.get(STAFF_KEY)
+        if ids is None:
+            from accounts.models import User
+            ids = [
+                str(pk) for pk in
+                User.objects.filter(role__in=STAFF_ROLES, is_active=True).values_list('pk', flat=True)
+            ]
+            cache.set(STAFF_KEY, ids, getattr(settings, 'NOTIFICATION_STAFF_CACHE_TIMEOUT', 300))
+        return ids
+
+    @staticmethod
+    def invalidate_staff():
+        transaction.on_commit(lambda: cache.delete(STAFF_KEY))
+
+    @staticmethod
+    def resolve(notifications):
+        """
+        Apply each recipient's channels, one channel at a time.
+
+        A notification is stored when its recipient wants it in-app or by
+        email (the email row needs it). One wanted by email only is stored
+        hidden: ``in_app`` off and already read, so neither the list nor
+        the unread count shows it. One wanted only live is pushed without
+        being stored. With every channel off it is dropped.
+
+        Returns:
+            (notifications to store, those to push over WebSocket,
+            those to email)
+        """
+        if not notifications:
+            return [], [], []
+        prefs = NotificationPreferences.for_users({n.user_id for n in notifications})
+        kept, push, email = [], [], []
+        for notification in notifications:
+            chosen = NotificationPreferences.channels(prefs.get(str(notification.user_id)), notification.notification_type)
+            if not chosen.in_app:
+                notification.in_app = False
+                notification.is_read = True
+            if chosen.in_app or chosen.email:
+                kept.append(notification)
+            if chosen.websocket:
+                push.append(notification)
+            if chosen.email:
+                email.append(notification)
+        return kept, push, email
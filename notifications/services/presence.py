@@ -0,0 +1,74 @@
+"""
+JeyaRamaDesk — Notification Presence
+Which users have a live ``NotificationConsumer`` socket, so pushes skip
+the channel layer for everyone else.
+
+Each user has a connection count in the cache
+(``notifications:presence:<user id>``). The consumer increments it on
+connect and decrements it on disconnect. Open sockets send a heartbeat
+every minute, which renews the key for NOTIFICATION_PRESENCE_TIMEOUT
+seconds, so a count left behind by a crashed server expires by itself.
+
+Errors fail open: if the cache can't be read, everyone counts as online
+and pushes go out as before. Set NOTIFICATION_PRESENCE_ENABLED = False
+to push to every recipient regardless.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger('jeyaramadesk')
+
+
+def _key(user_id):
+    return f'notifications:presence:{user_id}'
+
+
+def _timeout():
+    return getattr(settings, 'NOTIFICATION_PRESENCE_TIMEOUT', 180)
+
+
+class NotificationPresence:
+    """Cache-backed count of open notification sockets per user."""
+
+    @staticmethod
+    def connected(user_id):
+        key = _key(user_id)
+        cache.add(key, 0, _timeout())
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Expired between add and incr
+            cache.set(key, 1, _timeout())
+        cache.touch(key, _timeout())
+
+    @staticmethod
+    def disconnected(user_id):
+        key = _key(user_id)
+        try:
+            if cache.decr(key) <= 0:
+                cache.delete(key)
+        except ValueError:
+            pass  # already expired
+
+    @staticmethod
+    def heartbeat(user_id):
+        """Renew an open socket's presence; restores it if the key expired."""
+        key = _key(user_id)
+        if not cache.touch(key, _timeout()):
+            cache.add(key, 1, _timeout())
+
+    @staticmethod
+    def online(user_ids):
+        """The subset of ``user_ids`` (as strings) with an open socket."""
+        user_ids = {str(user_id) for user_id in user_ids}
+        if not getattr(settings, 'NOTIFICATION_PRESENCE_ENABLED', True):
+            return user_ids
+        try:
+            counts = cache.get_many([_key(user_id) for user_id in user_ids])
+        except Exception as e:
+            logger.warning(f'Notification presence unavailable, pushing to all: {e}')
+            return user_ids
+        return {user_id for user_id in user_ids if counts.get(_key(user_id), 0) > 0}
@@ -0,0 +1,235 @@
+"""
+JeyaRamaDesk — Notification Retention
+Keeps ``jrd_notifications`` (and its per-user indexes) from growing
+without bound.
+
+Two rules, applied by the ``purge_notifications`` beat task:
+
+- TTL: read notifications older than NOTIFICATION_READ_RETENTION_DAYS
+  are deleted (``idx_notif_read_created``).
+- Per-user cap: a user keeps at most NOTIFICATION_MAX_PER_USER of their
+  newest notifications, read or not. Older ones are deleted. Users are
+  visited in primary-key chunks of NOTIFICATION_PURGE_USER_CHUNK, and
+  each chunk is counted on its own (``idx_notif_user_created``), so no
+  run groups the whole table. A keyset cursor in the cache carries the
+  position over to the next run.
+
+Rows are deleted in primary-key batches of NOTIFICATION_PURGE_BATCH_SIZE,
+each its own short statement, with NOTIFICATION_PURGE_PAUSE seconds
+between batches so the purge never holds long locks or starves other
+writers. A run stops after NOTIFICATION_PURGE_TIME_BUDGET seconds, and
+the next run continues where it left off. Progress is logged every
+NOTIFICATION_PURGE_LOG_EVERY batches. The last run's metrics are kept in
+the cache (``last_run()``).
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from notifications.models import Notification
+from notifications.services.unread_counter import UnreadCounter
+
+logger = logging.getLogger('jeyaramadesk')
+
+LOCK_KEY = 'notifications:retention:lock'
+STATS_KEY = 'notifications:retention:last_run'
+CURSOR_KEY = 'notifications:retention:user_cursor'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class NotificationRetention:
+    """TTL and per-user cap enforcement with batched deletes."""
+
+    # ── Planning ──────────────────────────────────────────────
+
+    @staticmethod
+    def expired():
+        """Read notifications past the TTL (None when the TTL is off)."""
+        days = _setting('NOTIFICATION_READ_RETENTION_DAYS', 30)
+        if not days:
+            return None
+        return Notification.objects.filter(
+            is_read=True, created_at__lt=timezone.now() - timedelta(days=days),
+        )
+
+    @staticmethod
+    def user_chunks(after=None):
+        """Yield user ids in primary-key chunks, starting after ``after``."""
+        size = _setting('NOTIFICATION_PURGE_USER_CHUNK', 500)
+        users = get_user_model().objects.order_by('pk')
+        while True:
+            page = users.filter(pk__gt=after) if after is not None else users
+            ids = list(page.values_list('pk', flat=True)[:size])
+            if not ids:
+                return
+            yield ids
+            after = ids[-1]
+
+    @staticmethod
+    def users_over_cap(user_ids):
+        """``{user_id: notification count}`` for those of ``user_ids`` above the cap."""
+        cap = _setting('NOTIFICATION_MAX_PER_USER', 1000)
+        if not cap:
+            return {}
+        return dict(
+            Notification.objects.filter(user_id__in=user_ids).values_list('user_id')
+            .annotate(n=Count('id')).filter(n__gt=cap).order_by()
+        )
+
+    @staticmethod
+    def over_cap(user_id):
+        """One user's notifications beyond the cap (oldest ones)."""
+        cap = _setting('NOTIFICATION_MAX_PER_USER', 1000)
+        boundary = (
+            Notification.objects.filter(user_id=user_id)
+            .order_by('-created_at').values_list('created_at', flat=True)[cap:cap + 1]
+        )
+        boundary = boundary[0] if boundary else None
+        if boundary is None:
+            return Notification.objects.none()
+        return Notification.objects.filter(user_id=user_id, created_at__lte=boundary)
+
+    @staticmethod
+    def plan():
+        """What a run would delete, without deleting anything (all users, chunk by chunk)."""
+        expired = NotificationRetention.expired()
+        cap = _setting('NOTIFICATION_MAX_PER_USER', 1000)
+        over = {}
+        if cap:
+            for user_ids in NotificationRetention.user_chunks():
+                over.update(NotificationRetention.users_over_cap(user_ids))
+        return {
+            'expired': expired.count() if expired is not None else 0,
+            'users_over_cap': len(over),
+            'over_cap': sum(count - cap for count in over.values()),
+        }
+
+    # ── Purging ───────────────────────────────────────────────
+
+    @staticmethod
+    def purge():
+        """
+        Apply the TTL, then the per-user caps, within the time budget.
+
+        Returns:
+            Metrics dict: rows deleted per rule, batches, users capped,
+            elapsed seconds and whether the run finished.
+        """
+        budget = _setting('NOTIFICATION_PURGE_TIME_BUDGET', 60)
+        if not cache.add(LOCK_KEY, 1, budget * 2 + 60):
+            logger.info('Notification retention: previous run still in progress, skipping.')
+            return None
+        try:
+            run = _PurgeRun(deadline=time.monotonic() + budget)
+            run.execute()
+        finally:
+            cache.delete(LOCK_KEY)
+
+        stats = run.stats()
+        cache.set(STATS_KEY, stats, None)
+        logger.info(
+            f'Notification retention: {stats["expired_deleted"]} expired and '
+            f'{stats["capped_deleted"]} over-cap notifications deleted '
+            f'({stats["users_capped"]} users) in {stats["batches"]} batches, '
+            f'{stats["seconds"]}s{"" if stats["complete"] else ", time budget reached"}'
+        )
+        return stats
+
+    @staticmethod
+    def last_run():
+        """Metrics of the most recent purge, or None."""
+        return cache.get(STATS_KEY)
+
+
+class _PurgeRun:
+    """State of one purge: counters and the time budget."""
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+        self.started = time.monotonic()
+        self.batch_size = _setting('NOTIFICATION_PURGE_BATCH_SIZE', 500)
+        self.pause = _setting('NOTIFICATION_PURGE_PAUSE', 0.05)
+        self.log_every = _setting('NOTIFICATION_PURGE_LOG_EVERY', 50)
+        self.expired_deleted = 0
+        self.capped_deleted = 0
+        self.users_capped = 0
+        self.batches = 0
+        self.complete = False
+
+    def out_of_time(self):
+        return time.monotonic() >= self.deadline
+
+    def execute(self):
+        expired = NotificationRetention.expired()
+        if expired is not None:
+            self.expired_deleted = self.delete(expired)
+            if self.out_of_time():
+                return
+
+        if not _setting('NOTIFICATION_MAX_PER_USER', 1000):
+            self.complete = True
+            return
+        cursor = cache.get(CURSOR_KEY)
+        for user_ids in NotificationRetention.user_chunks(after=cursor):
+            over = NotificationRetention.users_over_cap(user_ids)
+            for user_id in sorted(over):
+                deleted = self.delete(NotificationRetention.over_cap(user_id))
+                if deleted:
+                    self.capped_deleted += deleted
+                    self.users_capped += 1
+                    # Unread rows may be among them
+                    UnreadCounter.invalidate([user_id])
+                if self.out_of_time():
+                    # This user may not be done; start the next run with them
+                    cache.set(CURSOR_KEY, cursor, None)
+                    return
+                cursor = user_id
+            cursor = user_ids[-1]
+            if self.out_of_time():
+                cache.set(CURSOR_KEY, cursor, None)
+                return
+        # Every user after the cursor was visited; the next run starts over
+        cache.delete(CURSOR_KEY)
+        self.complete = True
+
+    def delete(self, queryset):
+        """Delete ``queryset`` in primary-key batches. Returns rows deleted."""
+        deleted = 0
+        while not self.out_of_time():
+            ids = list(queryset.values_list('pk', flat=True)[:self.batch_size])
+            if not ids:
+                break
+            count, _ = Notification.objects.filter(pk__in=ids).delete()
+            deleted += count
+            self.batches += 1
+            if self.batches % self.log_every == 0:
+                logger.info(
+                    f'Notification retention: {self.batches} batches, '
+                    f'{self.expired_deleted + self.capped_deleted + deleted} rows deleted so far'
+                )
+            if len(ids) < self.batch_size:
+                break
+            if self.pause:
+                time.sleep(self.pause)
+        return deleted
+
+    def stats(self):
+        return {
+            'expired_deleted': self.expired_deleted,
+            'capped_deleted': self.capped_deleted,
+            'users_capped': self.users_capped,
+            'batches': self.batches,
+            'seconds': round(time.monotonic() - self.started, 2),
+            'complete': self.complete,
+            'finished_at': timezone.now().isoformat(),
+        }
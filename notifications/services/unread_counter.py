@@ -0,0 +1,128 @@
+"""
+JeyaRamaDesk — Unread Notification Counter
+Per-user unread counts kept in the cache, so the topbar badge, the
+notification list and the unread-count endpoint don't run
+``COUNT(*)`` on every request.
+
+- A miss counts once from the database and caches the result for
+  NOTIFICATION_UNREAD_CACHE_TIMEOUT seconds.
+- Creating notifications increments the counters after commit;
+  ``mark_read`` and "mark all read" decrement them. Counters that aren't
+  cached are left alone (the next read counts).
+- Bulk changes without a precise delta (admin actions, deletes) drop the
+  counter instead.
+
+Increments race with a concurrent miss, so a counter can drift by a few.
+The ``reconcile_unread_counts`` beat task recounts the cached counters
+of active users every 10 minutes and corrects the ones that drifted.
+"""
+
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from notifications.models import Notification
+
+logger = logging.getLogger('jeyaramadesk')
+
+
+def _key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def _timeout():
+    return getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 86400)
+
+
+class UnreadCounter:
+    """Cache-backed unread notification counts per user."""
+
+    @staticmethod
+    def get(user_id):
+        """Unread count for a user, counting from the database on a miss."""
+        count = cache.get(_key(user_id))
+        if count is None:
+            count = Notification.objects.filter(user_id=user_id, is_read=False).count()
+            # add(): don't clobber a counter another request just set or changed
+            cache.add(_key(user_id), count, _timeout())
+        return max(count, 0)
+
+    # ── Updates (applied after commit) ────────────────────────
+
+    @staticmethod
+    def created(notifications):
+        """Count new unread notifications once the transaction commits."""
+        counts = Counter(n.user_id for n in notifications if not n.is_read)
+        if counts:
+            transaction.on_commit(lambda: UnreadCounter._apply(counts, 1))
+
+    @staticmethod
+    def read(user_id, count=1):
+        """Discount ``count`` notifications marked read, once the transaction commits."""
+        if count:
+            transaction.on_commit(lambda: UnreadCounter._apply({user_id: count}, -1))
+
+    @staticmethod
+    def invalidate(user_ids):
+        """Drop counters whose change can't be expressed as a delta."""
+        user_ids = list(user_ids)
+        transaction.on_commit(lambda: cache.delete_many([_key(user_id) for user_id in user_ids]))
+
+    @staticmethod
+    def _apply(counts, sign):
+        for user_id, count in counts.items():
+            key = _key(user_id)
+            try:
+                value = cache.incr(key, count) if sign > 0 else cache.decr(key, count)
+            except ValueError:
+                continue  # not cached: the next read counts
+            if value < 0:
+                cache.delete(key)
+
+    # ── Reconciliation ────────────────────────────────────────
+
+    @staticmethod
+    def reconcile(chunk_size=1000):
+        """
+        Recount the cached counters of active users and fix the ones that
+        drifted. Users without a cached counter are skipped.
+
+        Returns:
+            Number of counters corrected.
+        """
+        from accounts.models import User
+
+        corrected = 0
+        user_ids = User.objects.filter(is_active=True).order_by('pk').values_list('pk', flat=True)
+        last_id = None
+        while True:
+            page = user_ids.filter(pk__gt=last_id) if last_id else user_ids
+            chunk = list(page[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1]
+
+            cached = cache.get_many([_key(user_id) for user_id in chunk])
+            if cached:
+                ids = [user_id for user_id in chunk if _key(user_id) in cached]
+                actual = dict(
+                    Notification.objects.filter(user_id__in=ids, is_read=False)
+                    .values_list('user_id').annotate(n=Count('id')).order_by()
+                )
+                fixes = {
+                    _key(user_id): actual.get(user_id, 0)
+                    for user_id in ids
+                    if cached[_key(user_id)] != actual.get(user_id, 0)
+                }
+                if fixes:
+                    cache.set_many(fixes, _timeout())
+                    corrected += len(fixes)
+            if len(chunk) < chunk_size:
+                break
+        if corrected:
+            logger.info(f'Unread notification counters: corrected {corrected} drifted counters')
+        return corrected
@@ -0,0 +1,30 @@
+"""
+JeyaRamaDesk — Notification Signals
+Keeps the cached staff set and per-user preferences in sync with user edits.
+"""
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from notifications.services.preferences import NotificationPreferences, RecipientResolver
+
+# User fields the cached staff set and preferences depend on
+STAFF_FIELDS = frozenset({'role', 'is_active'})
+PREFERENCE_FIELDS = frozenset({'email_notifications'})
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Drop cached recipient data a user save may have changed (not e.g. last_login saves)."""
+    fields = set(update_fields) if update_fields is not None else None
+    if created or fields is None or fields & STAFF_FIELDS:
+        RecipientResolver.invalidate_staff()
+    if not created and (fields is None or fields & PREFERENCE_FIELDS):
+        NotificationPreferences.invalidate(instance.pk)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    RecipientResolver.invalidate_staff()
+    NotificationPreferences.invalidate(instance.pk)
@@ -0,0 +1,76 @@
+"""
+JeyaRamaDesk — Notification Celery Tasks
+Draining of the notification outbox (see notifications.services.outbox)
+and the periodic counter, retention and email jobs.
+"""
+
+from celery import shared_task
+from django.conf import settings
+import logging
+
+logger = logging.getLogger('jeyaramadesk')
+
+
+@shared_task(bind=True, name='notifications.tasks.drain_notification_outbox', max_retries=60)
+def drain_notification_outbox(self):
+    """
+    Turn pending outbox events into notifications. Only one worker drains
+    at a time; a concurrent task backs off and retries so events committed
+    during a running drain aren't left for the sweep.
+    """
+    from notifications.services.outbox import NotificationOutbox
+
+    processed = NotificationOutbox.drain_locked(self.request.id or 1)
+    if processed is None:
+        raise self.retry(countdown=1)
+    return processed
+
+
+@shared_task(name='notifications.tasks.sweep_notification_outbox')
+def sweep_notification_outbox():
+    """
+    Periodic task: queue a drain when events were left pending (lost task,
+    broker outage, failed builds awaiting retry) and prune old processed events.
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    from notifications.models import NotificationEvent
+    from notifications.services.outbox import NotificationOutbox
+
+    now = timezone.now()
+    stale = NotificationEvent.objects.filter(
+        processed_at__isnull=True,
+        created_at__lt=now - timedelta(seconds=60),
+    ).count()
+    if stale:
+        logger.warning(f'Notification outbox: {stale} events pending for over a minute, queueing a drain')
+        NotificationOutbox.enqueue()
+
+    retention_days = getattr(settings, 'NOTIFICATION_OUTBOX_RETENTION_DAYS', 7)
+    pruned, _ = NotificationEvent.objects.filter(
+        processed_at__lt=now - timedelta(days=retention_days),
+    ).delete()
+    return f'{stale} stale events, pruned {pruned} events'
+
+
+@shared_task(name='notifications.tasks.reconcile_unread_counts')
+def reconcile_unread_counts():
+    """Periodic task: correct cached unread counters that drifted from the database."""
+    from notifications.services.unread_counter import UnreadCounter
+    return UnreadCounter.reconcile()
+
+
+@shared_task(name='notifications.tasks.purge_notifications')
+def purge_notifications():
+    """Periodic task: apply the notification TTL and per-user caps in small batches."""
+    from notifications.services.retention import NotificationRetention
+    return NotificationRetention.purge()
+
+
+@shared_task(name='notifications.tasks.send_notification_emails')
+def send_notification_emails():
+    """Periodic task: send queued notification emails as per-recipient digests."""
+    from notifications.services.email_delivery import EmailDelivery
+    summary = EmailDelivery.send_due()
+    summary['pruned'] = EmailDelivery.purge()
+    return summary
@@ -1,3 +1,439 @@
-from django.test import TestCase
+"""
+JeyaRamaDesk — Notification Tests
+The transactional outbox (recording, retries, replays), the cached
+unread counters, the retention purge, the preferences page and email
+digests (locmem backend), including channels chosen independently.
+"""
 
-# Create your tests here.
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends import locmem
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications.models import Notification, NotificationEmail, NotificationEvent, NotificationPreference
+from notifications.services.email_delivery import EmailDelivery
+from notifications.services.notification_service import NotificationService
+from notifications.services.outbox import NotificationOutbox
+from notifications.services.retention import NotificationRetention
+from notifications.services.unread_counter import UnreadCounter
+from tickets.models import Ticket
+
+User = get_user_model()
+
+
+def _user(email, role='customer', **fields):
+    return User.objects.create_user(
+        email=email, password='x', first_name=email.split('@')[0], last_name='User', role=role, **fields,
+    )
+
+
+class CountingBackend(locmem.EmailBackend):
+    """locmem backend that counts the connections opened."""
+
+    connections = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        CountingBackend.connections += 1
+
+
+class FailingBackend(locmem.EmailBackend):
+
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('SMTP server unreachable')
+
+
+@override_settings(NOTIFICATION_OUTBOX_ASYNC=False, TICKET_EVENTS_ASYNC=False)
+class NotificationOutboxTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.manager = _user('manager@example.com', role='manager')
+        self.customer = _user('customer@example.com')
+
+    def _create_ticket(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Ticket.objects.create(title='Printer', description='On fire', customer=self.customer)
+
+    def test_ticket_save_notifies_after_commit(self):
+        ticket = self._create_ticket()
+
+        event = NotificationEvent.objects.get(ticket=ticket)
+        self.assertEqual(event.dedup_key, f'ticket_created:{ticket.pk}')
+        self.assertIsNotNone(event.processed_at)
+        self.assertEqual(
+            list(Notification.objects.values_list('user_id', 'notification_type')),
+            [(self.manager.pk, 'ticket_created')],
+        )
+
+    def test_rolled_back_save_records_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    Ticket.objects.create(title='Printer', description='On fire', customer=self.customer)
+                    raise RuntimeError('rolled back')
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(NotificationEvent.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_duplicate_dedup_key_is_a_no_op(self):
+        ticket = self._create_ticket()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            NotificationOutbox.ticket_created(ticket)
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(NotificationEvent.objects.count(), 1)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    @override_settings(NOTIFICATION_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_build_is_retried_then_given_up(self):
+        ticket = Ticket.objects.create(title='Printer', description='On fire', customer=self.customer)
+        bad = NotificationEvent.objects.create(event_type='bogus', dedup_key='bogus:1', ticket=ticket)
+
+        NotificationOutbox.drain()
+        bad.refresh_from_db()
+        self.assertEqual(bad.attempts, 1)
+        self.assertIsNone(bad.processed_at)
+        self.assertIn('Unknown notification event type', bad.last_error)
+        # The good event in the same batch went through
+        self.assertEqual(Notification.objects.count(), 1)
+
+        with self.assertLogs('jeyaramadesk', level='ERROR'):
+            NotificationOutbox.drain()
+        bad.refresh_from_db()
+        self.assertEqual(bad.attempts, 2)
+        self.assertIsNotNone(bad.processed_at)
+        self.assertEqual(NotificationOutbox.drain(), 0)
+
+    def test_inline_drain_waits_for_the_drain_lock(self):
+        cache.add('notifications:outbox:lock', 'worker')
+
+        ticket = self._create_ticket()
+
+        self.assertIsNone(NotificationEvent.objects.get(ticket=ticket).processed_at)
+        self.assertFalse(Notification.objects.exists())
+        cache.delete('notifications:outbox:lock')
+        self.assertEqual(NotificationOutbox.drain_locked(), 1)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_replayed_batch_does_not_duplicate(self):
+        Ticket.objects.create(title='Printer', description='On fire', customer=self.customer)
+        create_bulk = NotificationService.create_bulk
+
+        def crash_after_insert(notifications):
+            create_bulk(notifications)
+            raise RuntimeError('worker died')
+
+        with mock.patch.object(NotificationService, 'create_bulk', side_effect=crash_after_insert):
+            with self.assertRaises(RuntimeError):
+                NotificationOutbox.drain()
+        self.assertFalse(Notification.objects.exists())
+        self.assertTrue(NotificationEvent.objects.filter(processed_at__isnull=True).exists())
+
+        self.assertEqual(NotificationOutbox.drain(), 1)
+        self.assertEqual(NotificationOutbox.drain(), 0)
+        self.assertEqual(Notification.objects.count(), 1)
+
+
+class UnreadCounterTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = _user('agent@example.com', role='agent')
+
+    def _notify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return NotificationService.create_for_users([self.user], title='Hello', notification_type='system')
+
+    def test_miss_counts_from_the_database(self):
+        self._notify()
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(UnreadCounter.get(self.user.pk), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(UnreadCounter.get(self.user.pk), 1)
+
+    def test_created_and_read_adjust_the_cached_count(self):
+        self.assertEqual(UnreadCounter.get(self.user.pk), 0)
+        notification, = self._notify()
+        self._notify()
+        self.assertEqual(cache.get(f'notifications:unread:{self.user.pk}'), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notification.mark_read()
+            notification.mark_read()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(UnreadCounter.get(self.user.pk), 1)
+
+    def test_uncached_counter_is_left_alone(self):
+        self._notify()
+
+        self.assertIsNone(cache.get(f'notifications:unread:{self.user.pk}'))
+        self.assertEqual(UnreadCounter.get(self.user.pk), 1)
+
+    def test_reconcile_fixes_drifted_counters(self):
+        other = _user('other@example.com', role='agent')
+        self._notify()
+        UnreadCounter.get(self.user.pk)
+        UnreadCounter.get(other.pk)
+        cache.set(f'notifications:unread:{self.user.pk}', 7)
+
+        self.assertEqual(UnreadCounter.reconcile(chunk_size=1), 1)
+        self.assertEqual(UnreadCounter.get(self.user.pk), 1)
+        self.assertEqual(UnreadCounter.get(other.pk), 0)
+
+
+@override_settings(
+    NOTIFICATION_READ_RETENTION_DAYS=30,
+    NOTIFICATION_MAX_PER_USER=3,
+    NOTIFICATION_PURGE_BATCH_SIZE=2,
+    NOTIFICATION_PURGE_PAUSE=0,
+)
+class NotificationRetentionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = _user('agent@example.com', role='agent')
+
+    def _notification(self, title, age_days, is_read=False, user=None):
+        notification = Notification.objects.create(user=user or self.user, title=title, is_read=is_read)
+        Notification.objects.filter(pk=notification.pk).update(created_at=timezone.now() - timedelta(days=age_days))
+        return notification
+
+    def _titles(self, user=None):
+        return set(Notification.objects.filter(user=user or self.user).values_list('title', flat=True))
+
+    def test_ttl_deletes_old_read_notifications(self):
+        self._notification('old read', 40, is_read=True)
+        self._notification('old unread', 40)
+        self._notification('new read', 5, is_read=True)
+
+        stats = NotificationRetention.purge()
+
+        self.assertEqual(self._titles(), {'old unread', 'new read'})
+        self.assertEqual(stats['expired_deleted'], 1)
+        self.assertTrue(stats['complete'])
+        self.assertEqual(NotificationRetention.last_run()['expired_deleted'], 1)
+
+    def test_cap_keeps_each_users_newest(self):
+        for age in range(5):
+            self._notification(f'n{age}', age)
+        other = _user('other@example.com', role='agent')
+        self._notification('kept', 1, user=other)
+        UnreadCounter.get(self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = NotificationRetention.purge()
+
+        self.assertEqual(self._titles(), {'n0', 'n1', 'n2'})
+        self.assertEqual(self._titles(other), {'kept'})
+        self.assertEqual(stats['capped_deleted'], 2)
+        self.assertEqual(stats['users_capped'], 1)
+        # Unread rows went with them, so the counter is recounted
+        self.assertIsNone(cache.get(f'notifications:unread:{self.user.pk}'))
+        self.assertEqual(UnreadCounter.get(self.user.pk), 3)
+
+    @override_settings(NOTIFICATION_PURGE_USER_CHUNK=1)
+    def test_cap_resumes_after_the_user_cursor(self):
+        other = _user('other@example.com', role='agent')
+        first, second = sorted([self.user, other], key=lambda user: user.pk)
+        for user in (first, second):
+            for age in range(4):
+                self._notification(f'n{age}', age, user=user)
+        cache.set('notifications:retention:user_cursor', first.pk, None)
+
+        stats = NotificationRetention.purge()
+
+        # Only users after the cursor were visited, then the cursor wrapped
+        self.assertEqual(stats['users_capped'], 1)
+        self.assertEqual(len(self._titles(second)), 3)
+        self.assertEqual(len(self._titles(first)), 4)
+        self.assertIsNone(cache.get('notifications:retention:user_cursor'))
+
+        NotificationRetention.purge()
+
+        self.assertEqual(self._titles(first), {'n0', 'n1', 'n2'})
+
+    def test_run_in_progress_is_skipped(self):
+        self._notification('old read', 40, is_read=True)
+        cache.add('notifications:retention:lock', 1)
+
+        self.assertIsNone(NotificationRetention.purge())
+        self.assertEqual(self._titles(), {'old read'})
+
+
+class NotificationPreferencesViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def _save(self, user, unchecked=()):
+        """Post the matrix as the browser would: every enabled box checked except ``unchecked``."""
+        channels = ('in_app', 'websocket') if not user.email_notifications else ('in_app', 'websocket', 'email')
+        data = {
+            f'{value}:{channel}': 'on'
+            for value in Notification.NotificationType.values
+            for channel in channels
+            if f'{value}:{channel}' not in unchecked
+        }
+        self.client.force_login(user)
+        return self.client.post(reverse('notifications:preferences'), data)
+
+    def _stored(self, user):
+        return {
+            row.notification_type: (row.in_app, row.websocket, row.email)
+            for row in NotificationPreference.objects.filter(user=user)
+        }
+
+    def test_unchecked_box_is_stored(self):
+        user = _user('agent@example.com', role='agent')
+
+        response = self._save(user, unchecked={'system:email'})
+
+        self.assertRedirects(response, reverse('notifications:preferences'))
+        self.assertEqual(self._stored(user), {'system': (True, True, False)})
+
+    def test_disabled_email_column_keeps_stored_choices(self):
+        user = _user('agent@example.com', role='agent', email_notifications=False)
+        NotificationPreference.objects.create(user=user, notification_type='system', email=False)
+
+        self._save(user, unchecked={'automation:websocket'})
+
+        self.assertEqual(self._stored(user), {
+            'system': (True, True, False),
+            'automation': (True, False, True),
+        })
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    NOTIFICATION_EMAIL_ENABLED=True,
+    NOTIFICATION_EMAIL_BACKOFF_BASE=60,
+    NOTIFICATION_EMAIL_BACKOFF_MAX=3600,
+    NOTIFICATION_EMAIL_MAX_ATTEMPTS=3,
+)
+class EmailDeliveryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.alice = _user('alice@example.com', role='agent')
+        self.bob = _user('bob@example.com', role='agent')
+
+    def _notify(self, users, title):
+        NotificationService.create_for_users(users, title=title, notification_type='system')
+
+    def _make_due(self):
+        NotificationEmail.objects.update(next_attempt_at=timezone.now())
+
+    def test_one_digest_per_recipient_over_one_connection(self):
+        self._notify([self.alice, self.bob], 'First')
+        self._notify([self.alice], 'Second')
+        CountingBackend.connections = 0
+
+        with override_settings(EMAIL_BACKEND='notifications.tests.CountingBackend'):
+            summary = EmailDelivery.send_due()
+
+        self.assertEqual(summary, {'digests': 2, 'sent': 3, 'failed': 0, 'skipped': 0})
+        self.assertEqual(CountingBackend.connections, 1)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ['alice@example.com', 'bob@example.com'])
+        alice_mail, = [m for m in mail.outbox if m.to == ['alice@example.com']]
+        self.assertIn('First', alice_mail.body)
+        self.assertIn('Second', alice_mail.body)
+        self.assertFalse(NotificationEmail.objects.exclude(status=NotificationEmail.Status.SENT).exists())
+
+    def test_email_channel_off_queues_nothing(self):
+        carol = _user('carol@example.com', role='agent', email_notifications=False)
+        NotificationPreference.objects.create(user=self.bob, notification_type='system', email=False)
+
+        self._notify([self.alice, self.bob, carol], 'Hello')
+
+        self.assertEqual(list(NotificationEmail.objects.values_list('user_id', flat=True)), [self.alice.pk])
+
+    def test_email_only_is_stored_hidden_and_emailed(self):
+        NotificationPreference.objects.create(user=self.alice, notification_type='system', in_app=False, websocket=False)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._notify([self.alice], 'Email only')
+        self._make_due()
+        EmailDelivery.send_due()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Email only', mail.outbox[0].body)
+        self.assertFalse(Notification.objects.get(user=self.alice).in_app)
+        self.assertEqual(UnreadCounter.get(self.alice.pk), 0)
+        self.client.force_login(self.alice)
+        response = self.client.get(reverse('notifications:list'))
+        self.assertEqual(list(response.context['notifications']), [])
+
+    def test_live_only_is_pushed_without_a_row(self):
+        NotificationPreference.objects.create(user=self.alice, notification_type='system', in_app=False, email=False)
+
+        with mock.patch.object(NotificationService, '_push_realtime_bulk') as push, \
+                self.captureOnCommitCallbacks(execute=True):
+            self._notify([self.alice], 'Live only')
+
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(NotificationEmail.objects.exists())
+        (pushed,), _ = push.call_args
+        self.assertEqual(NotificationService._ws_payload(pushed[0])['in_app'], False)
+
+    def test_recipients_who_can_no_longer_get_email_are_skipped(self):
+        carol = _user('carol@example.com', role='agent')
+        self._notify([self.alice, self.bob, carol], 'Hello')
+        # Changed after the rows were queued
+        User.objects.filter(pk=self.alice.pk).update(is_active=False)
+        User.objects.filter(pk=self.bob.pk).update(email='')
+        User.objects.filter(pk=carol.pk).update(email_notifications=False)
+
+        summary = EmailDelivery.send_due()
+
+        self.assertEqual(summary['skipped'], 3)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(NotificationEmail.objects.filter(status=NotificationEmail.Status.SKIPPED).count(), 3)
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FailingBackend')
+    def test_failed_digest_is_rescheduled_with_backoff(self):
+        self._notify([self.alice], 'Hello')
+
+        EmailDelivery.send_due()
+        row = NotificationEmail.objects.get()
+        self.assertEqual(row.status, NotificationEmail.Status.PENDING)
+        self.assertEqual(row.attempts, 1)
+        self.assertIn('SMTP server unreachable', row.last_error)
+        self.assertAlmostEqual((row.next_attempt_at - timezone.now()).total_seconds(), 60, delta=5)
+        # Not due yet
+        self.assertEqual(EmailDelivery.send_due()['digests'], 0)
+
+        self._make_due()
+        EmailDelivery.send_due()
+        row.refresh_from_db()
+        self.assertEqual(row.attempts, 2)
+        self.assertAlmostEqual((row.next_attempt_at - timezone.now()).total_seconds(), 120, delta=5)
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FailingBackend')
+    def test_marked_failed_after_max_attempts(self):
+        self._notify([self.alice], 'Hello')
+
+        for _ in range(2):
+            self.assertEqual(EmailDelivery.send_due()['failed'], 0)
+            self._make_due()
+        with self.assertLogs('jeyaramadesk', level='ERROR'):
+            summary = EmailDelivery.send_due()
+
+        self.assertEqual(summary['failed'], 1)
+        row = NotificationEmail.objects.get()
+        self.assertEqual(row.status, NotificationEmail.Status.FAILED)
+        self.assertEqual(row.attempts, 3)
+        self._make_due()
+        self.assertEqual(EmailDelivery.send_due()['digests'], 0)
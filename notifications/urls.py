@@ -11,4 +11,5 @@ urlpatterns = [
     path('<uuid:pk>/read/', views.mark_read, name='mark_read'),
     path('mark-all-read/', views.mark_all_read, name='mark_all_read'),
     path('unread-count/', views.unread_count_api, name='unread_count'),
+    path('preferences/', views.notification_preferences, name='preferences'),
 ]
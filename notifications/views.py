@@ -1,5 +1,6 @@
 """JeyaRamaDesk — Notification Views"""
 
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
@@ -7,12 +8,14 @@ from django.utils import timezone
 from django.views.decorators.http import require_POST
 
 from .models import Notification
+from .services.preferences import CHANNELS, Channels, NotificationPreferences
+from .services.unread_counter import UnreadCounter
 
 
 @login_required
 def notification_list(request):
     """Display user's notifications with read/unread filter."""
-    qs = Notification.objects.filter(user=request.user)
+    qs = Notification.objects.filter(user=request.user, in_app=True)
 
     filter_type = request.GET.get('filter', 'all')
     if filter_type == 'unread':
@@ -21,7 +24,7 @@ def notification_list(request):
         qs = qs.filter(is_read=True)
 
     notifications = qs[:100]  # Latest 100
-    unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_count = UnreadCounter.get(request.user.pk)
 
     return render(request, 'notifications/notification_list.html', {
         'notifications': notifications,
@@ -45,10 +48,11 @@ def mark_read(request, pk):
 @require_POST
 def mark_all_read(request):
     """Mark all of the user's unread notifications as read."""
-    Notification.objects.filter(
+    count = Notification.objects.filter(
         user=request.user,
         is_read=False,
     ).update(is_read=True, read_at=timezone.now())
+    UnreadCounter.read(request.user.pk, count)
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
         return JsonResponse({'status': 'ok'})
     return redirect('notifications:list')
@@ -67,5 +71,26 @@ def notification_open(request, pk):
 @login_required
 def unread_count_api(request):
     """Quick JSON endpoint returning the unread count for the topbar badge."""
-    count = Notification.objects.filter(user=request.user, is_read=False).count()
-    return JsonResponse({'unread_count': count})
+    return JsonResponse({'unread_count': UnreadCounter.get(request.user.pk)})
+
+
+@login_required
+def notification_preferences(request):
+    """Per-type, per-channel notification preferences (checkbox matrix)."""
+    if request.method == 'POST':
+        choices = {
+            value: Channels(*(request.POST.get(f'{value}:{channel}') == 'on' for channel in CHANNELS))
+            for value in Notification.NotificationType.values
+        }
+        if not request.user.email_notifications:
+            # The Email column is disabled, and disabled inputs aren't posted:
+            # keep the stored choices instead of reading them as "off"
+            stored = {row['type']: row['channels'] for row in NotificationPreferences.matrix(request.user)}
+            choices = {value: chosen._replace(email=stored[value].email) for value, chosen in choices.items()}
+        NotificationPreferences.save(request.user, choices)
+        messages.success(request, 'Notification preferences saved.')
+        return redirect('notifications:preferences')
+
+    return render(request, 'notifications/preferences.html', {
+        'rows': NotificationPreferences.matrix(request.user),
+    })
@@ -13,6 +13,7 @@ from django.utils import timezone
 from tickets.models import Ticket, Category
 from accounts.models import User
 from sla.models import SLABreach
+from sla.services.rollup_service import SLARollupService
 
 
 @login_required
@@ -163,18 +164,18 @@ def sla_compliance_report(request):
         breached_at__date__lte=date_to,
     ).select_related('ticket', 'policy').order_by('-breached_at')
 
-    total_tickets = Ticket.objects.filter(
-        created_at__date__gte=date_from,
-        created_at__date__lte=date_to,
-    ).count()
-
-    response_breaches = breaches.filter(breach_type='response').count()
-    resolution_breaches = breaches.filter(breach_type='resolution').count()
+    # Headline figures come from the daily SLA rollups: tickets by creation
+    # date, breaches by breached_at (same range as the breach list above)
+    totals = SLARollupService.get_totals(date_from, date_to)
+    total_tickets = totals['tickets']
+    response_breaches = totals['response_breaches']
+    resolution_breaches = totals['resolution_breaches']
 
     compliance_rate = 0
     if total_tickets > 0:
-        unique_breached = breaches.values('ticket').distinct().count()
-        compliance_rate = round(((total_tickets - unique_breached) / total_tickets) * 100, 1)
+        compliance_rate = round(
+            ((total_tickets - totals['breached_tickets']) / total_tickets) * 100, 1
+        )
 
     # CSV export
     if request.GET.get('export') == 'csv':
@@ -3,14 +3,18 @@ JeyaRamaDesk — SLA Admin
 """
 
 from django.contrib import admin
-from .models import SLAPolicy, SLABreach
+from .models import SLAPolicy, SLABreach, SLAHourlyRollup, SLADailyRollup
 
 
 @admin.register(SLAPolicy)
 class SLAPolicyAdmin(admin.ModelAdmin):
-    list_display = ('name', 'priority', 'response_time_hours', 'resolution_time_hours', 'is_active')
-    list_filter = ('priority', 'is_active')
+    list_display = (
+        'name', 'priority', 'category', 'source', 'customer',
+        'response_time_hours', 'resolution_time_hours', 'is_active',
+    )
+    list_filter = ('priority', 'source', 'is_active')
     search_fields = ('name',)
+    raw_id_fields = ('customer',)
 
 
 @admin.register(SLABreach)
@@ -19,3 +23,29 @@ class SLABreachAdmin(admin.ModelAdmin):
     list_filter = ('breach_type', 'notified', 'breached_at')
     readonly_fields = ('ticket', 'policy', 'breach_type', 'deadline', 'breached_at')
     list_per_page = 50
+
+
+@admin.register(SLADailyRollup)
+class SLADailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'policy', 'priority', 'category', 'agent', 'tickets', 'breached_tickets')
+    list_filter = ('priority', 'day')
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SLAHourlyRollup)
+class SLAHourlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('bucket', 'policy', 'priority', 'category', 'agent', 'tickets', 'breached_tickets')
+    list_filter = ('priority',)
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
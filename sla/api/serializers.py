@@ -4,6 +4,7 @@ REST Framework serializers for SLA policies and breaches.
 """
 
 from rest_framework import serializers
+from accounts.models import User
 from sla.models import SLAPolicy, SLABreach
 
 
@@ -13,7 +14,8 @@ class SLAPolicySerializer(serializers.ModelSerializer):
     class Meta:
         model = SLAPolicy
         fields = [
-            'id', 'name', 'priority', 'response_time_hours',
+            'id', 'name', 'priority', 'category', 'customer', 'source',
+            'response_time_hours',
             'resolution_time_hours', 'escalation_time_hours',
             'is_active', 'created_at', 'updated_at',
         ]
@@ -35,3 +37,45 @@ class SLABreachSerializer(serializers.ModelSerializer):
             'deadline', 'breached_at', 'notified',
         ]
         read_only_fields = ['id', 'breached_at']
+
+
+class SLASimulationPolicySerializer(serializers.Serializer):
+    """A proposed policy for a what-if run. ``id`` overrides an active policy."""
+
+    id = serializers.IntegerField(required=False)
+    name = serializers.CharField(max_length=100, required=False)
+    priority = serializers.ChoiceField(
+        choices=SLAPolicy._meta.get_field('priority').choices,
+        required=False, allow_blank=True,
+    )
+    category = serializers.IntegerField(required=False, allow_null=True)
+    customer = serializers.PrimaryKeyRelatedField(
+        queryset=User.objects.filter(role='customer'), required=False, allow_null=True,
+    )
+    source = serializers.ChoiceField(
+        choices=SLAPolicy._meta.get_field('source').choices,
+        required=False, allow_blank=True,
+    )
+    response_time_hours = serializers.IntegerField(min_value=0, required=False)
+    resolution_time_hours = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        # An override may change only some fields; a new policy needs both limits
+        if attrs.get('id') is None:
+            missing = {
+                field: 'This field is required for a new policy.'
+                for field in ('response_time_hours', 'resolution_time_hours')
+                if field not in attrs
+            }
+            if missing:
+                raise serializers.ValidationError(missing)
+        return attrs
+
+
+class SLASimulationSerializer(serializers.Serializer):
+    """Input for the SLA what-if simulator."""
+
+    policies = SLASimulationPolicySerializer(many=True)
+    replace_active = serializers.BooleanField(default=False)
+    date_from = serializers.DateField(required=False, allow_null=True)
+    date_to = serializers.DateField(required=False, allow_null=True)
@@ -11,7 +11,9 @@ from rest_framework.permissions import IsAuthenticated
 from accounts.permissions import IsStaffMember
 from sla.models import SLAPolicy, SLABreach
 from sla.services.sla_service import SLAService
-from .serializers import SLAPolicySerializer, SLABreachSerializer
+from sla.services.rollup_service import SLARollupService
+from sla.services.simulation_service import SLASimulationService
+from .serializers import SLAPolicySerializer, SLABreachSerializer, SLASimulationSerializer
 
 
 class SLAPolicyViewSet(viewsets.ModelViewSet):
@@ -29,6 +31,42 @@ class SLAPolicyViewSet(viewsets.ModelViewSet):
         stats = SLAService.get_sla_stats()
         return Response(stats, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'])
+    def breakdown(self, request):
+        """
+        Return rolled-up SLA compliance grouped by a dimension.
+        Query params: group_by (policy|priority|category|agent), date_from, date_to.
+        """
+        try:
+            rows = SLARollupService.get_breakdown(
+                request.query_params.get('group_by', 'policy'),
+                date_from=request.query_params.get('date_from'),
+                date_to=request.query_params.get('date_to'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(rows, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def simulate(self, request):
+        """
+        Replay historical tickets against a proposed policy set and compare
+        breach counts with the current active policies.
+        """
+        serializer = SLASimulationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        try:
+            result = SLASimulationService.simulate(
+                data['policies'],
+                replace_active=data['replace_active'],
+                date_from=data.get('date_from'),
+                date_to=data.get('date_to'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK)
+
 
 class SLABreachViewSet(viewsets.ReadOnlyModelViewSet):
     """
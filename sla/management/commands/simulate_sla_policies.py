@@ -0,0 +1,101 @@
+"""
+JeyaRamaDesk — Simulate proposed SLA policies against historical tickets.
+
+Usage:
+    python manage.py simulate_sla_policies --policies proposed.json
+    python manage.py simulate_sla_policies --scale 0.5 --date-from 2025-01-01
+
+``proposed.json`` is a list of policy objects, e.g.
+    [{"id": 3, "response_time_hours": 2},
+     {"name": "VIP", "customer": "<customer uuid>", "response_time_hours": 1, "resolution_time_hours": 8}]
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sla.api.serializers import SLASimulationSerializer
+from sla.models import SLAPolicy
+from sla.services.simulation_service import SLASimulationService
+
+
+class Command(BaseCommand):
+    help = 'Replay historical tickets against proposed SLA policies and report breach rates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--policies', help='JSON file with a list of proposed policies.')
+        parser.add_argument(
+            '--scale', type=float,
+            help='Scale every active policy\'s response/resolution hours by this factor.',
+        )
+        parser.add_argument(
+            '--replace-active', action='store_true',
+            help='Use only the proposed policies instead of overlaying them on the active set.',
+        )
+        parser.add_argument('--date-from', help='Only tickets created on/after this date (YYYY-MM-DD).')
+        parser.add_argument('--date-to', help='Only tickets created on/before this date (YYYY-MM-DD).')
+        parser.add_argument('--json', action='store_true', help='Print the raw result as JSON.')
+
+    def handle(self, *args, **options):
+        specs = []
+        if options['policies']:
+            try:
+                with open(options['policies']) as fh:
+                    specs = json.load(fh)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {options["policies"]}: {e}')
+        if options['scale'] is not None:
+            specs += [
+                {
+                    'id': p.id,
+                    'response_time_hours': round(p.response_time_hours * options['scale']),
+                    'resolution_time_hours': round(p.resolution_time_hours * options['scale']),
+                }
+                for p in SLAPolicy.objects.filter(is_active=True)
+            ]
+        if not specs:
+            raise CommandError('Nothing to simulate: pass --policies and/or --scale.')
+
+        serializer = SLASimulationSerializer(data={
+            'policies': specs,
+            'replace_active': options['replace_active'],
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+        })
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors))
+        data = serializer.validated_data
+
+        try:
+            result = SLASimulationService.simulate(
+                data['policies'],
+                replace_active=data['replace_active'],
+                date_from=data.get('date_from'),
+                date_to=data.get('date_to'),
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2, default=str))
+            return
+
+        self.stdout.write(f'Replayed {result["tickets"]} tickets in {result["elapsed_ms"]} ms.')
+        for label in ('baseline', 'proposed'):
+            totals = result[label]['totals']
+            self.stdout.write(
+                f'{label.capitalize():9} response breached {totals["response_breached"]} '
+                f'({totals["response_breach_rate"]}%), resolution breached '
+                f'{totals["resolution_breached"]} ({totals["resolution_breach_rate"]}%), '
+                f'unmatched {totals["unmatched"]}'
+            )
+            for key, row in result[label]['policies'].items():
+                self.stdout.write(
+                    f'    {row["name"]} [{key}]: {row["tickets"]} tickets, response {row["response_breach_rate"]}%, '
+                    f'resolution {row["resolution_breach_rate"]}%'
+                )
+        delta = result['delta']
+        self.stdout.write(self.style.SUCCESS(
+            f'Change: response breaches {delta["response_breached"]:+d}, '
+            f'resolution breaches {delta["resolution_breached"]:+d}'
+        ))
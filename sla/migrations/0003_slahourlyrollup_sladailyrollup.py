@@ -0,0 +1,71 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tickets', '0003_ticket_idx_ticket_updated'),
+        ('sla', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SLAHourlyRollup',
+            fields=[
+                ('priority', models.CharField(blank=True, default='', max_length=10)),
+                ('tickets', models.PositiveIntegerField(default=0)),
+                ('response_met', models.PositiveIntegerField(default=0)),
+                ('response_breached', models.PositiveIntegerField(default=0)),
+                ('resolution_met', models.PositiveIntegerField(default=0)),
+                ('resolution_breached', models.PositiveIntegerField(default=0)),
+                ('breached_tickets', models.PositiveIntegerField(default=0, help_text='Tickets with at least one SLABreach record')),
+                ('response_breaches', models.PositiveIntegerField(default=0)),
+                ('resolution_breaches', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField()),
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('bucket', models.DateTimeField(help_text='Start of the hour (local time)')),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.category')),
+                ('policy', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='sla.slapolicy')),
+            ],
+            options={
+                'verbose_name': 'SLA Hourly Rollup',
+                'verbose_name_plural': 'SLA Hourly Rollups',
+                'db_table': 'jrd_sla_rollup_hourly',
+                'ordering': ['-bucket'],
+                'indexes': [models.Index(fields=['bucket'], name='idx_slaroll_hour_bucket'), models.Index(fields=['refreshed_at'], name='idx_slaroll_hour_refresh')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SLADailyRollup',
+            fields=[
+                ('priority', models.CharField(blank=True, default='', max_length=10)),
+                ('tickets', models.PositiveIntegerField(default=0)),
+                ('response_met', models.PositiveIntegerField(default=0)),
+                ('response_breached', models.PositiveIntegerField(default=0)),
+                ('resolution_met', models.PositiveIntegerField(default=0)),
+                ('resolution_breached', models.PositiveIntegerField(default=0)),
+                ('breached_tickets', models.PositiveIntegerField(default=0, help_text='Tickets with at least one SLABreach record')),
+                ('response_breaches', models.PositiveIntegerField(default=0)),
+                ('resolution_breaches', models.PositiveIntegerField(default=0)),
+                ('refreshed_at', models.DateTimeField()),
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('day', models.DateField()),
+                ('agent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tickets.category')),
+                ('policy', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='sla.slapolicy')),
+            ],
+            options={
+                'verbose_name': 'SLA Daily Rollup',
+                'verbose_name_plural': 'SLA Daily Rollups',
+                'db_table': 'jrd_sla_rollup_daily',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day'], name='idx_slaroll_day'), models.Index(fields=['day', 'policy'], name='idx_slaroll_day_policy'), models.Index(fields=['day', 'agent'], name='idx_slaroll_day_agent')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tickets', '0003_ticket_idx_ticket_updated'),
+        ('sla', '0003_slahourlyrollup_sladailyrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slapolicy',
+            name='category',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sla_policies', to='tickets.category'),
+        ),
+        migrations.AddField(
+            model_name='slapolicy',
+            name='customer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='sla_policies', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='slapolicy',
+            name='source',
+            field=models.CharField(blank=True, choices=[('web', 'Web'), ('email', 'Email'), ('api', 'API'), ('phone', 'Phone')], default='', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='slapolicy',
+            name='priority',
+            field=models.CharField(blank=True, choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('urgent', 'Urgent')], db_index=True, max_length=10),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sla', '0004_slapolicy_category_slapolicy_customer_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='slabreach',
+            index=models.Index(fields=['notified', 'breached_at'], name='idx_breach_notified'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.28 on 2026-10-19 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sla', '0005_slabreach_idx_breach_notified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slahourlyrollup',
+            name='dirty',
+            field=models.BooleanField(default=False, help_text='A counted ticket or breach was deleted; rebuild on next refresh'),
+        ),
+        migrations.AddIndex(
+            model_name='slahourlyrollup',
+            index=models.Index(fields=['dirty'], name='idx_slaroll_hour_dirty'),
+        ),
+    ]
@@ -9,20 +9,39 @@ from django.conf import settings
 
 class SLAPolicy(models.Model):
     """
-    Defines response and resolution time expectations per priority level.
+    Defines response and resolution time expectations for matching tickets.
+    A policy targets tickets by priority, category, customer and source;
+    a blank target matches anything. When several active policies match,
+    the most specific one wins (see SLAPolicyResolver).
     """
 
     id = models.BigAutoField(primary_key=True)
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, default='')
+
+    # ── Targeting (blank = any) ───────────────────────────────
     priority = models.CharField(
         max_length=10,
         choices=[
             ('low', 'Low'), ('medium', 'Medium'),
             ('high', 'High'), ('urgent', 'Urgent'),
         ],
+        blank=True,
         db_index=True,
     )
+    category = models.ForeignKey(
+        'tickets.Category', on_delete=models.CASCADE,
+        null=True, blank=True, related_name='sla_policies',
+    )
+    customer = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        null=True, blank=True, related_name='sla_policies',
+    )
+    source = models.CharField(
+        max_length=20, blank=True, default='',
+        choices=[('web', 'Web'), ('email', 'Email'), ('api', 'API'), ('phone', 'Phone')],
+    )
+
     response_time_hours = models.PositiveIntegerField(
         help_text='Maximum hours for first response',
     )
@@ -46,7 +65,7 @@ class SLAPolicy(models.Model):
         ]
 
     def __str__(self):
-        return f'{self.name} ({self.get_priority_display()})'
+        return f'{self.name} ({self.get_priority_display() or "Any priority"})'
 
 
 class SLABreach(models.Model):
@@ -78,7 +97,91 @@ class SLABreach(models.Model):
         indexes = [
             models.Index(fields=['ticket', 'breach_type'], name='idx_breach_ticket_type'),
             models.Index(fields=['breached_at'], name='idx_breach_time'),
+            models.Index(fields=['notified', 'breached_at'], name='idx_breach_notified'),
         ]
 
     def __str__(self):
         return f'{self.get_breach_type_display()} — {self.ticket.ticket_id}'
+
+
+class SLARollupBase(models.Model):
+    """
+    Pre-aggregated SLA counters for one time bucket and dimension combo.
+    Ticket counters are keyed by the ticket's ``created_at`` (local time),
+    so a ticket always lands in the same bucket however often it changes;
+    breach counters are keyed by the breach's ``breached_at``.
+    """
+
+    policy = models.ForeignKey(
+        SLAPolicy, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+',
+    )
+    priority = models.CharField(max_length=10, blank=True, default='')
+    category = models.ForeignKey(
+        'tickets.Category', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+',
+    )
+    agent = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='+',
+    )
+
+    tickets = models.PositiveIntegerField(default=0)
+    response_met = models.PositiveIntegerField(default=0)
+    response_breached = models.PositiveIntegerField(default=0)
+    resolution_met = models.PositiveIntegerField(default=0)
+    resolution_breached = models.PositiveIntegerField(default=0)
+    breached_tickets = models.PositiveIntegerField(
+        default=0, help_text='Tickets with at least one SLABreach record',
+    )
+    response_breaches = models.PositiveIntegerField(default=0)
+    resolution_breaches = models.PositiveIntegerField(default=0)
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        abstract = True
+
+
+class SLAHourlyRollup(SLARollupBase):
+    """Hourly SLA counters, rebuilt per dirty hour by the rollup task."""
+
+    id = models.BigAutoField(primary_key=True)
+    bucket = models.DateTimeField(help_text='Start of the hour (local time)')
+    dirty = models.BooleanField(
+        default=False, help_text='A counted ticket or breach was deleted; rebuild on next refresh',
+    )
+
+    class Meta:
+        db_table = 'jrd_sla_rollup_hourly'
+        verbose_name = 'SLA Hourly Rollup'
+        verbose_name_plural = 'SLA Hourly Rollups'
+        ordering = ['-bucket']
+        indexes = [
+            models.Index(fields=['bucket'], name='idx_slaroll_hour_bucket'),
+            models.Index(fields=['refreshed_at'], name='idx_slaroll_hour_refresh'),
+            models.Index(fields=['dirty'], name='idx_slaroll_hour_dirty'),
+        ]
+
+    def __str__(self):
+        return f'SLA rollup {self.bucket:%Y-%m-%d %H:00}'
+
+
+class SLADailyRollup(SLARollupBase):
+    """Daily SLA counters, folded from the hourly rollup rows."""
+
+    id = models.BigAutoField(primary_key=True)
+    day = models.DateField()
+
+    class Meta:
+        db_table = 'jrd_sla_rollup_daily'
+        verbose_name = 'SLA Daily Rollup'
+        verbose_name_plural = 'SLA Daily Rollups'
+        ordering = ['-day']
+        indexes = [
+            models.Index(fields=['day'], name='idx_slaroll_day'),
+            models.Index(fields=['day', 'policy'], name='idx_slaroll_day_policy'),
+            models.Index(fields=['day', 'agent'], name='idx_slaroll_day_agent'),
+        ]
+
+    def __str__(self):
+        return f'SLA rollup {self.day:%Y-%m-%d}'
@@ -0,0 +1,165 @@
+"""
+JeyaRamaDesk — SLA Policy Resolver
+Compiles the active SLA policies into an in-memory decision table so
+that picking a ticket's policy costs a handful of dict lookups and no
+queries. The table is rebuilt when the policy version stamp changes.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from itertools import product
+
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger('jeyaramadesk')
+
+VERSION_CACHE_KEY = 'sla:policy_table:version'
+
+# Recompile at least this often even if no version bump was seen
+# (covers processes whose cache is not shared, e.g. LocMemCache).
+MAX_TABLE_AGE_SECONDS = 60
+
+# Match fields, most significant first. On equal specificity a policy
+# pinned to a customer beats one pinned to a category, and so on.
+MATCH_FIELDS = ('customer_id', 'category_id', 'priority', 'source')
+
+# Every wildcard mask, most specific first
+_MASKS = sorted(
+    product((True, False), repeat=len(MATCH_FIELDS)),
+    key=lambda mask: (-sum(mask), tuple(not bit for bit in mask)),
+)
+
+ResolvedPolicy = namedtuple(
+    'ResolvedPolicy',
+    ['id', 'name', 'response_time_hours', 'resolution_time_hours', 'escalation_time_hours'],
+)
+
+
+class CompiledPolicyTable:
+    """Immutable decision table: wildcard-masked key → ResolvedPolicy."""
+
+    def __init__(self, policies, version=None):
+        self.version = version
+        self.compiled_at = time.monotonic()
+        self._table = {}
+        used_masks = set()
+        for policy in policies:
+            key = (
+                policy.customer_id,
+                policy.category_id,
+                policy.priority or None,
+                policy.source or None,
+            )
+            used_masks.add(tuple(v is not None for v in key))
+            # Policies arrive in precedence order — first one per key wins
+            self._table.setdefault(key, ResolvedPolicy(
+                policy.id, policy.name, policy.response_time_hours,
+                policy.resolution_time_hours, policy.escalation_time_hours,
+            ))
+        # Only probe the wildcard shapes some policy actually uses
+        self._masks = [mask for mask in _MASKS if mask in used_masks]
+
+    def __len__(self):
+        return len(self._table)
+
+    def resolve(self, ticket):
+        """Return the best ResolvedPolicy for a ticket, or None."""
+        if not self._table:
+            return None
+        values = tuple(getattr(ticket, field) or None for field in MATCH_FIELDS)
+        for mask in self._masks:
+            # A shape pinning a field the ticket doesn't have can't match
+            if any(bit and v is None for v, bit in zip(values, mask)):
+                continue
+            key = tuple(v if bit else None for v, bit in zip(values, mask))
+            policy = self._table.get(key)
+            if policy is not None:
+                return policy
+        return None
+
+
+class SLAPolicyResolver:
+    """Process-wide access to the compiled policy table."""
+
+    _lock = threading.Lock()
+    _table = None
+
+    @staticmethod
+    def compile(version=None):
+        """Load active policies (one query) and build a fresh table."""
+        from sla.models import SLAPolicy
+        policies = SLAPolicy.objects.filter(is_active=True).order_by('name', 'id')
+        table = CompiledPolicyTable(policies, version=version)
+        logger.debug(f'SLA policy table compiled: {len(table)} entries (version {version})')
+        return table
+
+    @classmethod
+    def get_table(cls):
+        """
+        Return the current table, recompiling if another process bumped the
+        version stamp or the table is older than MAX_TABLE_AGE_SECONDS.
+        """
+        version = cache.get(VERSION_CACHE_KEY)
+        table = cls._table
+        if (table is None or table.version != version
+                or time.monotonic() - table.compiled_at > MAX_TABLE_AGE_SECONDS):
+            with cls._lock:
+                table = cls._table
+                if (table is None or table.version != version
+                        or time.monotonic() - table.compiled_at > MAX_TABLE_AGE_SECONDS):
+                    table = cls.compile(version)
+                    cls._table = table
+        return table
+
+    @classmethod
+    def invalidate(cls):
+        """Bump the shared version stamp and drop this process's table."""
+        cache.set(VERSION_CACHE_KEY, time.time_ns(), None)
+        cls._table = None
+
+    @staticmethod
+    def resolve(ticket, table=None):
+        """Return the ResolvedPolicy for a ticket (no queries once compiled)."""
+        if table is None:
+            table = SLAPolicyResolver.get_table()
+        return table.resolve(ticket)
+
+    @staticmethod
+    def apply(ticket, table=None, base_time=None):
+        """
+        Stamp the matching policy and deadlines onto a ticket in memory.
+        Deadlines count from ``base_time`` (default: now). A ticket that no
+        policy matches any more loses its old policy and deadlines. Does
+        not save.
+
+        Returns:
+            True if any SLA field on the ticket changed.
+        """
+        policy = SLAPolicyResolver.resolve(ticket, table)
+        if policy is None:
+            if ticket.sla_policy_id is None:
+                return False
+            ticket.sla_policy_id = None
+            ticket.sla_response_deadline = None
+            ticket.sla_resolution_deadline = None
+            ticket.sla_response_met = None
+            return True
+
+        base = base_time or timezone.now()
+        response_deadline = base + timezone.timedelta(hours=policy.response_time_hours)
+        resolution_deadline = base + timezone.timedelta(hours=policy.resolution_time_hours)
+
+        changed = (
+            ticket.sla_policy_id != policy.id
+            or ticket.sla_response_deadline != response_deadline
+            or ticket.sla_resolution_deadline != resolution_deadline
+        )
+        ticket.sla_policy_id = policy.id
+        ticket.sla_response_deadline = response_deadline
+        ticket.sla_resolution_deadline = resolution_deadline
+        if ticket.first_response_at:
+            ticket.sla_response_met = ticket.first_response_at <= response_deadline
+        return changed
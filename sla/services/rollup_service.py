@@ -0,0 +1,313 @@
+"""
+JeyaRamaDesk — SLA Rollup Service
+Maintains hourly and daily pre-aggregated SLA counters so that stats
+pages and reports never scan jrd_tickets / jrd_sla_breaches on load.
+
+Ticket counters are bucketed by the ticket's ``created_at``, breach
+counters by ``breached_at``, so a date range means the same as it does
+on the live breach list.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, Max, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+from sla.models import SLABreach, SLAHourlyRollup, SLADailyRollup
+from tickets.models import Ticket
+
+logger = logging.getLogger('jeyaramadesk')
+
+LOCK_KEY = 'sla:rollup:lock'
+LOCK_TIMEOUT = 600
+
+# Set while a refresh queued by a reader hasn't run yet
+QUEUED_KEY = 'sla:rollup:queued'
+
+# Dimension columns of a rollup row, in key order
+DIMENSIONS = ('policy_id', 'priority', 'category_id', 'agent_id')
+
+# Counter columns shared by the hourly and daily tables
+COUNTERS = (
+    'tickets',
+    'response_met', 'response_breached',
+    'resolution_met', 'resolution_breached',
+    'breached_tickets', 'response_breaches', 'resolution_breaches',
+)
+
+# ?group_by= values accepted by get_breakdown() → rollup lookup
+BREAKDOWN_FIELDS = {
+    'policy': 'policy__name',
+    'priority': 'priority',
+    'category': 'category__name',
+    'agent': 'agent__email',
+}
+
+
+class SLARollupService:
+    """Incremental builder and reader for the SLA rollup tables."""
+
+    # ── Build ─────────────────────────────────────────────────
+
+    @staticmethod
+    def refresh():
+        """
+        Rebuild every hourly bucket touched since the last run, then
+        re-fold the affected days. A bucket is dirty when a ticket created
+        in it was updated, a breach was recorded in it (or its ticket was
+        updated), or it was flagged by ``mark_dirty`` / ``mark_tickets``
+        (deletes, and SLA bookkeeping that leaves ``updated_at`` alone).
+        The first run (empty tables) backfills all history.
+
+        Returns:
+            Number of hourly buckets rebuilt.
+        """
+        if not cache.add(LOCK_KEY, 1, LOCK_TIMEOUT):
+            logger.info('SLA rollup: previous refresh still in progress, skipping.')
+            return 0
+        try:
+            return SLARollupService._refresh()
+        finally:
+            cache.delete(LOCK_KEY)
+
+    @staticmethod
+    def _refresh():
+        now = timezone.now()
+        watermark = SLAHourlyRollup.objects.aggregate(
+            last=Max('refreshed_at'),
+        )['last']
+
+        hours = SLARollupService._dirty_hours(watermark)
+        if not hours:
+            return 0
+
+        by_day = defaultdict(set)
+        for hour in hours:
+            by_day[timezone.localtime(hour).date()].add(hour)
+
+        for day in sorted(by_day):
+            with transaction.atomic():
+                SLARollupService._rebuild_hours(by_day[day], now)
+                SLARollupService._rebuild_day(day, now)
+
+        logger.info(f'SLA rollup: rebuilt {len(hours)} hourly buckets over {len(by_day)} days.')
+        return len(hours)
+
+    @staticmethod
+    def _dirty_hours(watermark):
+        """Return the set of local hour buckets needing a rebuild."""
+        tickets = Ticket.objects.all()
+        breaches = SLABreach.objects.all()
+        if watermark:
+            tickets = tickets.filter(updated_at__gte=watermark)
+            # A ticket update can move its breaches to other dimensions
+            breaches = breaches.filter(
+                Q(breached_at__gte=watermark) | Q(ticket__updated_at__gte=watermark)
+            )
+
+        hours = set(
+            tickets.annotate(bucket=TruncHour('created_at'))
+            .order_by().values_list('bucket', flat=True).distinct()
+        )
+        hours.update(
+            breaches.annotate(bucket=TruncHour('breached_at'))
+            .order_by().values_list('bucket', flat=True).distinct()
+        )
+        hours.update(
+            SLAHourlyRollup.objects.filter(dirty=True)
+            .order_by().values_list('bucket', flat=True).distinct()
+        )
+        return hours
+
+    @staticmethod
+    def mark_dirty(*moments):
+        """
+        Flag the hourly buckets holding ``moments`` for a rebuild. Used for
+        changes ``_dirty_hours`` can't see: a deleted ticket (its
+        ``created_at``) or breach (its ``breached_at``), and system updates
+        that deliberately leave ``Ticket.updated_at`` alone, since that
+        field is the ticket's last activity for the idle sweep.
+        """
+        hours = sorted({
+            timezone.localtime(moment).replace(minute=0, second=0, microsecond=0)
+            for moment in moments if moment
+        })
+        for i in range(0, len(hours), 1000):
+            SLAHourlyRollup.objects.filter(bucket__in=hours[i:i + 1000]).update(dirty=True)
+
+    @staticmethod
+    def mark_tickets(tickets):
+        """Flag the buckets counting these tickets and their breaches (see ``mark_dirty``)."""
+        tickets = list(tickets)
+        breached_at = SLABreach.objects.filter(
+            ticket_id__in=[ticket.pk for ticket in tickets],
+        ).values_list('breached_at', flat=True)
+        SLARollupService.mark_dirty(*(ticket.created_at for ticket in tickets), *breached_at)
+
+    @staticmethod
+    def _rebuild_hours(hours, now):
+        """Recompute hourly rows for the given buckets (all within one day)."""
+        start = min(hours)
+        end = max(hours) + timedelta(hours=1)
+        rows = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+        ticket_counts = Ticket.objects.filter(
+            created_at__gte=start, created_at__lt=end,
+        ).annotate(
+            bucket=TruncHour('created_at'),
+        ).order_by().values(
+            'bucket', 'sla_policy_id', 'priority', 'category_id', 'assigned_agent_id',
+        ).annotate(
+            tickets=Count('id'),
+            response_met=Count('id', filter=Q(sla_response_met=True)),
+            response_breached=Count('id', filter=Q(sla_response_met=False)),
+            resolution_met=Count('id', filter=Q(sla_resolution_met=True)),
+            resolution_breached=Count('id', filter=Q(sla_resolution_met=False)),
+        )
+        for r in ticket_counts:
+            if r['bucket'] not in hours:
+                continue
+            key = (r['bucket'], r['sla_policy_id'], r['priority'],
+                   r['category_id'], r['assigned_agent_id'])
+            for field in ('tickets', 'response_met', 'response_breached',
+                          'resolution_met', 'resolution_breached'):
+                rows[key][field] += r[field]
+
+        # A ticket counts as breached in the bucket of its first breach, so
+        # summing buckets never counts it twice
+        earlier = SLABreach.objects.filter(
+            ticket_id=OuterRef('ticket_id'), breached_at__lt=OuterRef('breached_at'),
+        )
+        breach_counts = SLABreach.objects.filter(
+            breached_at__gte=start, breached_at__lt=end,
+        ).annotate(
+            bucket=TruncHour('breached_at'),
+        ).order_by().values(
+            'bucket', 'ticket__sla_policy_id', 'ticket__priority',
+            'ticket__category_id', 'ticket__assigned_agent_id',
+        ).annotate(
+            breached_tickets=Count('ticket', distinct=True, filter=~Exists(earlier)),
+            response_breaches=Count('id', filter=Q(breach_type='response')),
+            resolution_breaches=Count('id', filter=Q(breach_type='resolution')),
+        )
+        for r in breach_counts:
+            if r['bucket'] not in hours:
+                continue
+            key = (r['bucket'], r['ticket__sla_policy_id'], r['ticket__priority'],
+                   r['ticket__category_id'], r['ticket__assigned_agent_id'])
+            for field in ('breached_tickets', 'response_breaches', 'resolution_breaches'):
+                rows[key][field] += r[field]
+
+        SLAHourlyRollup.objects.filter(bucket__in=hours).delete()
+        SLAHourlyRollup.objects.bulk_create([
+            SLAHourlyRollup(
+                bucket=key[0], refreshed_at=now,
+                **dict(zip(DIMENSIONS, key[1:])), **counters,
+            )
+            for key, counters in rows.items()
+        ], batch_size=1000)
+
+    @staticmethod
+    def _rebuild_day(day, now):
+        """Fold a day's hourly rows into its daily rows."""
+        start = timezone.make_aware(datetime.combine(day, time.min))
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+        folded = SLAHourlyRollup.objects.filter(
+            bucket__gte=start, bucket__lt=end,
+        ).order_by().values(*DIMENSIONS).annotate(
+            **{f'sum_{c}': Sum(c) for c in COUNTERS}
+        )
+
+        SLADailyRollup.objects.filter(day=day).delete()
+        SLADailyRollup.objects.bulk_create([
+            SLADailyRollup(
+                day=day, refreshed_at=now,
+                **{d: r[d] for d in DIMENSIONS},
+                **{c: r[f'sum_{c}'] for c in COUNTERS},
+            )
+            for r in folded
+        ], batch_size=1000)
+
+    # ── Read ──────────────────────────────────────────────────
+
+    @staticmethod
+    def queue_refresh():
+        """Queue ``refresh_sla_rollups`` unless a reader already queued one."""
+        if not cache.add(QUEUED_KEY, 1, LOCK_TIMEOUT):
+            return
+        from sla.tasks import refresh_sla_rollups
+        try:
+            refresh_sla_rollups.delay()
+        except Exception as e:
+            cache.delete(QUEUED_KEY)
+            logger.error(f'Could not enqueue SLA rollup refresh: {e}')
+
+    @staticmethod
+    def _daily(date_from=None, date_to=None):
+        if not SLADailyRollup.objects.exists():
+            # Nothing rolled up yet (fresh deploy, beat not run). The first
+            # build scans all history, so it runs on a worker, not in this
+            # request; readers see empty figures until it lands
+            SLARollupService.queue_refresh()
+        qs = SLADailyRollup.objects.all()
+        if date_from:
+            qs = qs.filter(day__gte=date_from)
+        if date_to:
+            qs = qs.filter(day__lte=date_to)
+        return qs
+
+    @staticmethod
+    def get_totals(date_from=None, date_to=None):
+        """
+        Sum the daily rollups over an optional date range. Ticket counters
+        cover tickets created in the range, breach counters breaches
+        recorded in it. ``sla_*`` keys only count tickets that carry an SLA
+        policy.
+        """
+        with_policy = Q(policy__isnull=False)
+        aggregates = {f'sum_{c}': Coalesce(Sum(c), 0) for c in COUNTERS}
+        aggregates.update({
+            f'sum_sla_{c}': Coalesce(Sum(c, filter=with_policy), 0)
+            for c in ('tickets', 'response_met', 'response_breached',
+                      'resolution_met', 'resolution_breached')
+        })
+        totals = SLARollupService._daily(date_from, date_to).aggregate(**aggregates)
+        return {key[len('sum_'):]: value for key, value in totals.items()}
+
+    @staticmethod
+    def get_breakdown(group_by, date_from=None, date_to=None):
+        """
+        Met/breached counters grouped by policy, priority, category or agent.
+
+        Raises:
+            ValueError: if ``group_by`` is not a supported dimension.
+        """
+        if group_by not in BREAKDOWN_FIELDS:
+            raise ValueError(f'Unsupported group_by: {group_by}')
+        lookup = BREAKDOWN_FIELDS[group_by]
+
+        rows = SLARollupService._daily(date_from, date_to).order_by().values(
+            lookup,
+        ).annotate(
+            **{f'sum_{c}': Sum(c) for c in COUNTERS}
+        ).order_by(lookup)
+
+        results = []
+        for r in rows:
+            row = {group_by: r[lookup], **{c: r[f'sum_{c}'] for c in COUNTERS}}
+            response_total = row['response_met'] + row['response_breached']
+            resolution_total = row['resolution_met'] + row['resolution_breached']
+            row['response_rate'] = round(
+                (row['response_met'] / response_total * 100) if response_total else 0, 1
+            )
+            row['resolution_rate'] = round(
+                (row['resolution_met'] / resolution_total * 100) if resolution_total else 0, 1
+            )
+            results.append(row)
+        return results
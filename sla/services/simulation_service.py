@@ -0,0 +1,323 @@
+"""
+JeyaRamaDesk — SLA Simulation Service
+Replays historical ticket timings against a proposed set of SLA policies
+("what if response time were 2h instead of 4h?") without touching tickets.
+
+Ticket durations are loaded once into columnar, sorted ``array('d')``
+buckets grouped by the policy match key. Evaluating a scenario then
+resolves each distinct key once and counts breaches per bucket with a
+binary search, so the cost of a scenario grows with the number of
+distinct keys, not the number of tickets.
+"""
+
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta
+from types import SimpleNamespace
+
+from django.utils import timezone
+
+from sla.models import SLAPolicy
+from sla.services.policy_resolver import MATCH_FIELDS, CompiledPolicyTable
+from tickets.models import Ticket
+
+logger = logging.getLogger('jeyaramadesk')
+
+# Loaded histories are reused for repeated what-if runs within this window
+HISTORY_TTL_SECONDS = 300
+
+# Match field → SLAPolicy attribute that pins it
+POLICY_ATTRS = {
+    'customer_id': 'customer_id',
+    'category_id': 'category_id',
+    'priority': 'priority',
+    'source': 'source',
+}
+
+# Fields a proposed policy may set
+POLICY_FIELDS = (
+    'name', 'priority', 'category', 'customer', 'source',
+    'response_time_hours', 'resolution_time_hours', 'escalation_time_hours',
+)
+
+RESOLVED_STATUSES = ('resolved', 'closed')
+
+COUNTERS = (
+    'tickets', 'unmatched',
+    'response_met', 'response_breached', 'response_pending',
+    'resolution_met', 'resolution_breached', 'resolution_pending',
+)
+
+
+class _Bucket:
+    """Sorted duration columns (hours) for tickets sharing one match key."""
+
+    __slots__ = ('tickets', 'response_done', 'response_open',
+                 'resolution_done', 'resolution_open')
+
+    def __init__(self):
+        self.tickets = 0
+        self.response_done = []
+        self.response_open = []
+        self.resolution_done = []
+        self.resolution_open = []
+
+    def freeze(self):
+        for name in self.__slots__[1:]:
+            setattr(self, name, array('d', sorted(getattr(self, name))))
+
+
+class TimingHistory:
+    """
+    Historical ticket timings grouped by the match fields some policy uses.
+
+    ``*_done`` columns hold the elapsed hours to first response / resolution;
+    ``*_open`` columns hold the hours elapsed so far (at load time) for
+    tickets still waiting, which count as breached once past the limit.
+    """
+
+    def __init__(self, key_fields, date_from=None, date_to=None):
+        self.key_fields = tuple(key_fields)
+        self.date_from = date_from
+        self.date_to = date_to
+        self.loaded_at = time.monotonic()
+        self.buckets = {}
+        self.tickets = 0
+
+    @classmethod
+    def load(cls, key_fields, date_from=None, date_to=None, chunk_size=5000):
+        """Stream the timing columns of every ticket in range (one query)."""
+        history = cls(key_fields, date_from, date_to)
+        now = timezone.now()
+
+        qs = Ticket.objects.all()
+        if date_from:
+            qs = qs.filter(created_at__gte=_start_of_day(date_from))
+        if date_to:
+            qs = qs.filter(created_at__lt=_start_of_day(date_to + timedelta(days=1)))
+        rows = qs.order_by().values_list(
+            'created_at', 'first_response_at', 'resolved_at', 'status',
+            *history.key_fields,
+        ).iterator(chunk_size=chunk_size)
+
+        buckets = defaultdict(_Bucket)
+        for created_at, first_response_at, resolved_at, ticket_status, *key in rows:
+            bucket = buckets[tuple(key)]
+            bucket.tickets += 1
+            is_done = ticket_status in RESOLVED_STATUSES
+            age = (now - created_at).total_seconds() / 3600
+
+            if first_response_at:
+                bucket.response_done.append(
+                    (first_response_at - created_at).total_seconds() / 3600
+                )
+            elif not is_done:
+                bucket.response_open.append(age)
+
+            if resolved_at:
+                bucket.resolution_done.append(
+                    (resolved_at - created_at).total_seconds() / 3600
+                )
+            elif not is_done:
+                bucket.resolution_open.append(age)
+
+        for bucket in buckets.values():
+            bucket.freeze()
+            history.tickets += bucket.tickets
+        history.buckets = dict(buckets)
+        return history
+
+    def evaluate(self, policies):
+        """
+        Count met / breached / pending tickets under ``policies``.
+
+        Returns:
+            (totals, per_policy) — ``per_policy`` maps each policy's key
+            (its pk, or ``new-N`` for the Nth unsaved proposed policy) to
+            its ``id``, ``name`` and counters. Names need not be unique.
+        """
+        # Table entries carry the result key as their id, so unsaved
+        # proposed policies stay apart too
+        table = CompiledPolicyTable(_keyed(policy) for policy in policies)
+        pks = {_policy_key(policy): policy.pk for policy in policies}
+        totals = dict.fromkeys(COUNTERS, 0)
+        per_policy = defaultdict(lambda: dict.fromkeys(COUNTERS[:1] + COUNTERS[2:], 0))
+
+        for key, bucket in self.buckets.items():
+            values = dict.fromkeys(MATCH_FIELDS)
+            values.update(zip(self.key_fields, key))
+            policy = table.resolve(SimpleNamespace(**values))
+            totals['tickets'] += bucket.tickets
+            if policy is None:
+                totals['unmatched'] += bucket.tickets
+                continue
+
+            counts = _count(bucket, policy.response_time_hours, policy.resolution_time_hours)
+            row = per_policy[policy.id]
+            row['id'], row['name'] = pks[policy.id], policy.name
+            row['tickets'] += bucket.tickets
+            for field, value in counts.items():
+                row[field] += value
+                totals[field] += value
+
+        return _with_rates(totals), {
+            key: _with_rates(row) for key, row in sorted(
+                per_policy.items(), key=lambda item: (item[1]['name'], str(item[0])),
+            )
+        }
+
+
+def _policy_key(policy):
+    return getattr(policy, 'simulation_key', None) or policy.pk
+
+
+def _keyed(policy):
+    """The match and limit fields of ``policy``, with its result key as id."""
+    return SimpleNamespace(
+        id=_policy_key(policy), name=policy.name,
+        customer_id=policy.customer_id, category_id=policy.category_id,
+        priority=policy.priority, source=policy.source,
+        response_time_hours=policy.response_time_hours,
+        resolution_time_hours=policy.resolution_time_hours,
+        escalation_time_hours=policy.escalation_time_hours,
+    )
+
+
+def _count(bucket, response_hours, resolution_hours):
+    response_met = bisect_right(bucket.response_done, response_hours)
+    response_pending = bisect_right(bucket.response_open, response_hours)
+    resolution_met = bisect_right(bucket.resolution_done, resolution_hours)
+    resolution_pending = bisect_right(bucket.resolution_open, resolution_hours)
+    return {
+        'response_met': response_met,
+        'response_breached': (len(bucket.response_done) - response_met
+                              + len(bucket.response_open) - response_pending),
+        'response_pending': response_pending,
+        'resolution_met': resolution_met,
+        'resolution_breached': (len(bucket.resolution_done) - resolution_met
+                                + len(bucket.resolution_open) - resolution_pending),
+        'resolution_pending': resolution_pending,
+    }
+
+
+def _with_rates(row):
+    for kind in ('response', 'resolution'):
+        decided = row[f'{kind}_met'] + row[f'{kind}_breached']
+        row[f'{kind}_breach_rate'] = round(
+            (row[f'{kind}_breached'] / decided * 100) if decided else 0, 1
+        )
+    return row
+
+
+def _start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+class SLASimulationService:
+    """Run what-if SLA scenarios over historical tickets."""
+
+    _lock = threading.Lock()
+    _histories = {}
+
+    @staticmethod
+    def build_policies(specs, replace_active=False):
+        """
+        Turn proposed policy dicts into unsaved ``SLAPolicy`` objects.
+
+        A spec with an ``id`` overrides that active policy's fields; other
+        specs are added as new policies. With ``replace_active`` the active
+        policies are dropped and only the specs are used.
+
+        Raises:
+            ValueError: if a spec references an unknown policy id, or a
+                policy ends up without a response or resolution limit.
+        """
+        active = {} if replace_active else {
+            p.id: p for p in SLAPolicy.objects.filter(is_active=True)
+        }
+        proposed = []
+        for index, spec in enumerate(specs, start=1):
+            spec = dict(spec)
+            policy_id = spec.pop('id', None)
+            if policy_id is not None and not replace_active:
+                if policy_id not in active:
+                    raise ValueError(f'Unknown active SLA policy id: {policy_id}')
+                policy = active.pop(policy_id)
+            else:
+                policy = SLAPolicy(name=spec.get('name') or 'Proposed policy')
+                # Unsaved, so no pk to key its simulation results by
+                policy.simulation_key = f'new-{index}'
+            for field in POLICY_FIELDS:
+                if field in ('category', 'customer') and field in spec:
+                    # Plain ids or model instances (from the API serializer)
+                    setattr(policy, f'{field}_id', getattr(spec[field], 'pk', spec[field]))
+                elif field in spec:
+                    setattr(policy, field, spec[field] if spec[field] is not None else '')
+            for field in ('response_time_hours', 'resolution_time_hours'):
+                if getattr(policy, field) in (None, ''):
+                    raise ValueError(f'Policy "{policy.name}" needs {field}')
+            proposed.append(policy)
+
+        policies = list(active.values()) + proposed
+        # Same precedence as SLAPolicyResolver.compile()
+        policies.sort(key=lambda p: (p.name, p.id is None, p.id or 0))
+        return policies
+
+    @classmethod
+    def get_history(cls, key_fields, date_from=None, date_to=None):
+        """Return a cached TimingHistory for this key shape and range, loading if stale."""
+        cache_key = (tuple(key_fields), date_from, date_to)
+        history = cls._histories.get(cache_key)
+        if history is None or time.monotonic() - history.loaded_at > HISTORY_TTL_SECONDS:
+            with cls._lock:
+                history = cls._histories.get(cache_key)
+                if history is None or time.monotonic() - history.loaded_at > HISTORY_TTL_SECONDS:
+                    started = time.monotonic()
+                    history = TimingHistory.load(key_fields, date_from, date_to)
+                    logger.info(
+                        f'SLA simulation: loaded {history.tickets} tickets into '
+                        f'{len(history.buckets)} buckets in {time.monotonic() - started:.2f}s'
+                    )
+                    # Keep only the latest shape/range to bound memory
+                    cls._histories = {cache_key: history}
+        return history
+
+    @staticmethod
+    def simulate(specs, replace_active=False, date_from=None, date_to=None):
+        """
+        Compare the current active policies against a proposed set.
+
+        Returns:
+            dict with ``baseline``, ``proposed`` (totals + per-policy rows
+            keyed by policy pk, see ``TimingHistory.evaluate``) and ``delta`` of breached counts (proposed − baseline).
+        """
+        started = time.monotonic()
+        baseline = list(SLAPolicy.objects.filter(is_active=True).order_by('name', 'id'))
+        proposed = SLASimulationService.build_policies(specs, replace_active)
+
+        # Only load the match columns some policy actually pins
+        key_fields = [
+            field for field in MATCH_FIELDS
+            if any(getattr(p, POLICY_ATTRS[field]) for p in baseline + proposed)
+        ]
+        history = SLASimulationService.get_history(key_fields, date_from, date_to)
+
+        base_totals, base_rows = history.evaluate(baseline)
+        new_totals, new_rows = history.evaluate(proposed)
+
+        return {
+            'tickets': history.tickets,
+            'date_from': date_from,
+            'date_to': date_to,
+            'baseline': {'totals': base_totals, 'policies': base_rows},
+            'proposed': {'totals': new_totals, 'policies': new_rows},
+            'delta': {
+                'response_breached': new_totals['response_breached'] - base_totals['response_breached'],
+                'resolution_breached': new_totals['resolution_breached'] - base_totals['resolution_breached'],
+            },
+            'elapsed_ms': round((time.monotonic() - started) * 1000),
+        }
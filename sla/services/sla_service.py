@@ -4,9 +4,12 @@ JeyaRamaDesk — SLA Service Layer
 
 import logging
 from django.utils import timezone
+from django.conf import settings
 from django.db import transaction
 from sla.models import SLAPolicy, SLABreach
+from sla.services.rollup_service import SLARollupService
 from tickets.models import Ticket
+from tickets.events import TicketEventBus, SLABreached
 
 logger = logging.getLogger('jeyaramadesk')
 
@@ -19,72 +22,162 @@ class SLAService:
         """
         Check all open tickets for SLA breaches.
         Called periodically by Celery beat.
+
+        Breach rows are bulk-inserted with ``notified=False``. In digest mode
+        (``SLA_BREACH_DIGEST_ENABLED``) notifications are left to
+        ``send_breach_digests``; otherwise they are sent immediately.
         """
         now = timezone.now()
-        breaches_found = 0
+        open_statuses = ['open', 'in_progress', 'pending']
 
         # Response time breaches
-        response_breached = Ticket.objects.filter(
+        response_breached = list(Ticket.objects.filter(
             sla_response_deadline__lt=now,
             first_response_at__isnull=True,
-            status__in=['open', 'in_progress', 'pending'],
+            status__in=open_statuses,
         ).exclude(
             sla_breaches__breach_type='response',
-        )
-
-        for ticket in response_breached:
-            SLABreach.objects.create(
-                ticket=ticket,
-                policy=ticket.sla_policy,
-                breach_type=SLABreach.BreachType.RESPONSE,
-                deadline=ticket.sla_response_deadline,
-            )
-            ticket.sla_response_met = False
-            ticket.save(update_fields=['sla_response_met'])
-            breaches_found += 1
-            # Send notification
-            try:
-                from notifications.services.notification_service import NotificationService
-                NotificationService.notify_sla_breach(ticket, breach_type='response')
-            except Exception as e:
-                logger.error(f'SLA breach notification error: {e}')
+        ).only('id', 'ticket_id', 'sla_policy_id', 'sla_response_deadline', 'assigned_agent_id', 'created_at'))
 
         # Resolution time breaches
-        resolution_breached = Ticket.objects.filter(
+        resolution_breached = list(Ticket.objects.filter(
             sla_resolution_deadline__lt=now,
-            status__in=['open', 'in_progress', 'pending'],
+            status__in=open_statuses,
         ).exclude(
             sla_breaches__breach_type='resolution',
-        )
-
-        for ticket in resolution_breached:
-            SLABreach.objects.create(
-                ticket=ticket,
-                policy=ticket.sla_policy,
-                breach_type=SLABreach.BreachType.RESOLUTION,
-                deadline=ticket.sla_resolution_deadline,
-            )
-            ticket.sla_resolution_met = False
-            ticket.save(update_fields=['sla_resolution_met'])
-            breaches_found += 1
-            # Send notification
-            try:
-                from notifications.services.notification_service import NotificationService
-                NotificationService.notify_sla_breach(ticket, breach_type='resolution')
-            except Exception as e:
-                logger.error(f'SLA breach notification error: {e}')
+        ).only('id', 'ticket_id', 'sla_policy_id', 'sla_resolution_deadline', 'assigned_agent_id', 'created_at'))
+
+        with transaction.atomic():
+            SLABreach.objects.bulk_create([
+                SLABreach(
+                    ticket=ticket,
+                    policy_id=ticket.sla_policy_id,
+                    breach_type=SLABreach.BreachType.RESPONSE,
+                    deadline=ticket.sla_response_deadline,
+                )
+                for ticket in response_breached
+            ] + [
+                SLABreach(
+                    ticket=ticket,
+                    policy_id=ticket.sla_policy_id,
+                    breach_type=SLABreach.BreachType.RESOLUTION,
+                    deadline=ticket.sla_resolution_deadline,
+                )
+                for ticket in resolution_breached
+            ], batch_size=1000)
+            # Bookkeeping, not activity: updated_at (the idle clock) stays put
+            # and the tickets' rollup buckets are flagged instead
+            Ticket.objects.filter(
+                pk__in=[t.pk for t in response_breached],
+            ).update(sla_response_met=False)
+            Ticket.objects.filter(
+                pk__in=[t.pk for t in resolution_breached],
+            ).update(sla_resolution_met=False)
+            SLARollupService.mark_dirty(*(t.created_at for t in response_breached + resolution_breached))
+            TicketEventBus.emit(*(
+                [SLABreached(t.pk, 'response') for t in response_breached]
+                + [SLABreached(t.pk, 'resolution') for t in resolution_breached]
+            ))
+
+        breaches_found = len(response_breached) + len(resolution_breached)
+
+        if not getattr(settings, 'SLA_BREACH_DIGEST_ENABLED', True):
+            from notifications.services.notification_service import NotificationService
+            for breach_type, tickets in (('response', response_breached),
+                                         ('resolution', resolution_breached)):
+                notified = []
+                for ticket in tickets:
+                    try:
+                        NotificationService.notify_sla_breach(ticket, breach_type=breach_type)
+                        notified.append(ticket.pk)
+                    except Exception as e:
+                        logger.error(f'SLA breach notification error: {e}')
+                # Failed ones stay pending; send_breach_digests retries them
+                SLABreach.objects.filter(
+                    ticket_id__in=notified, breach_type=breach_type,
+                    notified=False, breached_at__gte=now,
+                ).update(notified=True)
 
         if breaches_found:
             logger.warning(f'SLA Check: {breaches_found} new breaches detected.')
 
         return breaches_found
 
+    @staticmethod
+    def send_breach_digests():
+        """
+        Send one digest notification per recipient covering every breach
+        not yet notified, then flag those breaches in a single UPDATE in
+        the same transaction. If the digests can't be created nothing is
+        flagged, and the next run tries again.
+        Recipients are each ticket's assigned agent plus all managers.
+        Called every minute by Celery beat, so one digest ≈ one window.
+
+        Returns:
+            Number of breaches covered.
+        """
+        from collections import defaultdict
+        from accounts.models import User
+        from notifications.services.notification_service import NotificationService
+
+        batch_size = getattr(settings, 'SLA_BREACH_DIGEST_BATCH_SIZE', 5000)
+        pending = list(
+            SLABreach.objects.filter(notified=False)
+            .select_related('ticket', 'ticket__assigned_agent')
+            .order_by('breached_at')[:batch_size]
+        )
+        if not pending:
+            return 0
+
+        managers = list(User.objects.filter(
+            role__in=['superadmin', 'manager'], is_active=True,
+        ))
+
+        users = {m.pk: m for m in managers}
+        digests = defaultdict(list)
+        for breach in pending:
+            recipients = set(m.pk for m in managers)
+            agent = breach.ticket.assigned_agent
+            if agent:
+                users.setdefault(agent.pk, agent)
+                recipients.add(agent.pk)
+            for user_pk in recipients:
+                digests[user_pk].append(breach)
+
+        try:
+            # Flagged in the digests' transaction: a failure leaves every
+            # breach pending for the next run
+            with transaction.atomic():
+                NotificationService.notify_sla_breach_digests({
+                    users[user_pk]: breaches for user_pk, breaches in digests.items()
+                })
+                SLABreach.objects.filter(
+                    pk__in=[b.pk for b in pending],
+                ).update(notified=True)
+        except Exception as e:
+            logger.error(
+                f'SLA breach digest error for {len(digests)} recipients, '
+                f'{len(pending)} breaches left pending: {e}'
+            )
+            return 0
+
+        logger.info(
+            f'SLA digest: {len(pending)} breaches sent to {len(digests)} recipients.'
+        )
+        return len(pending)
+
     @staticmethod
     def get_sla_stats():
-        """Get SLA performance statistics."""
-        from django.db.models import Count, Q, F
+        """
+        Get SLA performance statistics.
+        Reads the pre-aggregated daily rollups (see SLARollupService), so the
+        figures lag live data by at most one rollup task interval. Before
+        the first rollup run the figures are empty and a refresh is queued.
+        """
+        from sla.services.rollup_service import SLARollupService
 
-        total_with_sla = Ticket.objects.filter(sla_policy__isnull=False).count()
+        totals = SLARollupService.get_totals()
+        total_with_sla = totals['sla_tickets']
         if total_with_sla == 0:
             return {
                 'total': 0,
@@ -92,18 +185,18 @@ class SLAService:
                 'resolution_met': 0, 'resolution_breached': 0, 'resolution_rate': 0,
             }
 
-        stats = Ticket.objects.filter(sla_policy__isnull=False).aggregate(
-            response_met=Count('id', filter=Q(sla_response_met=True)),
-            response_breached=Count('id', filter=Q(sla_response_met=False)),
-            resolution_met=Count('id', filter=Q(sla_resolution_met=True)),
-            resolution_breached=Count('id', filter=Q(sla_resolution_met=False)),
-        )
+        stats = {
+            'response_met': totals['sla_response_met'],
+            'response_breached': totals['sla_response_breached'],
+            'resolution_met': totals['sla_resolution_met'],
+            'resolution_breached': totals['sla_resolution_breached'],
+        }
 
         response_total = stats['response_met'] + stats['response_breached']
         resolution_total = stats['resolution_met'] + stats['resolution_breached']
 
         stats['total'] = total_with_sla
-        stats['total_breaches'] = SLABreach.objects.count()
+        stats['total_breaches'] = totals['response_breaches'] + totals['resolution_breaches']
         stats['response_rate'] = round(
             (stats['response_met'] / response_total * 100) if response_total else 0, 1
         )
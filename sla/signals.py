@@ -0,0 +1,33 @@
+"""
+JeyaRamaDesk — SLA Signals
+Keeps the compiled SLA policy table in sync with policy edits, and flags
+rollup buckets whose tickets or breaches are deleted.
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from sla.models import SLABreach, SLAPolicy
+from tickets.models import Ticket
+
+
+@receiver(post_save, sender=SLAPolicy)
+@receiver(post_delete, sender=SLAPolicy)
+def sla_policy_changed(sender, instance, **kwargs):
+    """Invalidate the policy table once the change is committed."""
+    from sla.services.policy_resolver import SLAPolicyResolver
+    transaction.on_commit(SLAPolicyResolver.invalidate)
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, **kwargs):
+    """Rebuild the rollup bucket that counted the deleted ticket."""
+    from sla.services.rollup_service import SLARollupService
+    SLARollupService.mark_dirty(instance.created_at)
+
+
+@receiver(post_delete, sender=SLABreach)
+def breach_deleted(sender, instance, **kwargs):
+    """Rebuild the rollup bucket that counted the deleted breach."""
+    from sla.services.rollup_service import SLARollupService
+    SLARollupService.mark_dirty(instance.breached_at)
@@ -15,3 +15,24 @@ def check_sla_breaches():
     count = SLAService.check_all_breaches()
     logger.info(f'SLA breach check completed. {count} new breaches.')
     return count
+
+
+@shared_task(name='sla.tasks.send_sla_breach_digests')
+def send_sla_breach_digests():
+    """Periodic task to send one SLA breach digest per recipient."""
+    from sla.services.sla_service import SLAService
+    count = SLAService.send_breach_digests()
+    if count:
+        logger.info(f'SLA breach digests sent for {count} breaches.')
+    return count
+
+
+@shared_task(name='sla.tasks.refresh_sla_rollups')
+def refresh_sla_rollups():
+    """Periodic task to fold recent ticket/breach changes into SLA rollups."""
+    from django.core.cache import cache
+    from sla.services.rollup_service import QUEUED_KEY, SLARollupService
+    count = SLARollupService.refresh()
+    cache.delete(QUEUED_KEY)
+    logger.info(f'SLA rollup refresh completed. {count} hourly buckets rebuilt.')
+    return count
@@ -1,3 +1,187 @@
+"""
+JeyaRamaDesk — SLA Tests
+What-if simulation API: proposed policies (new, customer-scoped) and
+validation of incomplete specs. Policy form customer targeting. Breach
+checks flag rollup buckets without touching the tickets' idle clock.
+"""
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from sla.models import SLAHourlyRollup, SLAPolicy
+from sla.services.rollup_service import SLARollupService
+from sla.services.simulation_service import SLASimulationService
+from sla.services.sla_service import SLAService
+from tickets.models import Ticket
+
+User = get_user_model()
+
+
+class SLASimulationAPITests(TestCase):
+
+    def setUp(self):
+        SLASimulationService._histories.clear()
+        self.manager = User.objects.create_user(
+            email='manager@example.com', password='x', first_name='Man', last_name='Ager', role='manager',
+        )
+        self.vip = User.objects.create_user(
+            email='vip@example.com', password='x', first_name='Vip', last_name='Customer', role='customer',
+        )
+        self.other = User.objects.create_user(
+            email='other@example.com', password='x', first_name='Other', last_name='Customer', role='customer',
+        )
+        # Both tickets: first response after 2h, resolved after 5h
+        for customer in (self.vip, self.other):
+            ticket = Ticket.objects.create(title='t', description='d', customer=customer)
+            created = timezone.now() - timedelta(days=1)
+            Ticket.objects.filter(pk=ticket.pk).update(
+                status='resolved', created_at=created,
+                first_response_at=created + timedelta(hours=2),
+                resolved_at=created + timedelta(hours=5),
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def _simulate(self, policies):
+        return self.client.post(reverse('sla-policy-simulate'), {'policies': policies, 'replace_active': True}, format='json')
+
+    def test_new_policy(self):
+        response = self._simulate([
+            {'name': 'Everyone', 'response_time_hours': 3, 'resolution_time_hours': 4},
+        ])
+
+        self.assertEqual(response.status_code, 200, response.data)
+        row = response.data['proposed']['policies']['new-1']
+        self.assertEqual(row['name'], 'Everyone')
+        self.assertIsNone(row['id'])
+        self.assertEqual(row['tickets'], 2)
+        self.assertEqual(row['response_met'], 2)
+        self.assertEqual(row['resolution_breached'], 2)
+        self.assertEqual(response.data['proposed']['totals']['unmatched'], 0)
+
+    def test_customer_scoped_policy(self):
+        response = self._simulate([
+            {'name': 'VIP', 'customer': str(self.vip.pk), 'response_time_hours': 1, 'resolution_time_hours': 8},
+            {'name': 'Everyone', 'response_time_hours': 3, 'resolution_time_hours': 4},
+        ])
+
+        self.assertEqual(response.status_code, 200, response.data)
+        policies = response.data['proposed']['policies']
+        self.assertEqual(policies['new-1']['name'], 'VIP')
+        self.assertEqual(policies['new-1']['tickets'], 1)
+        self.assertEqual(policies['new-1']['response_breached'], 1)
+        self.assertEqual(policies['new-1']['resolution_met'], 1)
+        self.assertEqual(policies['new-2']['tickets'], 1)
+
+    def test_policies_sharing_a_name_are_kept_apart(self):
+        vip = SLAPolicy.objects.create(
+            name='Standard', customer=self.vip, response_time_hours=1, resolution_time_hours=8,
+        )
+        everyone = SLAPolicy.objects.create(name='Standard', response_time_hours=3, resolution_time_hours=4)
+
+        response = self.client.post(reverse('sla-policy-simulate'), {'policies': []}, format='json')
+
+        self.assertEqual(response.status_code, 200, response.data)
+        policies = response.data['baseline']['policies']
+        self.assertEqual(set(policies), {vip.pk, everyone.pk})
+        self.assertEqual(policies[vip.pk]['name'], 'Standard')
+        self.assertEqual(policies[vip.pk]['response_breached'], 1)
+        self.assertEqual(policies[everyone.pk]['tickets'], 1)
+
+    def test_new_policy_without_limits_is_rejected(self):
+        response = self._simulate([{'name': 'Half done', 'response_time_hours': 2}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('resolution_time_hours', response.data['policies'][0])
+
+    def test_integer_customer_is_rejected(self):
+        response = self._simulate([
+            {'name': 'VIP', 'customer': 42, 'response_time_hours': 1, 'resolution_time_hours': 8},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('customer', response.data['policies'][0])
+
+    def test_build_policies_rejects_missing_limits(self):
+        with self.assertRaises(ValueError):
+            SLASimulationService.build_policies([{'name': 'No limits'}], replace_active=True)
+
+
+class SLAPolicyFormTests(TestCase):
+
+    def setUp(self):
+        self.manager = User.objects.create_user(
+            email='manager@example.com', password='x', first_name='Man', last_name='Ager', role='manager',
+        )
+        self.vip = User.objects.create_user(
+            email='vip@example.com', password='x', first_name='Vip', last_name='Customer', role='customer',
+        )
+        self.client.force_login(self.manager)
+
+    def _form(self, **fields):
+        return {
+            'name': 'VIP', 'priority': '', 'category': '', 'source': '',
+            'response_time_hours': 1, 'resolution_time_hours': 8, 'escalation_time_hours': 0,
+            'is_active': 'on', **fields,
+        }
+
+    def test_create_targets_the_customer(self):
+        response = self.client.post(reverse('sla:create'), self._form(customer_email='VIP@example.com'))
+
+        self.assertRedirects(response, reverse('sla:list'), fetch_redirect_response=False)
+        self.assertEqual(SLAPolicy.objects.get().customer, self.vip)
+
+    def test_blank_email_means_any_customer(self):
+        self.client.post(reverse('sla:create'), self._form(customer_email=''))
+
+        self.assertIsNone(SLAPolicy.objects.get().customer)
+
+    def test_create_with_unknown_email_is_rejected(self):
+        response = self.client.post(reverse('sla:create'), self._form(customer_email='nobody@example.com'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'No user with email')
+        self.assertContains(response, 'value="nobody@example.com"')
+        self.assertFalse(SLAPolicy.objects.exists())
+
+    def test_edit_with_unknown_email_keeps_the_customer(self):
+        policy = SLAPolicy.objects.create(
+            name='VIP', customer=self.vip, response_time_hours=1, resolution_time_hours=8,
+        )
+
+        response = self.client.post(
+            reverse('sla:edit', args=[policy.pk]), self._form(customer_email='typo@example.com'),
+        )
+
+        self.assertContains(response, 'No user with email')
+        policy.refresh_from_db()
+        self.assertEqual(policy.customer, self.vip)
+
+
+class SLABreachBookkeepingTests(TestCase):
+
+    def test_breach_check_flags_rollups_without_touching_updated_at(self):
+        customer = User.objects.create_user(
+            email='customer@example.com', password='x', first_name='Cus', last_name='Tomer', role='customer',
+        )
+        ticket = Ticket.objects.create(title='t', description='d', customer=customer)
+        created = timezone.now() - timedelta(days=2)
+        Ticket.objects.filter(pk=ticket.pk).update(
+            created_at=created, updated_at=created, sla_response_deadline=created + timedelta(hours=1),
+        )
+        SLARollupService.refresh()
+        self.assertFalse(SLAHourlyRollup.objects.filter(dirty=True).exists())
+
+        self.assertEqual(SLAService.check_all_breaches(), 1)
 
-# Create your tests here.
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.updated_at, created)
+        self.assertFalse(ticket.sla_response_met)
+        self.assertTrue(SLAHourlyRollup.objects.get(dirty=True).bucket <= created)
+        self.assertEqual(SLARollupService.refresh(), 2)
+        self.assertEqual(SLARollupService.get_totals()['response_breached'], 1)
@@ -7,6 +7,41 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from sla.models import SLAPolicy, SLABreach
 from sla.services.sla_service import SLAService
+from tickets.models import Category
+
+
+def _apply_targeting(policy, post):
+    """
+    Copy the optional targeting fields from a submitted form onto a policy.
+
+    Returns:
+        An error message when the customer email matches no user, else None.
+        A blank email means "any customer".
+    """
+    from accounts.models import User
+    policy.priority = post.get('priority', '')
+    policy.category_id = post.get('category') or None
+    policy.source = post.get('source', '')
+    customer_email = post.get('customer_email', '').strip()
+    if not customer_email:
+        policy.customer = None
+        return None
+    customer = User.objects.filter(email__iexact=customer_email).first()
+    if customer is None:
+        # Saving without the customer would apply the policy to everyone
+        return f'No user with email "{customer_email}".'
+    policy.customer = customer
+    return None
+
+
+def _render_form(request, action, policy=None, errors=()):
+    return render(request, 'sla/sla_form.html', {
+        'policy': policy,
+        'action': action,
+        'categories': Category.objects.filter(is_active=True),
+        'errors': errors,
+        'customer_email': request.POST.get('customer_email', '').strip(),
+    })
 
 
 @login_required
@@ -16,7 +51,7 @@ def sla_list_view(request):
         messages.error(request, 'Permission denied.')
         return redirect('dashboard:index')
 
-    policies = SLAPolicy.objects.all()
+    policies = SLAPolicy.objects.select_related('category', 'customer')
     recent_breaches = SLABreach.objects.select_related('ticket', 'policy')[:20]
     stats = SLAService.get_sla_stats()
 
@@ -35,18 +70,21 @@ def sla_create_view(request):
         return redirect('sla:list')
 
     if request.method == 'POST':
-        SLAPolicy.objects.create(
+        policy = SLAPolicy(
             name=request.POST.get('name', '').strip(),
             description=request.POST.get('description', '').strip(),
-            priority=request.POST.get('priority', 'medium'),
             response_time_hours=int(request.POST.get('response_time_hours', 4)),
             resolution_time_hours=int(request.POST.get('resolution_time_hours', 24)),
             escalation_time_hours=int(request.POST.get('escalation_time_hours', 0)),
         )
+        error = _apply_targeting(policy, request.POST)
+        if error:
+            return _render_form(request, 'Create', policy, [error])
+        policy.save()
         messages.success(request, 'SLA policy created.')
         return redirect('sla:list')
 
-    return render(request, 'sla/sla_form.html', {'action': 'Create'})
+    return _render_form(request, 'Create')
 
 
 @login_required
@@ -61,13 +99,15 @@ def sla_edit_view(request, pk):
     if request.method == 'POST':
         policy.name = request.POST.get('name', '').strip()
         policy.description = request.POST.get('description', '').strip()
-        policy.priority = request.POST.get('priority', policy.priority)
+        error = _apply_targeting(policy, request.POST)
         policy.response_time_hours = int(request.POST.get('response_time_hours', 4))
         policy.resolution_time_hours = int(request.POST.get('resolution_time_hours', 24))
         policy.escalation_time_hours = int(request.POST.get('escalation_time_hours', 0))
         policy.is_active = request.POST.get('is_active') == 'on'
+        if error:
+            return _render_form(request, 'Edit', policy, [error])
         policy.save()
         messages.success(request, 'SLA policy updated.')
         return redirect('sla:list')
 
-    return render(request, 'sla/sla_form.html', {'policy': policy, 'action': 'Edit'})
+    return _render_form(request, 'Edit', policy)
@@ -0,0 +1,188 @@
+"""
+JeyaRamaDesk — Ticket Domain Events
+Typed events describing what happened to a ticket, and the bus that
+delivers them to subscribers (automation rules) on Celery workers.
+
+Delivery:
+    emit() writes a ``TicketEvent`` row inside the caller's transaction
+    and, once it commits, enqueues ``tickets.tasks.process_ticket_events``
+    for that ticket. Rolled-back work therefore never emits anything.
+
+Ordering:
+    A worker drains a ticket's pending rows in id order while holding a
+    per-ticket cache lock; a task that finds the lock taken retries
+    shortly after. Events of one ticket are handled one at a time, in
+    the order they were committed. Different tickets run in parallel.
+
+Delivery is at-least-once: a worker crash between handling an event
+and stamping ``processed_at`` replays that event. A beat sweep
+re-enqueues tickets whose events were left pending (e.g. broker outage).
+
+Depth:
+    Every event records how many dispatches deep it was emitted. Events
+    from users and tasks have depth 0. Changes a subscriber makes while
+    handling an event of depth ``d`` emit events of depth ``d + 1``.
+    Subscribers use ``current_depth()`` to stop loops (see
+    automation.services.execution_guard).
+"""
+
+import logging
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger('jeyaramadesk')
+
+_state = threading.local()
+
+
+def _event(name, event_type, fields=''):
+    """Build a typed event class: ticket_id plus payload fields."""
+    base = namedtuple(name, ('ticket_id ' + fields).split())
+    return type(name, (base,), {'__slots__': (), 'event_type': event_type})
+
+
+# event_type values match AutomationRule.TriggerEvent
+TicketCreated = _event('TicketCreated', 'ticket_created')
+TicketUpdated = _event('TicketUpdated', 'ticket_updated', 'changes')
+TicketAssigned = _event('TicketAssigned', 'ticket_assigned', 'old_agent_id new_agent_id')
+TicketCommented = _event('TicketCommented', 'ticket_commented', 'comment_id comment_type')
+SLABreached = _event('SLABreached', 'sla_breach', 'breach_type')
+
+EVENT_TYPES = {
+    cls.event_type: cls
+    for cls in (TicketCreated, TicketUpdated, TicketAssigned, TicketCommented, SLABreached)
+}
+
+
+class TicketEventBus:
+    """Transactional emit + ordered per-ticket dispatch of ticket events."""
+
+    _subscribers = []
+
+    # ── Subscribing ───────────────────────────────────────────
+
+    @classmethod
+    def subscribe(cls, handler):
+        """Register ``handler(event, ticket)``; called for every event on workers."""
+        if handler not in cls._subscribers:
+            cls._subscribers.append(handler)
+
+    # ── Emitting ──────────────────────────────────────────────
+
+    @staticmethod
+    @contextmanager
+    def muted():
+        """
+        Suppress signal-driven emission in this thread. TicketService uses
+        it around its own saves and emits explicit events instead.
+        """
+        _state.muted = getattr(_state, 'muted', 0) + 1
+        try:
+            yield
+        finally:
+            _state.muted -= 1
+
+    @staticmethod
+    def is_muted():
+        return getattr(_state, 'muted', 0) > 0
+
+    @staticmethod
+    def current_depth():
+        """Depth of the event being dispatched in this thread (0 outside dispatch)."""
+        return getattr(_state, 'depth', 0)
+
+    @staticmethod
+    def emit(*events):
+        """Persist events in the current transaction; dispatch on commit."""
+        from tickets.models import TicketEvent
+        if not events:
+            return
+        dispatching = getattr(_state, 'dispatching', False)
+        depth = TicketEventBus.current_depth() + 1 if dispatching else 0
+        TicketEvent.objects.bulk_create([
+            TicketEvent(
+                ticket_id=event.ticket_id,
+                event_type=event.event_type,
+                payload={k: v for k, v in event._asdict().items() if k != 'ticket_id'},
+                depth=depth,
+            )
+            for event in events
+        ], batch_size=1000)
+        ticket_ids = sorted({event.ticket_id for event in events})
+        transaction.on_commit(lambda: TicketEventBus.enqueue(ticket_ids))
+
+    @staticmethod
+    def enqueue(ticket_ids):
+        """Schedule a drain for each ticket (or run inline when async is off)."""
+        if not getattr(settings, 'TICKET_EVENTS_ASYNC', True):
+            if getattr(_state, 'dispatching', False):
+                # Emitted by a subscriber: the running drain loop picks it up
+                return
+            for ticket_id in ticket_ids:
+                TicketEventBus.drain(ticket_id)
+            return
+        from tickets.tasks import process_ticket_events
+        for ticket_id in ticket_ids:
+            try:
+                process_ticket_events.delay(ticket_id)
+            except Exception as e:
+                # Rows stay pending; the beat sweep will pick them up
+                logger.error(f'Could not enqueue events for ticket {ticket_id}: {e}')
+
+    # ── Dispatching (workers) ─────────────────────────────────
+
+    @staticmethod
+    def drain(ticket_id, batch_size=100):
+        """
+        Handle every pending event of one ticket in id order. The caller
+        must hold the ticket's dispatch lock when running concurrently.
+
+        Returns:
+            Number of events handled.
+        """
+        from tickets.models import Ticket, TicketEvent
+        handled = 0
+        while True:
+            batch = list(TicketEvent.objects.filter(
+                ticket_id=ticket_id, processed_at__isnull=True,
+            ).order_by('id')[:batch_size])
+            if not batch:
+                return handled
+
+            for record in batch:
+                event_cls = EVENT_TYPES.get(record.event_type)
+                ticket = Ticket.objects.select_related(
+                    'category', 'customer', 'assigned_agent',
+                ).filter(pk=ticket_id).first()
+                if event_cls is None or ticket is None:
+                    logger.warning(f'Dropping ticket event {record.id} ({record.event_type})')
+                else:
+                    event = event_cls(ticket_id, **record.payload)
+                    TicketEventBus.dispatch(event, ticket, depth=record.depth)
+                TicketEvent.objects.filter(pk=record.pk).update(processed_at=timezone.now())
+                handled += 1
+
+    @staticmethod
+    def dispatch(event, ticket, depth=0):
+        """
+        Call every subscriber; one failing handler doesn't stop the rest.
+        Events emitted by the handlers are stamped ``depth + 1``.
+        """
+        previous = (getattr(_state, 'dispatching', False), getattr(_state, 'depth', 0))
+        _state.dispatching, _state.depth = True, depth
+        try:
+            for handler in TicketEventBus._subscribers:
+                try:
+                    handler(event, ticket)
+                except Exception as e:
+                    logger.error(
+                        f'Ticket event handler {handler.__qualname__} failed for '
+                        f'{event.event_type} on ticket {event.ticket_id}: {e}'
+                    )
+        finally:
+            _state.dispatching, _state.depth = previous
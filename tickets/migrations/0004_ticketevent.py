@@ -0,0 +1,30 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0003_ticket_idx_ticket_updated'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('event_type', models.CharField(max_length=30)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='tickets.ticket')),
+            ],
+            options={
+                'db_table': 'jrd_ticket_events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['ticket', 'processed_at'], name='idx_tevent_ticket_pending'), models.Index(fields=['processed_at', 'created_at'], name='idx_tevent_pending_age')],
+            },
+        ),
+    ]
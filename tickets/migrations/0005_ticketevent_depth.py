@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-18 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0004_ticketevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticketevent',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, help_text='0 for user/task changes; n + 1 when emitted while handling a depth-n event.'),
+        ),
+    ]
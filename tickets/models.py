@@ -162,6 +162,7 @@ class Ticket(models.Model):
             models.Index(fields=['sla_response_deadline'], name='idx_ticket_sla_resp'),
             models.Index(fields=['sla_resolution_deadline'], name='idx_ticket_sla_resol'),
             models.Index(fields=['is_escalated', 'status'], name='idx_ticket_escalated'),
+            models.Index(fields=['updated_at'], name='idx_ticket_updated'),
         ]
 
     def __str__(self):
@@ -321,3 +322,35 @@ class TicketActivity(models.Model):
 
     def __str__(self):
         return f'{self.activity_type} on {self.ticket.ticket_id}'
+
+
+class TicketEvent(models.Model):
+    """
+    Durable record of a ticket domain event (see tickets.events).
+    Rows are written inside the emitting transaction and drained in id
+    order per ticket by a Celery worker once the transaction commits.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    ticket = models.ForeignKey(
+        Ticket, on_delete=models.CASCADE, related_name='events',
+    )
+    event_type = models.CharField(max_length=30)
+    payload = models.JSONField(default=dict, blank=True)
+    depth = models.PositiveSmallIntegerField(
+        default=0,
+        help_text='0 for user/task changes; n + 1 when emitted while handling a depth-n event.',
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'jrd_ticket_events'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['ticket', 'processed_at'], name='idx_tevent_ticket_pending'),
+            models.Index(fields=['processed_at', 'created_at'], name='idx_tevent_pending_age'),
+        ]
+
+    def __str__(self):
+        return f'{self.event_type} on ticket {self.ticket_id}'
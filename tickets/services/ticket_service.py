@@ -10,19 +10,28 @@ from django.conf import settings
 from tickets.models import (
     Ticket, TicketComment, TicketAttachment, TicketActivity, Category,
 )
+from tickets.events import (
+    TicketEventBus, TicketCreated, TicketUpdated, TicketAssigned, TicketCommented,
+)
 
 logger = logging.getLogger('jeyaramadesk')
 
 
 class TicketService:
-    """Core business logic for ticket operations."""
+    """
+    Core business logic for ticket operations.
+    Each operation emits its own domain events (the model signals are
+    muted meanwhile); automation runs on workers after commit.
+    """
 
     @staticmethod
     @transaction.atomic
+    @TicketEventBus.muted()
     def create_ticket(data, customer, files=None):
         """
         Create a new ticket with optional attachments.
-        Applies SLA policy based on priority and runs automation rules.
+        Applies the matching SLA policy; ``ticket_created`` automation
+        rules run on a worker once the transaction commits.
         """
         ticket = Ticket.objects.create(
             title=data['title'],
@@ -49,18 +58,14 @@ class TicketService:
         # Apply SLA policy
         TicketService._apply_sla(ticket)
 
-        # Run automation rules
-        try:
-            from automation.services.automation_service import AutomationService
-            AutomationService.run_ticket_automations(ticket)
-        except Exception as e:
-            logger.error(f'Automation error for ticket {ticket.ticket_id}: {e}')
+        TicketEventBus.emit(TicketCreated(ticket.id))
 
         logger.info(f'Ticket created: {ticket.ticket_id} by {customer.email}')
         return ticket
 
     @staticmethod
     @transaction.atomic
+    @TicketEventBus.muted()
     def update_ticket(ticket, data, actor):
         """Update ticket fields and track changes."""
         changes = []
@@ -86,6 +91,7 @@ class TicketService:
 
         # Assignment change
         new_agent_id = data.get('assigned_agent')
+        old_agent_id = ticket.assigned_agent_id
         if new_agent_id is not None:
             from accounts.models import User
             old_agent = ticket.assigned_agent
@@ -134,10 +140,21 @@ class TicketService:
                 description=f'{activity_type.replace("_", " ").title()}: {old_val} → {new_val}',
             )
 
+        events = []
+        if changes:
+            events.append(TicketUpdated(ticket.id, [change[0] for change in changes]))
+        if ticket.assigned_agent_id and ticket.assigned_agent_id != old_agent_id:
+            events.append(TicketAssigned(
+                ticket.id, str(old_agent_id) if old_agent_id else None,
+                str(ticket.assigned_agent_id),
+            ))
+        TicketEventBus.emit(*events)
+
         return ticket
 
     @staticmethod
     @transaction.atomic
+    @TicketEventBus.muted()
     def add_comment(ticket, author, content, comment_type='reply', files=None):
         """Add a comment/reply/internal note to a ticket."""
         comment = TicketComment.objects.create(
@@ -154,7 +171,7 @@ class TicketService:
             ticket.first_response_at = timezone.now()
             if ticket.sla_response_deadline:
                 ticket.sla_response_met = timezone.now() <= ticket.sla_response_deadline
-            ticket.save(update_fields=['first_response_at', 'sla_response_met'])
+            ticket.save(update_fields=['first_response_at', 'sla_response_met', 'updated_at'])
 
         # Activity
         activity_type = (
@@ -173,10 +190,12 @@ class TicketService:
         if files:
             TicketService._process_attachments(ticket, comment, files, author)
 
+        TicketEventBus.emit(TicketCommented(ticket.id, comment.id, comment_type))
         return comment
 
     @staticmethod
     @transaction.atomic
+    @TicketEventBus.muted()
     def assign_ticket(ticket, agent, actor):
         """Assign a ticket to an agent."""
         old_agent = ticket.assigned_agent
@@ -194,10 +213,16 @@ class TicketService:
             new_value=agent.full_name if agent else 'Unassigned',
             description=f'Ticket assigned to {agent.full_name}.' if agent else 'Ticket unassigned.',
         )
+
+        if agent and agent.pk != getattr(old_agent, 'pk', None):
+            TicketEventBus.emit(TicketAssigned(
+                ticket.id, str(old_agent.pk) if old_agent else None, str(agent.pk),
+            ))
         return ticket
 
     @staticmethod
     @transaction.atomic
+    @TicketEventBus.muted()
     def escalate_ticket(ticket, actor=None, reason=''):
         """Escalate a ticket."""
         ticket.is_escalated = True
@@ -211,6 +236,8 @@ class TicketService:
             description=f'Ticket escalated to level {ticket.escalation_level}. {reason}',
         )
 
+        TicketEventBus.emit(TicketUpdated(ticket.id, ['escalated']))
+
         logger.warning(f'Ticket {ticket.ticket_id} escalated to level {ticket.escalation_level}')
         return ticket
 
@@ -230,23 +257,16 @@ class TicketService:
 
     @staticmethod
     def _apply_sla(ticket):
-        """Apply SLA policy to a ticket based on priority."""
+        """
+        Apply the best-matching SLA policy (priority, category, customer,
+        source) using the compiled in-memory policy table.
+        """
         try:
-            from sla.models import SLAPolicy
-            policy = SLAPolicy.objects.filter(
-                priority=ticket.priority, is_active=True,
-            ).first()
-            if policy:
-                ticket.sla_policy = policy
-                now = timezone.now()
-                ticket.sla_response_deadline = now + timezone.timedelta(
-                    hours=policy.response_time_hours
-                )
-                ticket.sla_resolution_deadline = now + timezone.timedelta(
-                    hours=policy.resolution_time_hours
-                )
+            from sla.services.policy_resolver import SLAPolicyResolver
+            if SLAPolicyResolver.apply(ticket):
                 ticket.save(update_fields=[
                     'sla_policy', 'sla_response_deadline', 'sla_resolution_deadline',
+                    'updated_at',
                 ])
         except Exception as e:
             logger.error(f'SLA apply error: {e}')
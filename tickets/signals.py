@@ -1,17 +1,28 @@
 """
 JeyaRamaDesk — Ticket Signals
 Automated actions triggered by ticket events.
-Sends real-time notifications for ticket creation, comments,
-assignment changes, status changes, and priority changes.
+Records notification outbox events for ticket creation, comments,
+assignment changes, status changes, and priority changes (turned into
+notifications by a worker after commit), and emits ticket domain events
+for saves made outside TicketService.
 """
 
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from tickets.models import Ticket, TicketComment
+from tickets.events import (
+    TicketEventBus, TicketCreated, TicketUpdated, TicketAssigned, TicketCommented,
+)
 import logging
 
 logger = logging.getLogger('jeyaramadesk')
 
+# Field changes that count as a ``ticket_updated`` event
+EVENT_TRACKED_FIELDS = (
+    'status', 'priority', 'assigned_agent_id', 'category_id', 'title',
+    'description', 'due_date', 'is_escalated', 'escalation_level',
+)
+
 
 # ── Cache old values before save so we can detect changes ────
 
@@ -24,34 +35,43 @@ def ticket_pre_save(sender, instance, **kwargs):
             instance._old_assigned_agent_id = old.assigned_agent_id
             instance._old_status = old.status
             instance._old_priority = old.priority
+            instance._old_event_values = {f: getattr(old, f) for f in EVENT_TRACKED_FIELDS}
         except Ticket.DoesNotExist:
             instance._old_assigned_agent_id = None
             instance._old_status = None
             instance._old_priority = None
+            instance._old_event_values = None
 
 
 @receiver(post_save, sender=Ticket)
 def ticket_post_save(sender, instance, created, **kwargs):
     """Handle post-save events for tickets."""
+    if not TicketEventBus.is_muted():
+        _emit_ticket_events(instance, created)
+
     try:
-        from notifications.services.notification_service import NotificationService
+        from notifications.services.outbox import NotificationOutbox
     except Exception as e:
-        logger.error(f'Could not import NotificationService: {e}')
+        logger.error(f'Could not import NotificationOutbox: {e}')
         return
 
     if created:
         # ── New ticket → notify managers / superadmins ────────
         try:
-            NotificationService.notify_new_ticket(instance)
+            NotificationOutbox.ticket_created(instance)
         except Exception as e:
             logger.error(f'Notification error on ticket create: {e}')
         return
 
+    # Automation sends one coalesced notification for its changes instead
+    if getattr(instance, '_skip_change_notifications', False):
+        return
+
     # ── Assignment changed ────────────────────────────────────
     old_agent_id = getattr(instance, '_old_assigned_agent_id', None)
     if instance.assigned_agent_id and instance.assigned_agent_id != old_agent_id:
         try:
-            NotificationService.notify_ticket_assigned(instance)
+            NotificationOutbox.ticket_assigned(instance)
         except Exception as e:
             logger.error(f'Notification error on ticket assign: {e}')
 
@@ -59,7 +79,7 @@ def ticket_post_save(sender, instance, created, **kwargs):
     old_status = getattr(instance, '_old_status', None)
     if old_status and instance.status != old_status:
         try:
-            NotificationService.notify_status_change(instance, old_status)
+            NotificationOutbox.status_changed(instance, old_status)
         except Exception as e:
             logger.error(f'Notification error on status change: {e}')
 
@@ -67,17 +87,40 @@ def ticket_post_save(sender, instance, created, **kwargs):
     old_priority = getattr(instance, '_old_priority', None)
     if old_priority and instance.priority != old_priority:
         try:
-            NotificationService.notify_priority_change(instance, old_priority)
+            NotificationOutbox.priority_changed(instance, old_priority)
         except Exception as e:
             logger.error(f'Notification error on priority change: {e}')
 
 
+def _emit_ticket_events(instance, created):
+    """Emit domain events for a save that didn't go through TicketService."""
+    if created:
+        TicketEventBus.emit(TicketCreated(instance.pk))
+        return
+    old_values = getattr(instance, '_old_event_values', None)
+    if not old_values:
+        return
+    changed = [f for f in EVENT_TRACKED_FIELDS if getattr(instance, f) != old_values[f]]
+    events = []
+    if changed:
+        events.append(TicketUpdated(instance.pk, changed))
+    old_agent_id = old_values['assigned_agent_id']
+    if instance.assigned_agent_id and instance.assigned_agent_id != old_agent_id:
+        events.append(TicketAssigned(
+            instance.pk, str(old_agent_id) if old_agent_id else None,
+            str(instance.assigned_agent_id),
+        ))
+    TicketEventBus.emit(*events)
+
+
 @receiver(post_save, sender=TicketComment)
 def comment_post_save(sender, instance, created, **kwargs):
     """Notify relevant parties when a comment is added."""
+    if created and not TicketEventBus.is_muted():
+        TicketEventBus.emit(TicketCommented(instance.ticket_id, instance.pk, instance.comment_type))
     if created and instance.comment_type != 'system':
         try:
-            from notifications.services.notification_service import NotificationService
-            NotificationService.notify_new_comment(instance)
+            from notifications.services.outbox import NotificationOutbox
+            NotificationOutbox.comment_added(instance)
         except Exception as e:
             logger.error(f'Notification error on comment: {e}')
@@ -0,0 +1,58 @@
+"""
+JeyaRamaDesk — Ticket Celery Tasks
+Ordered per-ticket dispatch of ticket domain events (see tickets.events).
+"""
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger('jeyaramadesk')
+
+# Longest a worker may hold a ticket's dispatch lock
+EVENT_LOCK_TIMEOUT = 300
+
+
+@shared_task(bind=True, name='tickets.tasks.process_ticket_events', max_retries=60)
+def process_ticket_events(self, ticket_id):
+    """
+    Drain one ticket's pending events in order. Only one worker drains a
+    ticket at a time; a concurrent task backs off and retries.
+    """
+    from tickets.events import TicketEventBus
+
+    lock_key = f'ticket_events:lock:{ticket_id}'
+    if not cache.add(lock_key, self.request.id or 1, EVENT_LOCK_TIMEOUT):
+        raise self.retry(countdown=1)
+    try:
+        return TicketEventBus.drain(ticket_id)
+    finally:
+        cache.delete(lock_key)
+
+
+@shared_task(name='tickets.tasks.sweep_ticket_events')
+def sweep_ticket_events():
+    """
+    Periodic task: re-enqueue tickets whose events were left pending
+    (lost task, broker outage) and prune old processed events.
+    """
+    from datetime import timedelta
+    from django.utils import timezone
+    from tickets.events import TicketEventBus
+    from tickets.models import TicketEvent
+
+    now = timezone.now()
+    stale = list(TicketEvent.objects.filter(
+        processed_at__isnull=True,
+        created_at__lt=now - timedelta(seconds=60),
+    ).order_by().values_list('ticket_id', flat=True).distinct()[:1000])
+    if stale:
+        logger.warning(f'Ticket events: re-enqueueing {len(stale)} tickets with stale pending events')
+        TicketEventBus.enqueue(stale)
+
+    retention_days = getattr(settings, 'TICKET_EVENT_RETENTION_DAYS', 7)
+    pruned, _ = TicketEvent.objects.filter(
+        processed_at__lt=now - timedelta(days=retention_days),
+    ).delete()
+    return f'Re-enqueued {len(stale)} tickets, pruned {pruned} events'